@@ -1,44 +1,282 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, BackgroundTasks, HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from datetime import datetime, timezone
-import uuid
+from typing import Optional
+import asyncio
+import json
+import time
 
-from app.models.schemas import ClinicalInput, AssessmentResponse
+from app.models.schemas import (
+    ClinicalInput, AssessmentResponse, BatchAssessmentRequest, BatchAssessmentResponse, EnrichmentStatus
+)
+from app.core import metrics
 from app.core.ml_service import MLRiskEngine
+from app.core.results import DISCLAIMER, Assessment, ORJSONResponse, dumps
 from app.core.storage import LocalStorage
+from app.core.concurrency import InferencePool, ConcurrencyLimiter
+from app.core.enrichment import EnrichmentJobs, ENRICHMENT_MODE
 
-router = APIRouter()
-storage = LocalStorage()
+# Handlers return ORJSONResponse(Assessment.to_dict()) directly: the response
+# models document the API but are not re-validated on every request
+router = APIRouter(default_response_class=ORJSONResponse)
 
-# Initialize ML Engine (Load logic once)
-try:
-    risk_engine = MLRiskEngine()
-except Exception as e:
-    print(f"WARNING: ML Engine failed to load: {e}")
-    risk_engine = None
+# Bounded offload for CPU-bound inference + per-worker in-flight cap
+inference_pool = InferencePool()
+limiter = ConcurrencyLimiter()
+
+# Encrypted store, ML Engine + two-phase enrichment jobs, created by load_services() at startup
+storage: Optional[LocalStorage] = None
+risk_engine: Optional[MLRiskEngine] = None
+enrichment_jobs: Optional[EnrichmentJobs] = None
+startup_state = {"ready": False, "error": None, "load_times": {}}
+
+async def load_services():
+    """
+    Called once from the app lifespan: opens the store and loads the engine
+    off the event loop, runs a warm-up inference, then marks the worker ready
+    for /readyz.
+    """
+    global storage, risk_engine, enrichment_jobs
+    started = time.perf_counter()
+    try:
+        if storage is None:
+            # Legacy-log migration and index recovery (under the file lock) happen here
+            storage = await asyncio.to_thread(LocalStorage)
+        engine = await asyncio.to_thread(MLRiskEngine)
+        await asyncio.to_thread(engine.warm_up)
+    except Exception as e:
+        print(f"WARNING: ML Engine failed to load: {e}")
+        startup_state["error"] = str(e)
+        return
+    risk_engine = engine
+    # Two-phase mode: background LLM enrichment keyed by assessment_id
+    enrichment_jobs = EnrichmentJobs(engine.llm_service)
+    startup_state["load_times"] = dict(engine.load_times, total=round(time.perf_counter() - started, 4))
+    startup_state["ready"] = True
+    # Hot reload: new bundles are picked up in the background from here on
+    engine.registry.start()
+
+def shutdown_services():
+    if risk_engine:
+        risk_engine.registry.close()
 
 @router.post("/assess", response_model=AssessmentResponse)
-async def assess_clinical_risk(input_data: ClinicalInput):
+async def assess_clinical_risk(input_data: ClinicalInput, background_tasks: BackgroundTasks,
+                               deferred: Optional[bool] = None):
     """
     Perform population-level risk estimation using NHANES-trained models.
+
+    With `deferred=true` (or VITALSCAN_ENRICHMENT_MODE=deferred) scores and
+    template advice return immediately; upgraded advice is available from
+    `/assess/{assessment_id}/advice` (poll) or `/assess/{assessment_id}/events` (SSE).
     """
+    metrics.observe_since_request("request_validation")
     if not risk_engine:
         raise HTTPException(status_code=503, detail="Risk Engine not initialized. Models missing.")
 
+    if deferred is None:
+        deferred = ENRICHMENT_MODE == "deferred"
+
     try:
-        # 1. ML Inference
-        risks = risk_engine.assess(input_data)
+        # 1. ML Inference (inference pool) + async LLM enrichment (unless deferred)
+        async with limiter:
+            risks = await risk_engine.aassess(input_data, inference_pool, enrich=not deferred)
         
         # 2. Construct Response
-        response = AssessmentResponse(
-            assessment_id=str(uuid.uuid4()),
-            timestamp=datetime.now(timezone.utc),
-            risks=risks
-        )
+        response = Assessment.new(risks, enrichment_status=EnrichmentStatus.PENDING if deferred
+                                  else EnrichmentStatus.COMPLETE)
         
-        # 3. Privacy-Preserving Store (Encrypted)
-        storage.save_assessment(response)
+        # 3. Privacy-Preserving Store (Encrypted, after the response is sent)
+        if deferred:
+            # Stored now with template advice, so the id survives a restart or a
+            # failed enrichment; the final advice is stored again under the same id
+            await asyncio.to_thread(storage.save_assessment, response)
+            enrichment_jobs.submit(response, input_data, on_complete=storage.save_assessment)
+        else:
+            background_tasks.add_task(storage.save_assessment, response)
         
-        return response
+        return ORJSONResponse(response.to_dict())
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Inference failed: {str(e)}")
+
+@router.post("/assess/stream")
+async def assess_clinical_risk_stream(input_data: ClinicalInput):
+    """
+    Streaming variant of /assess (Server-Sent Events).
+    Emits `scores` (risks + template advice) right away, one `advice` event per
+    disease as soon as the LLM finishes it, then `complete` with the final
+    assessment.
+    """
+    metrics.observe_since_request("request_validation")
+    if not risk_engine:
+        raise HTTPException(status_code=503, detail="Risk Engine not initialized. Models missing.")
+
+    try:
+        async with limiter:
+            risks = await risk_engine.aassess(input_data, inference_pool, enrich=False)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Inference failed: {str(e)}")
+
+    response = Assessment.new(risks, enrichment_status=EnrichmentStatus.PENDING)
+    state = {"final": response}
+
+    async def event_stream():
+        yield _sse("scores", response.to_json())
+
+        advice = {}
+        async for disease, steps in risk_engine.llm_service.astream_explanation(risks, user_profile=input_data):
+            advice[disease] = steps
+            yield _sse("advice", json.dumps({"disease": disease, "prevention_steps": steps}))
+
+        state["final"] = response.replace(
+            risks=[
+                r.replace(prevention_steps=advice[r.disease]) if r.disease in advice else r
+                for r in response.risks
+            ],
+            enrichment_status=EnrichmentStatus.COMPLETE,
+        )
+        yield _sse("complete", state["final"].to_json())
+
+    # Privacy-Preserving Store (Encrypted, once the stream has finished)
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        background=BackgroundTask(lambda: storage.save_assessment(state["final"]))
+    )
+
+@router.post("/assess/batch", response_model=BatchAssessmentResponse)
+async def assess_clinical_risk_batch(request: BatchAssessmentRequest, background_tasks: BackgroundTasks):
+    """
+    Bulk risk estimation for screening campaigns.
+    Runs vectorized inference over all inputs; prevention steps use the
+    clinical templates (no per-record LLM call).
+    """
+    metrics.observe_since_request("request_validation")
+    if not risk_engine:
+        raise HTTPException(status_code=503, detail="Risk Engine not initialized. Models missing.")
+
+    try:
+        # 1. Vectorized ML Inference (inference pool)
+        async with limiter:
+            all_risks = await inference_pool.run(risk_engine.assess_many, request.inputs)
+
+        # 2. Construct Responses
+        timestamp = datetime.now(timezone.utc)
+        assessments = [Assessment.new(risks, timestamp) for risks in all_risks]
+
+        # 3. Privacy-Preserving Store (Encrypted, single append after the response)
+        background_tasks.add_task(storage.save_assessments, assessments)
+
+        return ORJSONResponse({"assessments": [a.to_dict() for a in assessments]})
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Inference failed: {str(e)}")
+
+async def _get_stored_assessment(assessment_id: str) -> dict:
+    if not storage:
+        raise HTTPException(status_code=503, detail="Storage not initialized.")
+    stored = await asyncio.to_thread(storage.get_assessment, assessment_id)
+    if not stored:
+        raise HTTPException(status_code=404, detail="Assessment not found.")
+    # Records written before two-phase enrichment lack these fields
+    stored.setdefault("enrichment_status", EnrichmentStatus.COMPLETE.value)
+    stored.setdefault("disclaimer", DISCLAIMER)
+    return stored
+
+@router.get("/assess/{assessment_id}/advice", response_model=AssessmentResponse)
+async def get_assessment_advice(assessment_id: str):
+    """
+    Poll a deferred assessment. `enrichment_status` turns to "complete" once
+    the prevention steps have been upgraded. Falls back to the encrypted store
+    for assessments no longer tracked in memory (e.g. after a restart).
+    """
+    job = enrichment_jobs.get(assessment_id) if enrichment_jobs else None
+    if job:
+        return ORJSONResponse(job.response.to_dict())
+
+    return ORJSONResponse(await _get_stored_assessment(assessment_id))
+
+@router.get("/assess/{assessment_id}/events")
+async def stream_assessment_advice(assessment_id: str):
+    """
+    Server-Sent Events: emits one `advice` event when enrichment completes
+    (right away for an assessment only found in the encrypted store).
+    """
+    job = enrichment_jobs.get(assessment_id) if enrichment_jobs else None
+    if not job:
+        stored = await _get_stored_assessment(assessment_id)
+
+        async def stored_stream():
+            yield _sse("advice", dumps(stored).decode("utf-8"))
+
+        return StreamingResponse(stored_stream(), media_type="text/event-stream")
+
+    async def event_stream():
+        while not job.done.is_set():
+            try:
+                await asyncio.wait_for(job.done.wait(), timeout=15)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+        yield _sse("advice", job.response.to_json())
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+def _sse(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+@router.get("/models")
+async def model_versions():
+    """
+    Loaded model versions with traffic share, per-version latency and
+    prediction distribution (for A/B rollouts of retrained models).
+    """
+    if not risk_engine:
+        raise HTTPException(status_code=503, detail="Risk Engine not initialized. Models missing.")
+    return risk_engine.registry.stats()
+
+@router.get("/cache")
+async def cache_stats():
+    """
+    Hit/miss counters for the result memo (identical inputs) and the LLM advice cache.
+    """
+    if not risk_engine:
+        raise HTTPException(status_code=503, detail="Risk Engine not initialized. Models missing.")
+    return {
+        "results": risk_engine.result_cache.stats(),
+        "llm_advice": risk_engine.llm_service.cache.stats(),
+    }
+
+def _service_metrics():
+    """Scrape-time values for /metrics: cache counters and the storage write queue."""
+    families = [(
+        "vitalscan_storage_queue_depth", "gauge", "Assessments queued for the group-commit writer.",
+        [({}, storage.writer.depth() if storage and storage.writer else 0)],
+    )]
+    if risk_engine:
+        results = risk_engine.result_cache.stats()
+        advice = risk_engine.llm_service.cache.stats()
+        # An advice-cache disk hit is first counted as a memory miss
+        caches = {
+            "results": (results["hits"], results["misses"], results["size"]),
+            "llm_advice": (advice["hits"] + advice["disk_hits"], advice["misses"] - advice["disk_hits"], advice["size"]),
+        }
+        families += [
+            ("vitalscan_cache_hits_total", "counter", "Cache lookups served from the cache.",
+             [({"cache": name}, hits) for name, (hits, _, _) in caches.items()]),
+            ("vitalscan_cache_misses_total", "counter", "Cache lookups that missed.",
+             [({"cache": name}, misses) for name, (_, misses, _) in caches.items()]),
+            ("vitalscan_cache_entries", "gauge", "Entries held in memory.",
+             [({"cache": name}, size) for name, (_, _, size) in caches.items()]),
+        ]
+        transport = risk_engine.llm_service.transport
+        if transport:
+            state = transport.breaker.state
+            families.append((
+                "vitalscan_llm_circuit_state", "gauge", "LLM circuit breaker state (1 = current).",
+                [({"state": s}, 1 if s == state else 0) for s in ("closed", "half_open", "open")],
+            ))
+    return families
+
+metrics.REGISTRY.register_collector(_service_metrics)
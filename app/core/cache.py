@@ -0,0 +1,185 @@
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from cryptography.fernet import InvalidToken
+
+from app.core.results import Risk
+from app.core.storage import SecurityManager
+
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "1024"))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", "")  # Empty = memory only
+# Memo of final results per identical input (0 = off, e.g. privacy-sensitive deployments)
+RESULT_CACHE_SIZE = int(os.getenv("VITALSCAN_RESULT_CACHE_SIZE", "1024"))
+RESULT_CACHE_TTL_SECONDS = float(os.getenv("VITALSCAN_RESULT_CACHE_TTL_SECONDS", "300"))
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with per-entry TTL and hit/miss counters.
+    """
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 3600):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or time.time() - entry[0] > self.ttl_seconds:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: Any, created_at: Optional[float] = None):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = (created_at or time.time(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+class ExplanationCache:
+    """
+    Content-addressed cache for LLM advice.
+    Keyed on the risk summary (disease, severity, drivers) plus the profile
+    exactly as the prompt sends it, with numeric fields bucketed into bands
+    (age, BMI, sleep, ...): profiles in the same bands share one entry, and
+    the advice only ever quotes those bands.
+    Optional on-disk tier survives restarts; entries are encrypted with the
+    storage key (SecurityManager), like the assessments.
+    """
+    def __init__(self, max_size: int = LLM_CACHE_SIZE, ttl_seconds: float = LLM_CACHE_TTL_SECONDS,
+                 cache_dir: str = LLM_CACHE_DIR, security: Optional[SecurityManager] = None):
+        self.memory = TTLCache(max_size, ttl_seconds)
+        self.cache_dir = cache_dir
+        self.disk_hits = 0
+        self.security = security
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self.security = self.security or SecurityManager()
+
+    @staticmethod
+    def make_key(risks: List[Risk], profile: Optional[dict]) -> str:
+        """`profile`: the banded fields the prompt contains (see LLMService._relevant_profile)."""
+        summary = sorted(
+            (r.disease, str(getattr(r.risk_level, "value", r.risk_level)), sorted(r.contributing_factors))
+            for r in risks
+        )
+        canonical = json.dumps({"risks": summary, "profile": profile or {}},
+                               sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, List[str]]]:
+        advice = self.memory.get(key)
+        if advice is not None or not self.cache_dir:
+            return advice
+
+        # Disk tier (promoted to memory on hit)
+        try:
+            with open(self._path(key), "rb") as f:
+                entry = self.security.decrypt_data(f.read())
+        except (OSError, ValueError, InvalidToken):
+            return None
+        if time.time() - entry["created_at"] > self.memory.ttl_seconds:
+            return None
+        self.disk_hits += 1
+        self.memory.set(key, entry["advice"], created_at=entry["created_at"])
+        return entry["advice"]
+
+    def set(self, key: str, advice: Dict[str, List[str]]):
+        created_at = time.time()
+        self.memory.set(key, advice, created_at=created_at)
+        if not self.cache_dir:
+            return
+        try:
+            # Write-then-rename so concurrent workers never read a partial entry
+            tmp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(self.security.encrypt_data({"created_at": created_at, "advice": advice}))
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            print(f"WARNING: LLM cache write failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.memory.stats()
+        stats["disk_hits"] = self.disk_hits
+        return stats
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.enc")
+
+class ResultCache:
+    """
+    Memo of final risks (enriched advice included) per validated input, for
+    retries, double submits and kiosk re-runs. Callers skip results whose
+    LLM call failed, so an outage is not served from here after it ends.
+    Only derived data is held: keys are HMACs of the canonical input under a
+    per-process random salt, values are the risks. Entries belong to one
+    model generation; the first lookup after a model change purges them all.
+    """
+    def __init__(self, max_size: int = RESULT_CACHE_SIZE, ttl_seconds: float = RESULT_CACHE_TTL_SECONDS):
+        self.memory = TTLCache(max_size, ttl_seconds)
+        self.enabled = max_size > 0
+        self.purges = 0
+        self._generation: Optional[int] = None
+        self._salt = os.urandom(32)
+        self._lock = threading.Lock()
+
+    def make_key(self, input_data: Any, variant: str) -> Optional[str]:
+        """None when disabled. `variant` separates e.g. enriched from template results."""
+        if not self.enabled:
+            return None
+        values = [getattr(input_data, name) for name in type(input_data).model_fields]
+        canonical = json.dumps([variant] + values, separators=(",", ":"))
+        return hmac.new(self._salt, canonical.encode("utf-8"), hashlib.sha256).hexdigest()
+
+    def get(self, key: Optional[str], generation: int) -> Optional[List[Risk]]:
+        if key is None:
+            return None
+        with self._lock:
+            if generation != self._generation:
+                self._purge(generation)
+        risks = self.memory.get(key)
+        # Copies: callers sort and enrich the lists they get back
+        return [risk.copy() for risk in risks] if risks is not None else None
+
+    def set(self, key: Optional[str], risks: List[Risk], generation: int):
+        if key is None:
+            return
+        with self._lock:
+            if generation != self._generation:
+                return  # Scored by a model that has been replaced since
+            self.memory.set(key, [risk.copy() for risk in risks])
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.memory.stats()
+        stats.update(enabled=self.enabled, purges=self.purges, generation=self._generation)
+        return stats
+
+    def _purge(self, generation: int):
+        if self._generation is not None and self.memory.stats()["size"]:
+            self.purges += 1
+        self._generation = generation
+        self.memory.clear()
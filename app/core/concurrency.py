@@ -0,0 +1,43 @@
+import asyncio
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+# Size each worker for its cores (override via .env)
+INFERENCE_WORKERS = int(os.getenv("VITALSCAN_INFERENCE_WORKERS", os.cpu_count() or 1))
+MAX_CONCURRENCY = int(os.getenv("VITALSCAN_MAX_CONCURRENCY", "32"))
+
+class InferencePool:
+    """
+    Bounded executor for CPU-bound work (feature build, XGBoost, screening).
+    Keeps the event loop free; XGBoost and NumPy release the GIL during predict.
+    """
+    def __init__(self, max_workers: int = INFERENCE_WORKERS):
+        self.max_workers = max(1, max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        # Carry the request context into the worker thread (trace spans nest under the request)
+        ctx = contextvars.copy_context()
+        return await loop.run_in_executor(self._executor, ctx.run, fn, *args)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+class ConcurrencyLimiter:
+    """
+    Caps in-flight assessments per worker. Excess requests wait for a slot
+    instead of piling more work onto the inference pool and LLM provider.
+    """
+    def __init__(self, limit: int = MAX_CONCURRENCY):
+        self.limit = max(1, limit)
+        self._semaphore = asyncio.Semaphore(self.limit)
+
+    async def __aenter__(self):
+        await self._semaphore.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._semaphore.release()
@@ -0,0 +1,90 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, List
+
+from app.models.schemas import EnrichmentStatus
+from app.core.llm_service import LLMService, Profile
+from app.core.results import Assessment, Risk
+from app.core.concurrency import ConcurrencyLimiter
+
+# "sync": /assess waits for the LLM. "deferred": scores return immediately,
+# advice is upgraded in the background (poll or SSE by assessment_id).
+ENRICHMENT_MODE = os.getenv("VITALSCAN_ENRICHMENT_MODE", "sync").lower()
+ENRICHMENT_MAX_JOBS = int(os.getenv("VITALSCAN_ENRICHMENT_MAX_JOBS", "10000"))
+ENRICHMENT_TTL_SECONDS = float(os.getenv("VITALSCAN_ENRICHMENT_TTL_SECONDS", "3600"))
+ENRICHMENT_CONCURRENCY = int(os.getenv("VITALSCAN_ENRICHMENT_CONCURRENCY", "16"))
+
+class EnrichmentJob:
+    def __init__(self, response: Assessment):
+        self.response = response
+        self.created_at = time.monotonic()
+        self.done = asyncio.Event()
+
+class EnrichmentJobs:
+    """
+    Background LLM enrichment for the two-phase /assess mode.
+    Holds the latest Assessment per assessment_id (bounded, TTL-evicted)
+    so clients can poll or subscribe until the advice is upgraded.
+    """
+    def __init__(self, llm_service: LLMService,
+                 max_jobs: int = ENRICHMENT_MAX_JOBS,
+                 ttl_seconds: float = ENRICHMENT_TTL_SECONDS,
+                 concurrency: int = ENRICHMENT_CONCURRENCY):
+        self.llm_service = llm_service
+        self.max_jobs = max_jobs
+        self.ttl_seconds = ttl_seconds
+        self.limiter = ConcurrencyLimiter(concurrency)
+        self._jobs: "OrderedDict[str, EnrichmentJob]" = OrderedDict()
+        self._tasks = set()  # Strong refs so running tasks are not garbage collected
+
+    def submit(self, response: Assessment, user_profile: Profile,
+               on_complete: Optional[Callable[[Assessment], None]] = None) -> EnrichmentJob:
+        """
+        Registers a pending assessment and schedules its enrichment.
+        Must be called from the event loop.
+        """
+        self._evict()
+        response.enrichment_status = EnrichmentStatus.PENDING
+        job = EnrichmentJob(response)
+        self._jobs[response.assessment_id] = job
+
+        # Enrich a copy so the already-returned template response is never mutated mid-serialization
+        risks = [r.copy() for r in response.risks]
+        task = asyncio.create_task(self._run(job, risks, user_profile, on_complete))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def get(self, assessment_id: str) -> Optional[EnrichmentJob]:
+        self._evict()
+        return self._jobs.get(assessment_id)
+
+    async def _run(self, job: EnrichmentJob, risks: List[Risk], user_profile: Profile,
+                   on_complete: Optional[Callable[[Assessment], None]]):
+        try:
+            async with self.limiter:
+                risks = await self.llm_service.agenerate_explanation(risks, user_profile=user_profile)
+            risks.sort(key=lambda x: x.probability, reverse=True)
+            job.response = job.response.replace(risks=risks)
+        except Exception as e:
+            # Keep the template advice already delivered to the client
+            print(f"WARNING: Enrichment failed for {job.response.assessment_id}: {e}")
+        finally:
+            job.response = job.response.replace(enrichment_status=EnrichmentStatus.COMPLETE)
+            job.done.set()
+
+        if on_complete:
+            try:
+                await asyncio.to_thread(on_complete, job.response)
+            except Exception as e:
+                print(f"WARNING: Enrichment callback failed for {job.response.assessment_id}: {e}")
+
+    def _evict(self):
+        now = time.monotonic()
+        while self._jobs:
+            oldest_id, oldest = next(iter(self._jobs.items()))
+            if len(self._jobs) <= self.max_jobs and now - oldest.created_at < self.ttl_seconds:
+                break
+            self._jobs.pop(oldest_id)
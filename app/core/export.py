@@ -0,0 +1,188 @@
+"""
+Bulk export of the encrypted assessment log for population analytics.
+
+Streams the log in index-sized chunks, decrypts and flattens them across a
+process pool, and writes a columnar file with one row per DiseaseRisk.
+Records still pending enrichment are skipped: deferred assessments are
+stored again once their advice is final.
+Memory stays bounded: at most `2 * workers` chunks are in flight, and a
+worker reads its chunk in runs of nearby records of at most
+READ_MAX_BYTES, never the whole span between the first and last match.
+
+Usage:
+    python -m app.core.export --out report.parquet \
+        --start 2026-01-01 --end 2026-02-01 --disease "Type 2 Diabetes"
+"""
+
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.core.storage import SecurityManager, IndexEntry, scan_index
+from app.models.schemas import EnrichmentStatus
+
+CHUNK_SIZE = 2000
+# Records less than READ_MAX_GAP apart share one read, up to READ_MAX_BYTES per read
+READ_MAX_GAP = 64 * 1024
+READ_MAX_BYTES = 4 * 1024 * 1024
+
+_security: Optional[SecurityManager] = None
+
+def export_assessments(out_path: str, storage_path: str = "data/assessments.enc",
+                       key_path: str = "data/secret.key",
+                       start: Optional[datetime] = None, end: Optional[datetime] = None,
+                       diseases: Optional[Sequence[str]] = None,
+                       workers: Optional[int] = None, fmt: str = "parquet",
+                       chunk_size: int = CHUNK_SIZE) -> int:
+    """
+    Writes matching DiseaseRisk rows to `out_path` (Parquet or Arrow IPC).
+    Returns the number of rows written.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("pyarrow is required for exports: pip install pyarrow")
+
+    schema = pa.schema([
+        ("assessment_id", pa.string()),
+        ("timestamp", pa.timestamp("us", tz="UTC")),
+        ("disease", pa.string()),
+        ("risk_level", pa.string()),
+        ("probability", pa.float64()),
+        ("contributing_factors", pa.list_(pa.string())),
+        ("prevention_steps", pa.list_(pa.string())),
+    ])
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(out_path, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_file(out_path, schema)
+
+    workers = workers or os.cpu_count() or 1
+    disease_filter = list(diseases) if diseases else None
+    rows = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(key_path,)) as pool:
+            in_flight = deque()
+            for chunk in _iter_chunks(storage_path, start, end, chunk_size):
+                in_flight.append(pool.submit(_decode_chunk, chunk, disease_filter))
+                if len(in_flight) >= 2 * workers:
+                    rows += _write_columns(writer, schema, in_flight.popleft().result())
+            while in_flight:
+                rows += _write_columns(writer, schema, in_flight.popleft().result())
+    finally:
+        writer.close()
+    return rows
+
+def _iter_chunks(storage_path: str, start: Optional[datetime], end: Optional[datetime],
+                 chunk_size: int) -> Iterator[List[IndexEntry]]:
+    """
+    Index entries in time range, grouped per segment (no decryption here).
+    The log is only read: a live server may keep appending while we export.
+    """
+    chunk: List[IndexEntry] = []
+    for entry in scan_index(storage_path, start, end):
+        if chunk and (len(chunk) >= chunk_size or entry.segment != chunk[0].segment):
+            yield chunk
+            chunk = []
+        chunk.append(entry)
+    if chunk:
+        yield chunk
+
+def _init_worker(key_path: str):
+    global _security
+    _security = SecurityManager(key_path)
+
+def _decode_chunk(entries: List[IndexEntry], diseases: Optional[List[str]]) -> Dict[str, List[Any]]:
+    """
+    Worker: read nearby records together, decrypt, flatten to columns.
+    """
+    columns = {name: [] for name in ("assessment_id", "timestamp", "disease", "risk_level",
+                                     "probability", "contributing_factors", "prevention_steps")}
+    if not entries:
+        return columns
+    with open(entries[0].segment, "rb") as f:
+        for entry, record in _read_records(f, entries):
+            try:
+                data = _security.decrypt_record(record)
+            except Exception:
+                continue  # Skip corrupted/unreadable records
+            _add_rows(columns, entry, data, diseases)
+    return columns
+
+def _read_records(f, entries: List[IndexEntry], max_gap: int = READ_MAX_GAP,
+                  max_bytes: int = READ_MAX_BYTES) -> Iterator[Tuple[IndexEntry, bytes]]:
+    """
+    (entry, record bytes) in file order. Entries less than `max_gap` apart are
+    fetched with one read of at most `max_bytes` (a larger record is read alone).
+    """
+    entries = sorted(entries, key=lambda e: e.offset)
+    i = 0
+    while i < len(entries):
+        base = entries[i].offset
+        end = base + entries[i].length
+        j = i + 1
+        while (j < len(entries) and entries[j].offset - end < max_gap
+               and entries[j].offset + entries[j].length - base <= max_bytes):
+            end = max(end, entries[j].offset + entries[j].length)
+            j += 1
+        f.seek(base)
+        blob = f.read(end - base)
+        for entry in entries[i:j]:
+            yield entry, blob[entry.offset - base:entry.offset - base + entry.length]
+        i = j
+
+def _add_rows(columns: Dict[str, List[Any]], entry: IndexEntry, data: Dict[str, Any],
+              diseases: Optional[List[str]]):
+    if data.get("enrichment_status") == EnrichmentStatus.PENDING.value:
+        return
+    timestamp = datetime.fromtimestamp(entry.timestamp, tz=timezone.utc)
+    for risk in data.get("risks", []):
+        if diseases and risk["disease"] not in diseases:
+            continue
+        columns["assessment_id"].append(data["assessment_id"])
+        columns["timestamp"].append(timestamp)
+        columns["disease"].append(risk["disease"])
+        columns["risk_level"].append(risk["risk_level"])
+        columns["probability"].append(risk["probability"])
+        columns["contributing_factors"].append(risk["contributing_factors"])
+        columns["prevention_steps"].append(risk["prevention_steps"])
+
+def _write_columns(writer, schema, columns: Dict[str, List[Any]]) -> int:
+    import pyarrow as pa
+
+    n = len(columns["assessment_id"])
+    if n:
+        writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+    return n
+
+def _parse_date(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="Export decrypted assessments to Parquet/Arrow (one row per risk).")
+    parser.add_argument("--out", required=True, help="Output file path")
+    parser.add_argument("--format", choices=["parquet", "arrow"], default="parquet")
+    parser.add_argument("--storage", default="data/assessments.enc", help="Assessment log (first segment)")
+    parser.add_argument("--key", default="data/secret.key", help="Encryption key path")
+    parser.add_argument("--start", type=_parse_date, help="Inclusive start (ISO date/time, UTC if naive)")
+    parser.add_argument("--end", type=_parse_date, help="Exclusive end (ISO date/time, UTC if naive)")
+    parser.add_argument("--disease", action="append", help="Only export this disease (repeatable)")
+    parser.add_argument("--workers", type=int, default=None, help="Processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Records per work unit")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    rows = export_assessments(
+        args.out, storage_path=args.storage, key_path=args.key, start=args.start, end=args.end,
+        diseases=args.disease, workers=args.workers, fmt=args.format, chunk_size=args.chunk_size
+    )
+    print(f"Exported {rows} rows to {args.out} in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import json
+from typing import Any, List, Tuple
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+class IncrementalJSONParser:
+    """
+    Incremental parser for a top-level JSON object streamed in chunks.
+
+    feed() returns each top-level (key, value) member as soon as its value
+    closes, so `{"Hypertension": {...}, "Type 2 Diabetes": {...}}` yields the
+    first disease while the second is still being generated. Text before the
+    opening brace (e.g. a markdown fence) is ignored.
+    """
+    def __init__(self):
+        self._member: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._started = False
+        self._emitted = False
+        self.done = False
+        self.repaired = 0  # Members salvaged by repair_json in finish()
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        members = []
+        for ch in chunk:
+            if self.done:
+                break
+            if not self._started:
+                if ch == "{":
+                    self._started = True
+                    self._depth = 1
+                continue
+
+            if self._in_string:
+                self._member.append(ch)
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    # End of the top-level object: flush a trailing primitive member
+                    self._emit(members)
+                    self.done = True
+                    continue
+                if self._depth == 1:
+                    self._member.append(ch)
+                    self._emit(members)
+                    continue
+            elif ch == "," and self._depth == 1:
+                self._emit(members)
+                self._member = []
+                self._emitted = False
+                continue
+
+            if not self._emitted:
+                self._member.append(ch)
+        return members
+
+    def finish(self) -> List[Tuple[str, Any]]:
+        """
+        Salvages a truncated trailing member (stream ended before it closed).
+        """
+        members = []
+        if not self.done and not self._emitted and "".join(self._member).strip():
+            try:
+                repaired = json.loads(repair_json("{" + "".join(self._member)))
+                members.extend(repaired.items())
+                self.repaired += len(repaired)
+            except ValueError:
+                pass
+        self._member = []
+        self.done = True
+        return members
+
+    def _emit(self, members: List[Tuple[str, Any]]):
+        text = "".join(self._member).strip()
+        if self._emitted or not text:
+            return
+        try:
+            members.extend(json.loads("{" + text + "}").items())
+        except ValueError:
+            pass  # Malformed member: skip it, keep streaming the rest
+        self._emitted = True
+
+def repair_json(text: str) -> str:
+    """
+    Repairs truncated JSON from LLM responses.
+    Closes an open string and all open containers in nesting order; if the
+    tail is still not valid (e.g. a dangling key), falls back to the last
+    complete element before it.
+    """
+    try:
+        json.loads(text)
+        return text
+    except ValueError:
+        pass
+
+    stack: List[str] = []
+    in_string = False
+    escape = False
+    # (cut position, closers needed at that point) for each element boundary
+    boundaries: List[Tuple[int, str]] = []
+
+    for i, ch in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in _CLOSERS:
+            stack.append(_CLOSERS[ch])
+        elif ch in "}]" and stack:
+            stack.pop()
+        elif ch == ",":
+            boundaries.append((i, "".join(reversed(stack))))
+
+    candidate = text + ('"' if in_string else "")
+    candidate = candidate.rstrip()
+    if candidate.endswith(":"):
+        candidate += " null"
+    candidate = candidate.rstrip(",") + "".join(reversed(stack))
+    if _is_valid(candidate):
+        return candidate
+
+    for cut, closers in reversed(boundaries):
+        candidate = text[:cut] + closers
+        if _is_valid(candidate):
+            return candidate
+
+    return text
+
+def _is_valid(text: str) -> bool:
+    try:
+        json.loads(text)
+        return True
+    except ValueError:
+        return False
@@ -1,14 +1,151 @@
 import os
 import json
-from typing import List
-from openai import OpenAI
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
 from dotenv import load_dotenv
-import pandas as pd
-from app.models.schemas import DiseaseRisk, RiskLevel
+from app.models.schemas import ClinicalInput, RiskLevel
+from app.core import metrics
+from app.core.results import Risk
+from app.core.cache import ExplanationCache
+from app.core.json_stream import IncrementalJSONParser, repair_json
+from app.core.llm_transport import CircuitOpenError, LLMTransport
+from app.core.screening import SCREENING_DOMAINS, SIGNALS
+from app.core.structured_log import get_logger
 
 # Load environment variables
 load_dotenv()
 
+# JSON lines, written off the request path (see app/core/structured_log.py)
+log = get_logger("llm")
+
+# OpenAI-compatible endpoint (e.g. a local stub server for load tests)
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://router.huggingface.co/v1")
+
+# "single": one prompt for all diseases. "per_disease": one smaller request per
+# disease in parallel (wall-clock tracks the slowest disease, not the sum).
+LLM_FANOUT = os.getenv("LLM_FANOUT", "single").lower()
+LLM_MAX_PARALLEL = int(os.getenv("LLM_MAX_PARALLEL", "4"))
+LLM_CALL_TIMEOUT_SECONDS = float(os.getenv("LLM_CALL_TIMEOUT_SECONDS", "30"))
+# max_tokens = per-disease estimate x diseases in the prompt, capped at LLM_MAX_TOKENS
+LLM_MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", "4000"))  # 8 diseases × 5 suggestions each
+LLM_MAX_TOKENS_PER_DISEASE = int(os.getenv("LLM_MAX_TOKENS_PER_DISEASE", "500"))  # ~5 structured steps
+# Cap on LLM output tokens per request (0 = no cap). Highest-probability risks
+# are enriched first; the rest keep their clinical templates.
+LLM_TOKEN_BUDGET = int(os.getenv("LLM_TOKEN_BUDGET", "0"))
+
+# Pre-approved advice for LOW-risk domains (never sent to the LLM)
+LOW_RISK_ADVICE = {
+    "Type 2 Diabetes": [
+        "**Keep Moving After Meals**: Take a short walk after your largest meal. *Why*: Active muscles clear glucose efficiently. *Result*: Continued healthy blood sugar.",
+        "**Annual HbA1c Check**: Re-test once a year. *Why*: Early drift is silent. *Result*: Issues caught before they progress.",
+    ],
+    "Hypertension": [
+        "**Keep Sodium in Check**: Favour fresh over processed food. *Why*: Sodium is the main dietary driver of blood pressure. *Result*: Pressure stays in range.",
+        "**Check BP Yearly**: Measure at a pharmacy or clinic once a year. *Why*: Blood pressure rises gradually with age. *Result*: Early detection.",
+    ],
+    "Digital Eye Strain": [
+        "**Maintain the 20-20-20 Rule**: Every 20 minutes, look 20 feet away for 20 seconds. *Why*: Relaxes focusing muscles. *Result*: Comfortable eyes through the day.",
+    ],
+    "Musculoskeletal Disorder Risk": [
+        "**Keep Active**: Stretch neck and back daily. *Why*: Mobility prevents stiffness from building up. *Result*: Continued pain-free posture.",
+    ],
+    "Sleep Deprivation/Disorder": [
+        "**Protect Your Schedule**: Keep 7-8h sleep with a consistent wake time. *Why*: Regularity anchors your body clock. *Result*: Sustained restful sleep.",
+    ],
+    "High Chronic Stress / Burnout": [
+        "**Keep Recovery Habits**: Continue regular breaks and time off screens. *Why*: Recovery buffers future workload peaks. *Result*: Lasting resilience.",
+    ],
+    "Anxiety & Mood Risk": [
+        "**Practice Gratitude/Journaling**: Write three good things each evening. *Why*: Reinforces positive attention. *Result*: Stable mood.",
+    ],
+    "Sedentary Lifestyle Risk": [
+        "**Aim for 150 min/week**: Keep up moderate activity across the week. *Why*: Matches WHO guidance. *Result*: Long-term cardiometabolic protection.",
+    ],
+}
+LOW_RISK_DEFAULT_ADVICE = [
+    "**Maintain Current Habits**: Keep doing what works. *Why*: No significant risk factors were identified. *Result*: Continued good health.",
+]
+
+# Static instructions, sent first and unchanged on every call so providers
+# can reuse their cached prefix; only the user message varies.
+SYSTEM_PROMPT = """You are an elite Preventive Health Consultant. You output STRICT JSON only.
+
+The user message is JSON: "profile" holds the patient fields relevant to their risks (ClinicalInput names; gender 1=male 2=female; numeric measurements are given as ranges, e.g. "hba1c": "5.7-6.4"; q* answers are yes/no screening questions), "risks" lists each disease with its severity and drivers.
+
+For EACH disease in "risks", give exactly 5 concrete prevention/mitigation steps.
+
+Rules:
+1. Deep personalization: never generic ("Exercise more"). Use their profile, e.g. age 18-29 and sedentary -> HIIT or competitive sports; age 60-69 and sedentary -> brisk walking or swimming; sleep under 6h -> magnesium glycinate or blackout curtains. Quote ranges as given, never invent an exact value.
+2. Each step has an action (what to do), a rationale (why it helps THIS user, citing their metrics) and an outcome.
+3. Most impactful first.
+4. Safety: do not diagnose; add simple caveats (e.g. "if knees allow").
+
+Output: one JSON object keyed by disease name, each with a "prevention_steps" array of 5 strings formatted as
+"**[Action Name]**: [Detailed Instruction]. *Why*: [Rationale]. *Result*: [Outcome]."
+Example:
+{"Type 2 Diabetes": {"prevention_steps": ["**Start Post-Meal Walks**: Walk for 10 mins after dinner. *Why*: Your HbA1c is in the 5.7-6.4 range and you sit most of the day. *Result*: Blunted glucose spike.", "..."]}}"""
+
+# Profile fields sent to the LLM per disease (plus age and gender, always).
+# Screening domains send the fields behind their signals.
+DISEASE_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "Type 2 Diabetes": ("bmi", "hba1c", "vigorous_activity", "q2_diabetes_history", "q19_fatigue", "q20_diet"),
+    "Hypertension": ("bmi", "systolic_bp", "cholesterol", "smoker_history", "q1_bp_history", "q3_family_heart",
+                     "q18_breathlessness", "q20_diet"),
+    **{domain["disease"]: tuple(SIGNALS[signal][0] for signal in domain["weights"]) for domain in SCREENING_DOMAINS},
+}
+DISEASE_FIELDS["Digital Eye Strain"] += ("daily_digital_hours",)
+ALWAYS_SENT_FIELDS = ("age", "gender")
+
+# Numeric fields are sent as bands (upper bound exclusive, None = open-ended):
+# the prompt, and so the advice cache key, is shared by every profile in a band
+PROFILE_BANDS: Dict[str, Tuple[Tuple[Optional[float], str], ...]] = {
+    "age": ((30, "18-29"), (40, "30-39"), (50, "40-49"), (60, "50-59"), (70, "60-69"), (None, "70+")),
+    "bmi": ((18.5, "<18.5"), (25, "18.5-24.9"), (30, "25-29.9"), (35, "30-34.9"), (None, "35+")),
+    "sleep_hours": ((6, "<6"), (7, "6-6.9"), (9, "7-8.9"), (None, "9+")),
+    "hba1c": ((5.7, "<5.7"), (6.5, "5.7-6.4"), (None, "6.5+")),
+    "systolic_bp": ((120, "<120"), (130, "120-129"), (140, "130-139"), (160, "140-159"), (None, "160+")),
+    "cholesterol": ((200, "<200"), (240, "200-239"), (None, "240+")),
+    "daily_digital_hours": ((4, "<4"), (8, "4-7.9"), (12, "8-11.9"), (None, "12+")),
+}
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English/JSON with BPE tokenizers
+    return len(text) // 4 + 1
+
+# ClinicalInput is only turned into a dict once an LLM call actually needs it
+Profile = Union[ClinicalInput, dict, None]
+
+def _profile_dict(profile: Profile) -> Optional[dict]:
+    return profile.dict() if isinstance(profile, ClinicalInput) else profile
+
+def _fallback_reason(error: Exception) -> str:
+    # Label for vitalscan_llm_fallbacks_total
+    if isinstance(error, CircuitOpenError):
+        return "circuit_open"
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError)) or "Timeout" in type(error).__name__:
+        return "timeout"
+    if isinstance(error, ValueError):
+        return "unparseable"
+    return "error"
+
+def _band(value: Any, bands: Optional[Tuple[Tuple[Optional[float], str], ...]]) -> Any:
+    if bands is None or value is None or isinstance(value, bool):
+        return value
+    for upper, label in bands:
+        if upper is None or value < upper:
+            return label
+
+def _record_fallback(error: Exception, disease: Optional[str] = None):
+    reason = _fallback_reason(error)
+    metrics.LLM_FALLBACKS.labels(reason).inc()
+    if reason == "circuit_open":
+        return  # Expected during an outage; the breaker logs when it opens
+    log.warning("llm.call_failed", reason=reason, error=str(error) or type(error).__name__,
+                error_type=type(error).__name__, disease=disease)
+
 class LLMService:
     """
     Layer 2: Explanation & Prevention Engine.
@@ -18,103 +155,373 @@ class LLMService:
     def __init__(self):
         # Load API Key from Environment
         self.api_key = os.getenv("HF_TOKEN")
-        self.base_url = "https://router.huggingface.co/v1"
+        self.base_url = LLM_BASE_URL
         self.model_name = "openai/gpt-oss-120b:groq"
+        self.cache = ExplanationCache()
+        self.fanout = LLM_FANOUT
+        self.max_parallel = max(1, LLM_MAX_PARALLEL)
+        self.call_timeout = LLM_CALL_TIMEOUT_SECONDS
+        self.token_budget = LLM_TOKEN_BUDGET
+        self.low_risk_advice = self._build_low_risk_advice()
+        # Bounds per-disease fan-out across all concurrent requests
+        self._semaphore = asyncio.Semaphore(self.max_parallel)
         
+        self.transport: Optional[LLMTransport] = None
         if self.api_key:
-            self.client = OpenAI(
-                base_url=self.base_url,
-                api_key=self.api_key,
-            )
+            # Pooled keep-alive clients + retries, hedging, circuit breaker (app/core/llm_transport.py)
+            self.transport = LLMTransport(self.base_url, self.api_key, call_timeout=self.call_timeout)
+            self.client = self.transport.client
+            self.async_client = self.transport.async_client
         else:
             print("WARNING: No HF_TOKEN found. Using template fallback.")
 
-    def generate_explanation(self, risks: List[DiseaseRisk], user_profile: dict = None) -> List[DiseaseRisk]:
+    def generate_explanation(self, risks: List[Risk], user_profile: Profile = None) -> List[Risk]:
         """
         Enriches risk objects with LLM-generated advice.
         """
-        # Create/Append to debug log
-        def log_debug(msg):
-            with open("server_debug.log", "a", encoding="utf-8") as f:
-                f.write(f"\n[{pd.Timestamp.now()}] {msg}\n")
+        self.enrich(risks, user_profile)
+        return risks
 
+    async def agenerate_explanation(self, risks: List[Risk], user_profile: Profile = None) -> List[Risk]:
+        """
+        Async variant of generate_explanation() for the API event loop.
+        """
+        await self.aenrich(risks, user_profile)
+        return risks
+
+    def enrich(self, risks: List[Risk], user_profile: Profile = None) -> bool:
+        """
+        generate_explanation() in place. Returns False when a risk fell back
+        to template advice because the LLM call failed (the result is
+        degraded and should not be memoized); template mode and the tiered
+        policy are deterministic and count as complete.
+        """
         if not self.api_key:
-            log_debug("ERROR: API Key missing.")
-            return self._template_fallback(risks)
+            log.debug("llm.template_mode")
+            metrics.LLM_FALLBACKS.labels("template_mode").inc()
+            self._template_fallback(risks)
+            return True
+
+        # 1. Tiered policy: LOW -> static advice, over-budget -> templates
+        llm_risks = self._plan_enrichment(risks)
+        if not llm_risks:
+            return True
+        user_profile = _profile_dict(user_profile)
+
+        if self.fanout == "per_disease":
+            return self._generate_per_disease(llm_risks, user_profile)
+
+        # 2. Cache lookup (same risk profile -> same advice)
+        cache_key = self._cache_key(llm_risks, user_profile)
+        advice = self.cache.get(cache_key)
+        if advice is not None:
+            return self._apply_advice(llm_risks, advice)
 
         try:
-            # 1. Build Prompt
-            prompt = self._build_prompt(risks, user_profile)
-            log_debug(f"PROMPT SENT:\n{prompt[:200]}...[truncated]...")
-            
-            # 2. Call Hugging Face API
-            completion = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": "You are an expert Preventive Health Advisor. You output STRICT JSON only."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=0.7,
-                max_tokens=4000  # Increased for 8 diseases × 5 suggestions each
-            )
-            
-            # 3. Parse JSON Response
-            content = completion.choices[0].message.content
-            log_debug(f"RAW RESPONSE:\n{content}")
-            
-            # Clean markdown if model adds it despite instructions
-            content = content.replace("```json", "").replace("```", "").strip()
-            
-            # Repair incomplete JSON (common with long responses)
-            content = self._repair_json(content)
-            
-            advice_map = json.loads(content)
-            
-            # 4. Map back to objects
-            for risk in risks:
-                if risk.disease in advice_map:
-                    data = advice_map[risk.disease]
-                    if "prevention_steps" in data:
-                        risk.prevention_steps = data["prevention_steps"]
-            
-            return risks
+            # 3. Build Prompt & Call Hugging Face API
+            request = self._completion_request(llm_risks, user_profile)
+            with metrics.stage("llm_call"):
+                completion = self.transport.complete(request)
+
+            # 4. Parse JSON Response & map back to objects
+            advice = self._parse_advice(completion.choices[0].message.content)
+            self.cache.set(cache_key, advice)
+            return self._apply_advice(llm_risks, advice)
+
+        except Exception as e:
+            _record_fallback(e)
+            self._template_fallback(llm_risks)
+            return False
+
+    async def aenrich(self, risks: List[Risk], user_profile: Profile = None) -> bool:
+        """
+        Async variant of enrich().
+        """
+        if not self.api_key:
+            log.debug("llm.template_mode")
+            metrics.LLM_FALLBACKS.labels("template_mode").inc()
+            self._template_fallback(risks)
+            return True
+
+        llm_risks = self._plan_enrichment(risks)
+        if not llm_risks:
+            return True
+        user_profile = _profile_dict(user_profile)
+
+        if self.fanout == "per_disease":
+            return await self._agenerate_per_disease(llm_risks, user_profile)
+
+        cache_key = self._cache_key(llm_risks, user_profile)
+        advice = self.cache.get(cache_key)
+        if advice is not None:
+            return self._apply_advice(llm_risks, advice)
+
+        try:
+            request = self._completion_request(llm_risks, user_profile)
+            with metrics.stage("llm_call"):
+                completion = await self.transport.acomplete(request)
+            advice = self._parse_advice(completion.choices[0].message.content)
+            self.cache.set(cache_key, advice)
+            return self._apply_advice(llm_risks, advice)
 
         except Exception as e:
-            log_debug(f"EXCEPTION CAUGHT: {str(e)}")
-            return self._template_fallback(risks)
+            _record_fallback(e)
+            self._template_fallback(llm_risks)
+            return False
+
+    async def astream_explanation(self, risks: List[Risk],
+                                  user_profile: Profile = None) -> AsyncIterator[Tuple[str, List[str]]]:
+        """
+        Streams LLM advice, yielding (disease, prevention_steps) as soon as each
+        disease's JSON object closes. Yields nothing if the LLM is unavailable
+        (callers keep their template advice).
+        """
+        if not self.api_key:
+            log.debug("llm.template_mode")
+            metrics.LLM_FALLBACKS.labels("template_mode").inc()
+            return
+
+        # Only MODERATE/HIGH risks within budget are streamed from the LLM
+        risks = self._plan_enrichment(risks)
+        if not risks:
+            return
+        user_profile = _profile_dict(user_profile)
+
+        if self.fanout == "per_disease":
+            tasks = [asyncio.ensure_future(self._aadvise_one(risk, user_profile)) for risk in risks]
+            try:
+                for done in asyncio.as_completed(tasks):
+                    disease, steps = await done
+                    if steps is not None:
+                        yield disease, steps
+            finally:
+                for task in tasks:
+                    task.cancel()
+            return
+
+        cache_key = self._cache_key(risks, user_profile)
+        advice = self.cache.get(cache_key)
+        if advice is not None:
+            for disease, steps in advice.items():
+                yield disease, list(steps)
+            return
+
+        parser = IncrementalJSONParser()
+        # Only diseases that were asked for; the model occasionally invents others
+        wanted = {risk.disease for risk in risks}
+        advice = {}
+        raw = []
+        stream = None
+        # Timed by hand: a stage span must not stay open across yields
+        started = time.perf_counter()
+        try:
+            request = self._completion_request(risks, user_profile)
+            stream = await self.transport.astream(request)
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                raw.append(delta)
+                for disease, steps in self._collect_advice(parser.feed(delta)).items():
+                    if disease in wanted:
+                        advice[disease] = steps
+                        yield disease, steps
+        except Exception as e:
+            _record_fallback(e)
+            return
+        finally:
+            # Also runs when the client disconnects and the generator is closed early
+            if stream is not None:
+                await stream.close()
+            metrics.STAGE_SECONDS.labels("llm_stream").observe(time.perf_counter() - started)
+            if log.is_enabled(logging.DEBUG):
+                log.debug("llm.response", content="".join(raw), streamed=True)
+
+        # Salvage a truncated final disease
+        for disease, steps in self._collect_advice(parser.finish()).items():
+            if disease in wanted:
+                advice[disease] = steps
+                yield disease, steps
+        if parser.repaired:
+            metrics.JSON_REPAIRS.inc(parser.repaired)
+
+        if advice:
+            self.cache.set(cache_key, advice)
+
+    def _plan_enrichment(self, risks: List[Risk]) -> List[Risk]:
+        """
+        Tiered enrichment policy. LOW risks get the pre-rendered static advice;
+        MODERATE/HIGH risks go to the LLM, highest probability first, until the
+        token budget is used up (the remainder keep their templates).
+        Returns the risks to send to the LLM.
+        """
+        candidates = []
+        for risk in risks:
+            if risk.risk_level == RiskLevel.LOW:
+                risk.prevention_steps = list(self.low_risk_advice.get(risk.disease, LOW_RISK_DEFAULT_ADVICE))
+            else:
+                candidates.append(risk)
+
+        if self.token_budget <= 0:
+            return candidates
+
+        candidates.sort(key=lambda x: x.probability, reverse=True)
+        max_diseases = max(1, self.token_budget // LLM_MAX_TOKENS_PER_DISEASE)
+        self._template_fallback(candidates[max_diseases:])
+        return candidates[:max_diseases]
+
+    def _build_low_risk_advice(self) -> Dict[str, List[str]]:
+        # Rendered once at startup; lookups on the hot path are a dict get
+        return {disease: list(steps) for disease, steps in LOW_RISK_ADVICE.items()}
+
+    def _generate_per_disease(self, risks: List[Risk], user_profile: dict) -> bool:
+        with ThreadPoolExecutor(max_workers=self.max_parallel) as executor:
+            results = list(executor.map(lambda risk: self._advise_one(risk, user_profile), risks))
+        return self._apply_per_disease(risks, results)
+
+    async def _agenerate_per_disease(self, risks: List[Risk], user_profile: dict) -> bool:
+        results = await asyncio.gather(*(self._aadvise_one(risk, user_profile) for risk in risks))
+        return self._apply_per_disease(risks, results)
+
+    def _apply_per_disease(self, risks: List[Risk],
+                           results: List[Tuple[str, Optional[List[str]]]]) -> bool:
+        """True when every disease got LLM advice."""
+        complete = True
+        for risk, (_, steps) in zip(risks, results):
+            if steps is None:
+                self._template_fallback([risk])  # Per-disease fallback
+                complete = False
+            else:
+                risk.prevention_steps = steps
+        return complete
+
+    def _advise_one(self, risk: Risk, user_profile: dict) -> Tuple[str, Optional[List[str]]]:
+        cache_key = self._cache_key([risk], user_profile)
+        advice = self.cache.get(cache_key)
+        if advice is None:
+            try:
+                request = self._completion_request([risk], user_profile)
+                with metrics.stage("llm_call"):
+                    completion = self.transport.complete(request)
+                advice = self._parse_advice(completion.choices[0].message.content)
+                self.cache.set(cache_key, advice)
+            except Exception as e:
+                _record_fallback(e, risk.disease)
+                return risk.disease, None
+        return risk.disease, self._steps_for(risk, advice)
+
+    async def _aadvise_one(self, risk: Risk, user_profile: dict) -> Tuple[str, Optional[List[str]]]:
+        cache_key = self._cache_key([risk], user_profile)
+        advice = self.cache.get(cache_key)
+        if advice is None:
+            try:
+                request = self._completion_request([risk], user_profile)
+                async with self._semaphore:
+                    with metrics.stage("llm_call"):
+                        completion = await asyncio.wait_for(
+                            self.transport.acomplete(request),
+                            timeout=self.call_timeout
+                        )
+                advice = self._parse_advice(completion.choices[0].message.content)
+                self.cache.set(cache_key, advice)
+            except Exception as e:
+                _record_fallback(e, risk.disease)
+                return risk.disease, None
+        return risk.disease, self._steps_for(risk, advice)
+
+    @staticmethod
+    def _steps_for(risk: Risk, advice: Dict[str, List[str]]) -> Optional[List[str]]:
+        # Single-disease replies occasionally rename the key; accept the only entry
+        if risk.disease in advice:
+            return list(advice[risk.disease])
+        if len(advice) == 1:
+            return list(next(iter(advice.values())))
+        metrics.LLM_FALLBACKS.labels("missing_disease").inc()
+        return None
+
+    def _cache_key(self, risks: List[Risk], user_profile: dict) -> str:
+        # Same banded fields as the prompt, so cached advice fits every profile sharing the key
+        return self.cache.make_key(risks, self._relevant_profile(risks, user_profile))
+
+    def _completion_request(self, risks: List[Risk], user_profile: dict,
+                            max_tokens: Optional[int] = None) -> dict:
+        with metrics.stage("llm_prompt_build"):
+            prompt = self._build_prompt(risks, user_profile)
+        if max_tokens is None:
+            # Output scales with the number of diseases (5 steps each)
+            max_tokens = min(LLM_MAX_TOKENS, LLM_MAX_TOKENS_PER_DISEASE * max(1, len(risks)))
+        if self.token_budget > 0:
+            max_tokens = min(max_tokens, self.token_budget)
+        log.debug("llm.prompt", prompt=prompt, prompt_tokens=estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(prompt),
+                  max_tokens=max_tokens)
+
+        return dict(
+            model=self.model_name,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.7,
+            max_tokens=max_tokens
+        )
+
+    def _parse_advice(self, content: str) -> Dict[str, List[str]]:
+        """
+        Parses the LLM reply into {disease: prevention_steps}.
+        Tolerates markdown fences and truncated replies (common with long responses).
+        """
+        log.debug("llm.response", content=content)
+
+        with metrics.stage("llm_parse"):
+            parser = IncrementalJSONParser()
+            advice = self._collect_advice(parser.feed(content) + parser.finish())
+        if parser.repaired:
+            metrics.JSON_REPAIRS.inc(parser.repaired)
+        if not advice:
+            raise ValueError("No prevention_steps found in LLM response")
+        return advice
+
+    @staticmethod
+    def _collect_advice(members: List[Tuple[str, Any]]) -> Dict[str, List[str]]:
+        """
+        Keeps diseases whose "prevention_steps" hold at least one non-empty
+        string; other items (objects, numbers) are dropped, and a disease left
+        without steps keeps its template advice.
+        """
+        advice = {}
+        for disease, data in members:
+            steps = data.get("prevention_steps") if isinstance(data, dict) else None
+            if not isinstance(steps, list):
+                continue
+            steps = [step.strip() for step in steps if isinstance(step, str) and step.strip()]
+            if steps:
+                advice[disease] = steps
+            else:
+                metrics.LLM_FALLBACKS.labels("invalid_steps").inc()
+        return advice
+
+    def _apply_advice(self, risks: List[Risk], advice: Dict[str, List[str]]) -> bool:
+        """True when the advice covered every disease."""
+        complete = True
+        for risk in risks:
+            if risk.disease in advice:
+                risk.prevention_steps = list(advice[risk.disease])
+            else:
+                metrics.LLM_FALLBACKS.labels("missing_disease").inc()
+                self._template_fallback([risk])
+                complete = False
+
+        return complete
     
     def _repair_json(self, text: str) -> str:
         """
         Repairs common JSON truncation issues from LLM responses.
         """
-        # If already valid, return as-is
-        try:
-            json.loads(text)
-            return text
-        except:
-            pass
-        
-        # Close unterminated strings
-        if text.count('"') % 2 != 0:
-            text += '"'
-        
-        # Close unterminated arrays
-        open_brackets = text.count('[') - text.count(']')
-        text += ']' * open_brackets
-        
-        # Close unterminated objects
-        open_braces = text.count('{') - text.count('}')
-        text += '}' * open_braces
-        
-        return text
+        return repair_json(text)
 
-    def _template_fallback(self, risks: List[DiseaseRisk]) -> List[DiseaseRisk]:
+    def _template_fallback(self, risks: List[Risk]) -> List[Risk]:
         """
         Robust fallback using pre-approved clinical text templates.
         Updated to match the 5-item, structured format regarding Action, Rationale, and Outcome.
@@ -123,7 +530,9 @@ class LLMService:
             if not risk.contributing_factors:
                 continue
 
-            if risk.disease == "Type 2 Diabetes":
+            if risk.risk_level == RiskLevel.LOW:
+                risk.prevention_steps = list(self.low_risk_advice.get(risk.disease, LOW_RISK_DEFAULT_ADVICE))
+            elif risk.disease == "Type 2 Diabetes":
                 risk.prevention_steps = [
                     "**Initiate 'Walking Prescriptions'**: Walk for 15 minutes immediately after lunch and dinner. *Why*: Muscle activity burns glucose without insulin. *Result*: Lower post-meal blood sugar.",
                     "**Optimize Carbohydrate Timing**: Eat carbs only *after* vegetables and protein in your meal. *Why*: Fiber blunts the sugar spike. *Result*: Stable energy levels.",
@@ -151,57 +560,28 @@ class LLMService:
             
         return risks
 
-    def _build_prompt(self, risks: List[DiseaseRisk], profile: dict) -> str:
+    def _build_prompt(self, risks: List[Risk], profile: dict) -> str:
         """
-        Constructs a deeply personalized system prompt for Hugging Face/GLM-4.
+        User message: minified JSON with the risks and only the profile fields
+        relevant to them (instructions live in SYSTEM_PROMPT).
         """
-        risk_summary = []
-        for r in risks:
-            risk_summary.append({
-                "disease": r.disease,
-                "severity": r.risk_level,
-                "drivers": r.contributing_factors
-            })
-
-        profile_str = json.dumps(profile, indent=2) if profile else "Unknown Profile"
-
-        return f"""
-        You are an elite Preventive Health Consultant. Your goal is to provide highly personalized, life-changing advice.
+        risk_summary = [
+            {"disease": r.disease, "severity": r.risk_level, "drivers": r.contributing_factors}
+            for r in risks
+        ]
+        payload = {"profile": self._relevant_profile(risks, profile), "risks": risk_summary}
+        return json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
 
-        ### 1. PATIENT PROFILE
-        {profile_str}
-
-        ### 2. IDENTIFIED RISKS
-        {json.dumps(risk_summary, indent=2)}
-
-        ### 3. YOUR TASK
-        For EACH disease listed above, generate exactly **5 Concrete, Prevention/Mitigation Steps**.
-        
-        ### 4. CRITICAL RULES (Strict Adherence Required)
-        1. **Deep Personalization**: Do NOT say "Exercise more". Look at their specific profile. 
-           - If Age=25 and Sedentary: Suggest "HIIT or Competitive Sports".
-           - If Age=60 and Sedentary: Suggest "Brisk Walking or Swimming".
-           - If Sleep=5h: Suggest "Magnesium glycinate or Blackout curtains".
-        2. **Structure**: Each suggestion must contain:
-           - **Action**: What strictly to do.
-           - **Rationale**: Why this helps THIS specific user (mention their metrics).
-           - **Outcome**: What will improve.
-        3. **Sort Order**: Most impactful first.
-        4. **Safety**: Do not diagnosis. Add simple caveats (e.g. "if knees allow").
-
-        ### 5. OUTPUT FORMAT
-        Return STRICT JSON only. The "prevention_steps" array must contain strings formatted like:
-        "**[Action Name]**: [Detailed Instruction]. *Why*: [Rationale]. *Result*: [Outcome]."
-
-        Example JSON Structure:
-        {{
-            "Type 2 Diabetes": {{
-                "prevention_steps": [
-                    "**Start Post-Meal Walks**: Walk for 10 mins after dinner. *Why*: Your HbA1c is 5.8 and you sit 8h/day. *Result*: Blunted glucose spike.",
-                    "**Swap Latex Focus**: ...",
-                    ... (5 items)
-                ]
-            }},
-            ...
-        }}
-        """
+    @staticmethod
+    def _relevant_profile(risks: List[Risk], profile: Optional[dict]) -> dict:
+        """The profile as sent to the LLM: fields relevant to the risks, numbers banded."""
+        if not profile:
+            return {}
+        fields = set(ALWAYS_SENT_FIELDS)
+        for r in risks:
+            if r.disease not in DISEASE_FIELDS:
+                fields = set(profile)  # Unmapped disease: send everything
+                break
+            fields.update(DISEASE_FIELDS[r.disease])
+        # Profile order, so identical inputs give identical prompts
+        return {name: _band(value, PROFILE_BANDS.get(name)) for name, value in profile.items() if name in fields}
@@ -0,0 +1,313 @@
+"""
+HTTP transport policy for the OpenAI-compatible LLM endpoint.
+
+LLMTransport owns the sync and async SDK clients (one pooled keep-alive
+httpx client each) and wraps every chat completion in:
+
+1. a circuit breaker: after LLM_BREAKER_FAILURES consecutive provider
+   failures, calls fail immediately with CircuitOpenError (callers fall back
+   to templates) until a probe succeeds after LLM_BREAKER_RESET_SECONDS;
+2. retries on 429/5xx and connection errors with full-jitter exponential
+   backoff (Retry-After honoured), within the LLM_CALL_TIMEOUT_SECONDS budget:
+   every attempt only gets the time left before that deadline;
+3. optional hedging (async only): when an attempt is slower than the
+   LLM_HEDGE_PERCENTILE of recent latencies, a second identical request is
+   sent and the first reply wins.
+
+The SDK's own retries are disabled so the policy lives in one place.
+Try it against benchmarks/stub_llm.py (see benchmarks/bench_transport.py).
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+from app.core import metrics
+from app.core.structured_log import get_logger
+
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "16"))
+LLM_KEEPALIVE_SECONDS = float(os.getenv("LLM_KEEPALIVE_SECONDS", "30"))
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "false").lower() in ("1", "true", "yes")
+LLM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "5"))
+LLM_READ_TIMEOUT_SECONDS = float(os.getenv("LLM_READ_TIMEOUT_SECONDS", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", "0.25"))
+LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", "4"))
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0"))  # e.g. 95 (0 = off)
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))  # 0 = off
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+
+RETRIES = metrics.REGISTRY.counter(
+    "vitalscan_llm_retries_total", "LLM attempts retried after a transient failure.", ["reason"])
+HEDGES = metrics.REGISTRY.counter(
+    "vitalscan_llm_hedges_total", "Hedged LLM requests sent (second request after a slow first one).")
+BREAKER_OPENED = metrics.REGISTRY.counter(
+    "vitalscan_llm_circuit_opened_total", "Times the LLM circuit breaker opened.")
+
+log = get_logger("llm.transport")
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the provider while the circuit is open."""
+
+class CircuitBreaker:
+    """
+    closed -> open after `failure_threshold` consecutive failures; open ->
+    half-open after `reset_seconds` (a single probe call is let through);
+    the probe's outcome closes or re-opens it.
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = LLM_BREAKER_FAILURES, reset_seconds: float = LLM_BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_started: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        if self.failure_threshold <= 0:
+            return True
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            now = time.monotonic()
+            if self.state == self.OPEN and now - self.opened_at >= self.reset_seconds:
+                self.state = self.HALF_OPEN
+                self._probe_started = None
+            # One probe at a time; a probe that never reported back (cancelled) is replaced
+            if self.state == self.HALF_OPEN and (self._probe_started is None
+                                                 or now - self._probe_started >= self.reset_seconds):
+                self._probe_started = now
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                log.info("llm.circuit_closed")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_started = None
+
+    def record_failure(self):
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._probe_started = None
+                BREAKER_OPENED.inc()
+                log.warning("llm.circuit_open", consecutive_failures=self.failures,
+                            retry_in_seconds=self.reset_seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"state": self.state, "consecutive_failures": self.failures}
+
+class LatencyWindow:
+    """Recent successful attempt latencies, for the hedging threshold."""
+    def __init__(self, size: int = 256):
+        self._samples: deque = deque(maxlen=size)
+
+    def add(self, seconds: float):
+        self._samples.append(seconds)
+
+    def percentile(self, pct: float, min_samples: int) -> Optional[float]:
+        if len(self._samples) < max(1, min_samples):
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def _failure_kind(error: BaseException) -> Optional[str]:
+    """
+    "rate_limited" / "server_error" / "connection" for retryable failures,
+    "timeout" for timeouts (not retried, but they count against the breaker),
+    None for everything else (bad request, auth, ...).
+    """
+    import openai
+
+    if isinstance(error, (openai.APITimeoutError, asyncio.TimeoutError, TimeoutError)):
+        return "timeout"
+    if isinstance(error, openai.APIConnectionError):
+        return "connection"
+    status = getattr(error, "status_code", None)
+    if status == 429:
+        return "rate_limited"
+    if status is not None and status >= 500:
+        return "server_error"
+    return None
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("retry-after")) if response is not None else None
+    except (TypeError, ValueError):
+        return None
+
+class LLMTransport:
+    def __init__(self, base_url: str, api_key: str, call_timeout: float = LLM_READ_TIMEOUT_SECONDS,
+                 pool_size: int = LLM_POOL_SIZE, max_retries: int = LLM_MAX_RETRIES,
+                 hedge_percentile: float = LLM_HEDGE_PERCENTILE,
+                 breaker: Optional[CircuitBreaker] = None):
+        # Imported here: the SDK alone takes ~0.7s, wasted in Template Mode
+        import httpx
+        from openai import OpenAI, AsyncOpenAI
+
+        self.call_timeout = call_timeout
+        self.attempt_timeout = min(call_timeout, LLM_READ_TIMEOUT_SECONDS)
+        self.max_retries = max(0, max_retries)
+        self.hedge_percentile = hedge_percentile
+        self.breaker = breaker or CircuitBreaker()
+        self.latencies = LatencyWindow()
+
+        http2 = LLM_HTTP2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                print("WARNING: LLM_HTTP2 needs the h2 package (pip install httpx[http2]). Using HTTP/1.1.")
+                http2 = False
+        limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size,
+                              keepalive_expiry=LLM_KEEPALIVE_SECONDS)
+        timeout = httpx.Timeout(self.attempt_timeout, connect=LLM_CONNECT_TIMEOUT_SECONDS)
+
+        self.client = OpenAI(base_url=base_url, api_key=api_key, max_retries=0,
+                             http_client=httpx.Client(limits=limits, timeout=timeout, http2=http2))
+        # Async client for the API (does not block the event loop)
+        self.async_client = AsyncOpenAI(base_url=base_url, api_key=api_key, max_retries=0,
+                                        http_client=httpx.AsyncClient(limits=limits, timeout=timeout, http2=http2))
+
+    # --- Sync ---
+
+    def complete(self, request: dict):
+        deadline = time.monotonic() + self.call_timeout
+        for attempt in range(self.max_retries + 1):
+            timeout = self._remaining(deadline)
+            self._check_breaker()
+            started = time.monotonic()
+            try:
+                return self._record(started, self.client.chat.completions.create(**request, timeout=timeout))
+            except Exception as e:
+                delay = self._on_failure(e, attempt, deadline)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+
+    # --- Async ---
+
+    async def acomplete(self, request: dict):
+        deadline = time.monotonic() + self.call_timeout
+        for attempt in range(self.max_retries + 1):
+            timeout = self._remaining(deadline)
+            self._check_breaker()
+            try:
+                # wait_for bounds the whole attempt (hedge included), not each socket read
+                return await asyncio.wait_for(self._hedged(request, timeout), timeout=timeout)
+            except Exception as e:
+                delay = self._on_failure(e, attempt, deadline)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+
+    async def astream(self, request: dict):
+        """
+        Opens a streaming completion. Retries cover opening the stream only
+        (status errors surface before the first chunk); no hedging.
+        """
+        deadline = time.monotonic() + self.call_timeout
+        for attempt in range(self.max_retries + 1):
+            timeout = self._remaining(deadline)
+            self._check_breaker()
+            try:
+                stream = await asyncio.wait_for(
+                    self.async_client.chat.completions.create(**request, stream=True, timeout=timeout), timeout=timeout)
+                self.breaker.record_success()
+                return stream
+            except Exception as e:
+                delay = self._on_failure(e, attempt, deadline)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+
+    async def _attempt(self, request: dict, timeout: float):
+        started = time.monotonic()
+        return self._record(started, await self.async_client.chat.completions.create(**request, timeout=timeout))
+
+    async def _hedged(self, request: dict, timeout: float):
+        threshold = (self.latencies.percentile(self.hedge_percentile, LLM_HEDGE_MIN_SAMPLES)
+                     if self.hedge_percentile > 0 else None)
+        if threshold is None:
+            return await self._attempt(request, timeout)
+
+        first = asyncio.ensure_future(self._attempt(request, timeout))
+        done, _ = await asyncio.wait({first}, timeout=threshold)
+        if done:
+            return first.result()
+
+        HEDGES.inc()
+        pending = {first, asyncio.ensure_future(self._attempt(request, timeout))}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    # --- Policy ---
+
+    def _record(self, started: float, completion):
+        self.latencies.add(time.monotonic() - started)
+        self.breaker.record_success()
+        return completion
+
+    def _remaining(self, deadline: float) -> float:
+        """
+        Timeout for the next attempt: the client timeout, capped by what is
+        left of the budget (raises once it is spent; not a provider failure).
+        """
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError("LLM call budget exhausted")
+        return min(self.attempt_timeout, remaining)
+
+    def _check_breaker(self):
+        if not self.breaker.allow():
+            raise CircuitOpenError("LLM circuit open (provider failing), skipping call")
+
+    def _on_failure(self, error: Exception, attempt: int, deadline: float) -> Optional[float]:
+        """Records the failure; returns the backoff before the next attempt, or None to give up."""
+        kind = _failure_kind(error)
+        if kind is None:
+            return None
+        self.breaker.record_failure()
+        if kind == "timeout" or attempt >= self.max_retries:
+            return None
+        # Full jitter: uniform in [0, min(cap, base * 2^attempt)]
+        delay = random.uniform(0, min(LLM_RETRY_MAX_SECONDS, LLM_RETRY_BASE_SECONDS * 2 ** attempt))
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, LLM_RETRY_MAX_SECONDS))
+        if time.monotonic() + delay >= deadline:
+            return None
+        RETRIES.labels(kind).inc()
+        return delay
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.breaker.stats()
+        stats["hedge_threshold_seconds"] = (self.latencies.percentile(self.hedge_percentile, LLM_HEDGE_MIN_SAMPLES)
+                                            if self.hedge_percentile > 0 else None)
+        return stats
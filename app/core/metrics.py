@@ -0,0 +1,334 @@
+"""
+Hot-path instrumentation: stage timings, counters and the Prometheus
+text exposition served on /metrics.
+
+Stages are timed with `with metrics.stage("feature_build"):` and recorded
+in the `vitalscan_stage_seconds` histogram. Values owned by other
+components (cache hit counters, storage queue depth) are read at scrape
+time through collectors, so they cost nothing per request.
+
+With VITALSCAN_OTEL_TRACES=true every stage is also an OpenTelemetry span
+(requires opentelemetry-api; spans are exported over OTLP when
+opentelemetry-sdk and opentelemetry-exporter-otlp are installed, configured
+by the standard OTEL_EXPORTER_OTLP_* variables, unless the app already runs
+under `opentelemetry-instrument`).
+"""
+
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from starlette.routing import Mount
+
+METRICS_ENABLED = os.getenv("VITALSCAN_METRICS", "true").lower() in ("1", "true", "yes")
+OTEL_TRACES = os.getenv("VITALSCAN_OTEL_TRACES", "false").lower() in ("1", "true", "yes")
+OTEL_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "vitalscan-api")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Seconds: screening rules take ~10us, an LLM call several seconds
+STAGE_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# (name, type, help, [(labels, value), ...]) produced by a collector at scrape time
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+class _CounterValue:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+class _HistogramValue:
+    __slots__ = ("buckets", "counts", "sum", "_lock")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot: +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+class _Metric(ABC):
+    """
+    Metric family with optional labels (prometheus_client-style API:
+    `family.labels("x").inc()`, or `family.inc()` without labels).
+    """
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self.labels()  # Exported as 0 before the first event
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    @abstractmethod
+    def _new_child(self):
+        """Value holder for one label set."""
+
+    def _label_text(self, values: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{k}="{_escape(v)}"' for k, v in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+    @abstractmethod
+    def _render_child(self, values: Tuple[str, ...], child) -> List[str]:
+        """Exposition lines for one label set."""
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _CounterValue:
+        return _CounterValue()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def _render_child(self, values, child: _CounterValue) -> List[str]:
+        return [f"{self.name}{self._label_text(values)} {_number(child.value)}"]
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = STAGE_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def _render_child(self, values, child: _HistogramValue) -> List[str]:
+        with child._lock:
+            counts, total = list(child.counts), child.sum
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            le = 'le="%s"' % _number(bound)
+            lines.append(f"{self.name}_bucket{self._label_text(values, le)} {cumulative}")
+        lines.append(f"{self.name}_sum{self._label_text(values)} {_number(total)}")
+        lines.append(f"{self.name}_count{self._label_text(values)} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    """
+    Metrics owned by this module plus collectors registered by components
+    (called on every scrape; a failing collector is skipped).
+    """
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[Family]]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = STAGE_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector: Callable[[], Iterable[Family]]):
+        self._collectors.append(collector)
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Prometheus text exposition format (0.0.4)."""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                families = list(collector())
+            except Exception as e:
+                print(f"WARNING: Metrics collector {getattr(collector, '__name__', collector)} failed: {e}")
+                continue
+            for name, kind, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+                    lines.append(f"{name}{{{label_text}}} {_number(value)}" if labels else f"{name} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "vitalscan_stage_seconds", "Time spent per request pipeline stage.", ["stage"])
+REQUEST_SECONDS = REGISTRY.histogram(
+    "vitalscan_http_request_seconds", "HTTP request latency by route.", ["method", "route", "status"])
+LLM_FALLBACKS = REGISTRY.counter(
+    "vitalscan_llm_fallbacks_total", "Risks that kept template advice instead of LLM advice.", ["reason"])
+JSON_REPAIRS = REGISTRY.counter(
+    "vitalscan_llm_json_repairs_total", "Truncated LLM replies salvaged by JSON repair.")
+
+# --- Tracing ---
+
+def _init_tracer():
+    if not OTEL_TRACES:
+        return None
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        print("WARNING: VITALSCAN_OTEL_TRACES is set but opentelemetry-api is not installed. Tracing disabled.")
+        return None
+    if isinstance(trace.get_tracer_provider(), trace.ProxyTracerProvider):
+        # Not launched via opentelemetry-instrument: export over OTLP ourselves
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+            from opentelemetry.sdk.resources import Resource
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        except ImportError:
+            print("WARNING: opentelemetry-sdk/opentelemetry-exporter-otlp not installed. Spans are not exported.")
+        else:
+            provider = TracerProvider(resource=Resource.create({"service.name": OTEL_SERVICE_NAME}))
+            provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+            trace.set_tracer_provider(provider)
+    return trace.get_tracer("vitalscan")
+
+TRACER = _init_tracer()
+
+# --- Stage timing ---
+
+class _Stage:
+    __slots__ = ("_histogram", "_name", "_started", "_span")
+
+    def __init__(self, histogram: _HistogramValue, name: str):
+        self._histogram = histogram
+        self._name = name
+        self._span = None
+
+    def __enter__(self) -> "_Stage":
+        if TRACER is not None:
+            self._span = TRACER.start_as_current_span(self._name)
+            self._span.__enter__()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._histogram.observe(time.perf_counter() - self._started)
+        if self._span is not None:
+            self._span.__exit__(exc_type, exc, tb)
+
+class _NoStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+_NO_STAGE = _NoStage()
+
+def stage(name: str):
+    """Context manager timing one pipeline stage (and tracing it, if enabled)."""
+    if not METRICS_ENABLED:
+        return _NO_STAGE
+    return _Stage(STAGE_SECONDS.labels(name), name)
+
+# Set by MetricsMiddleware when the request arrives
+_request_started: ContextVar[Optional[float]] = ContextVar("vitalscan_request_started", default=None)
+
+def observe_since_request(name: str):
+    """
+    Records the time from request arrival until now as stage `name`; called
+    first thing in a handler, this covers body read, JSON parsing and
+    ClinicalInput validation.
+    """
+    started = _request_started.get()
+    if started is not None:
+        STAGE_SECONDS.labels(name).observe(time.perf_counter() - started)
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: per-route request latency histogram (route templates,
+    not raw paths, so assessment ids do not explode the label set) and the
+    request start time for observe_since_request().
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        token = _request_started.set(started)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_started.reset(token)
+            REQUEST_SECONDS.labels(scope["method"], _route_template(scope), str(status["code"])).observe(
+                time.perf_counter() - started)
+
+def _route_template(scope) -> str:
+    """
+    "/api/v1/assess/{assessment_id}/advice" for "/api/v1/assess/3f2c.../advice":
+    path parameters are put back in place of their values.
+    """
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+    if isinstance(route, Mount):
+        return route.path  # e.g. /static, not one series per file
+    segments = scope["path"].split("/")
+    for name, value in scope.get("path_params", {}).items():
+        for i in range(len(segments) - 1, -1, -1):
+            if segments[i] == str(value):
+                segments[i] = "{" + name + "}"
+                break
+    return "/".join(segments)
@@ -1,205 +1,90 @@
 import pickle
 import numpy as np
-import pandas as pd
 import os
-from typing import List
-from app.models.schemas import ClinicalInput, DiseaseRisk, RiskLevel
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+from app.models.schemas import ClinicalInput, RiskLevel
+from app.core import metrics
 from app.core.llm_service import LLMService
+from app.core.cache import ResultCache
+from app.core.concurrency import InferencePool
+from app.core.model_bundle import MODEL_BUNDLE
+from app.core.model_registry import ModelRegistry, ModelVersion, MODEL_DIR
+from app.core.results import Risk
+from app.core.risk_engine import (
+    FEATURE_COLUMNS, EvaluatorPipeline, EvaluatorResult, FeatureBatch, PipelineResult, RiskEvaluator,
+    register_evaluator,
+)
 
-class MLRiskEngine:
-    def __init__(self, model_dir: str = "ml/models"):
-        self.model_dir = model_dir
-        self.scaler = self._load_model("scaler.pkl")
-        self.diabetes_model = self._load_model("diabetes_model.pkl")
-        self.hyper_model = self._load_model("hypertension_model.pkl")
-        self.llm_service = LLMService() # Initialize with defaults (Template Mode)
-        
-    def _load_model(self, filename: str):
-        path = os.path.join(self.model_dir, filename)
-        if not os.path.exists(path):
-            raise FileNotFoundError(f"Model {filename} not found. Train models first.")
-        with open(path, "rb") as f:
-            return pickle.load(f)
+@register_evaluator("ml_models")
+class ModelEvaluator(RiskEvaluator):
+    """
+    Layer 1 NHANES models, scored with the version the batch pins or else
+    the one the registry selects (A/B split), on the (N, 9) feature matrix.
+    """
+    # (disease, predictor, key driver field, driver threshold)
+    DISEASES = [
+        ("Type 2 Diabetes", "diabetes_model", "hba1c", 6.0),
+        ("Hypertension", "hypertension_model", "systolic_bp", 130),
+    ]
+    _drivers = [driver for _, _, driver, _ in DISEASES]
+    _driver_thresholds = np.array([threshold for _, _, _, threshold in DISEASES], dtype=np.float64)
+    _predict_stages = {key: f"predict_proba.{key}" for _, key, _, _ in DISEASES}
 
-    def assess(self, input_data: ClinicalInput) -> List[DiseaseRisk]:
-        # 1. Prepare Feature Vector (Order matters! Must match training)
-        # Features: ['RIDAGEYR', 'RIAGENDR', 'BMXBMI', 'BPXSY1', 'LBXGH', 'LBXTC', 'PAQ650', 'SLD010H', 'SMQ020']
-        
-        # Mapping input to NHANES codes
-        features = np.array([[
-            input_data.age,
-            input_data.gender.value,
-            input_data.bmi,
-            input_data.systolic_bp,
-            input_data.hba1c,
-            input_data.cholesterol,
-            1 if input_data.vigorous_activity else 2, # Yes=1, No=2
-            input_data.sleep_hours,
-            1 if input_data.smoker_history else 2
-        ]])
-        
-        # 2. Scale
-        features_scaled = self.scaler.transform(features)
-        
-        results = []
-        
-        # 3. Predict Diabetes
-        diab_prob = self.diabetes_model.predict_proba(features_scaled)[0][1]
-        results.append(self._build_risk("Type 2 Diabetes", diab_prob, input_data, "hba1c", 6.0))
-
-        # 4. Predict Hypertension
-        hyper_prob = self.hyper_model.predict_proba(features_scaled)[0][1]
-        results.append(self._build_risk("Hypertension", hyper_prob, input_data, "systolic_bp", 130))
-        
-        # 5. Calculate 20-Question Screening Score
-        screening_risks = self._calculate_screening_score(input_data)
-        results.extend(screening_risks)
-
-        # 6. Layer 2: Narrative Enrichment (LLM/Template)
-        results = self.llm_service.generate_explanation(results, user_profile=input_data.dict())
-        
-        # 7. Sort by Probability (Descending) - High Risk First
-        results.sort(key=lambda x: x.probability, reverse=True)
-        
-        return results
+    def __init__(self, registry: ModelRegistry, **context):
+        self.registry = registry
 
-    def _calculate_screening_score(self, data: ClinicalInput) -> List[DiseaseRisk]:
-        """
-        Splits the 20-Question Input into specific Risk Domains.
-        Returns a list of DiseaseRisk objects for every domain with elevated risk.
-        """
-        all_new_risks = []
-        
-        # --- 1. Digital Eye Strain ---
-        # Q4 (Dry Eyes), Q5 (Headaches)
-        eye_score = sum([data.q4_dry_eyes, data.q5_headaches])
-        if eye_score > 0:
-            all_new_risks.append(DiseaseRisk(
-                disease="Digital Eye Strain",
-                risk_level=RiskLevel.MODERATE if eye_score == 1 else RiskLevel.HIGH,
-                probability=0.65 if eye_score == 1 else 0.85,
-                contributing_factors=["Frequent Headaches", "Dry/Tired Eyes"],
-                prevention_steps=["Follow 20-20-20 Rule.", "Blink more often."]
-            ))
-        else:
-             all_new_risks.append(DiseaseRisk(
-                disease="Digital Eye Strain",
-                risk_level=RiskLevel.LOW,
-                probability=0.10,
-                contributing_factors=["No major symptoms reported"],
-                prevention_steps=["Maintain good screen habits."]
-            ))
-
-        # --- 2. Musculoskeletal (Back/Neck) ---
-        # Q6 (Neck), Q7 (Back)
-        msd_score = sum([data.q6_neck_pain, data.q7_back_pain])
-        if msd_score > 0:
-            all_new_risks.append(DiseaseRisk(
-                disease="Musculoskeletal Disorder Risk",
-                risk_level=RiskLevel.HIGH if msd_score == 2 else RiskLevel.MODERATE,
-                probability=0.75,
-                contributing_factors=["Neck Stiffness", "Lower Back Pain"],
-                prevention_steps=["Ergonomic Audit", "Daily Stretching"]
-            ))
-        else:
-            all_new_risks.append(DiseaseRisk(
-                disease="Musculoskeletal Disorder Risk",
-                risk_level=RiskLevel.LOW,
-                probability=0.10,
-                contributing_factors=["Good posture indicators"],
-                prevention_steps=["Keep active to prevent future issues."]
-            ))
-
-        # --- 3. Sleep Disorders ---
-        # Q10 (<7h), Q11 (Insomnia), Q16 (Phone Bedtime)
-        sleep_score = 0
-        factors = []
-        if data.sleep_hours < 7: sleep_score += 1; factors.append("Low Sleep Duration")
-        if data.q11_insomnia: sleep_score += 2; factors.append("Insomnia Symptoms")
-        if data.q16_phone_bedtime: sleep_score += 1; factors.append("Blue Light Exposure")
-        
-        if sleep_score >= 2:
-            all_new_risks.append(DiseaseRisk(
-                disease="Sleep Deprivation/Disorder",
-                risk_level=RiskLevel.HIGH if sleep_score >= 3 else RiskLevel.MODERATE,
-                probability=0.80,
-                contributing_factors=factors,
-                prevention_steps=["Digital Sunset (No phones 1h before bed)", "Consistent Wake Time"]
-            ))
-        else:
-             all_new_risks.append(DiseaseRisk(
-                disease="Sleep Deprivation/Disorder",
-                risk_level=RiskLevel.LOW,
-                probability=0.15,
-                contributing_factors=["Good sleep hygiene"],
-                prevention_steps=["Maintain 7-8h sleep schedule."]
-            ))
-
-        # --- 4. Mental Wellbeing (Stress/Burnout/Anxiety) ---
-        # Q12 (Overwhelmed), Q13 (Drained), Q14 (Anxious), Q15 (Anhedonia), Q17 (Net Anxiety)
-        stress_score = sum([data.q12_overwhelmed, data.q13_drained])
-        anxiety_score = sum([data.q14_anxious, data.q15_anhedonia, data.q17_internet_anxiety])
-        
-        if stress_score >= 1:
-             all_new_risks.append(DiseaseRisk(
-                disease="High Chronic Stress / Burnout",
-                risk_level=RiskLevel.HIGH if stress_score == 2 else RiskLevel.MODERATE,
-                probability=0.70,
-                contributing_factors=["Feeling Overwhelmed", "Emotional Exhaustion"],
-                prevention_steps=["Mindfulness Breaks", "Work-Life Boundaries"]
-            ))
-        else:
-             all_new_risks.append(DiseaseRisk(
-                disease="High Chronic Stress / Burnout",
-                risk_level=RiskLevel.LOW,
-                probability=0.10,
-                contributing_factors=["Balanced emotional state"],
-                prevention_steps=["Continue stress management practices."]
-            ))
-            
-        if anxiety_score >= 2:
-             all_new_risks.append(DiseaseRisk(
-                disease="Anxiety & Mood Risk",
-                risk_level=RiskLevel.MODERATE,
-                probability=0.60,
-                contributing_factors=["Nervousness", "Digital Dependency"],
-                prevention_steps=["Digital Detox", "Professional Counseling"]
-            ))
-        else:
-             all_new_risks.append(DiseaseRisk(
-                disease="Anxiety & Mood Risk",
-                risk_level=RiskLevel.LOW,
-                probability=0.10,
-                contributing_factors=["Stable mood indicators"],
-                prevention_steps=["Practice gratitude/journaling."]
-            ))
-
-        # --- 5. Sedentary Lifestyle ---
-        # Q8 (>6h Sit), Q9 (Inactive)
-        sed_score = 0
-        if data.q8_sedentary: sed_score += 1
-        if not data.vigorous_activity: sed_score += 1
-        
-        if sed_score >= 1:
-            all_new_risks.append(DiseaseRisk(
-                disease="Sedentary Lifestyle Risk",
-                risk_level=RiskLevel.HIGH if sed_score == 2 else RiskLevel.MODERATE,
-                probability=0.65,
-                contributing_factors=["Prolonged Sitting", "Low Activity"],
-                prevention_steps=["Standing Desk", "Hourly Movement Snacks"]
-            ))
-        else:
-             all_new_risks.append(DiseaseRisk(
-                disease="Sedentary Lifestyle Risk",
-                risk_level=RiskLevel.LOW,
-                probability=0.20,
-                contributing_factors=["Active lifestyle"],
-                prevention_steps=["Aim for 150min moderate activity/week."]
-            ))
+    def evaluate(self, batch: FeatureBatch) -> "ModelRisks":
+        model = batch.model or self.registry.select()
+        started = time.perf_counter()
+        features = batch.nhanes
+        # Scale once for the whole batch (legacy pickles only; bundles take raw features)
+        features_scaled = None
+        if model.scaler is not None:
+            with metrics.stage("scaling"):
+                features_scaled = model.scaler.transform(features)
+
+        # One predict_proba call per model
+        probabilities = {}
+        for _, key, _, _ in self.DISEASES:
+            with metrics.stage(self._predict_stages[key]):
+                probabilities[key] = self._predict(model.predictors[key], features, features_scaled)
+        model.record(time.perf_counter() - started, len(batch), probabilities)
+
+        drivers_high = batch.matrix(self._drivers) > self._driver_thresholds
+        return ModelRisks(
+            np.column_stack([probabilities[key] for _, key, _, _ in self.DISEASES]),
+            drivers_high, batch.column("bmi") > 30,
+        )
+
+    @staticmethod
+    def _predict(model, features: np.ndarray, features_scaled: np.ndarray) -> np.ndarray:
+        if getattr(model, "takes_raw_features", False):
+            return model.predict_proba(features)[:, 1]
+        return model.predict_proba(features_scaled)[:, 1]
+
+class ModelRisks(EvaluatorResult):
+    diseases = [disease for disease, _, _, _ in ModelEvaluator.DISEASES]
+    _driver_labels = [f"Elevated {driver.replace('_', ' ').title()}" for _, _, driver, _ in ModelEvaluator.DISEASES]
+
+    def __init__(self, probabilities: np.ndarray, drivers_high: np.ndarray, high_bmi: np.ndarray):
+        self._probabilities = probabilities
+        self.drivers_high = drivers_high
+        self.high_bmi = high_bmi
 
-        return all_new_risks
+    def probabilities(self) -> np.ndarray:
+        return np.round(self._probabilities, 2)
 
-    def _build_risk(self, name: str, prob: float, data: ClinicalInput, key_driver: str, threshold: float) -> DiseaseRisk:
+    def risks(self, row: int) -> List[Risk]:
+        return [
+            self._build_risk(disease, float(self._probabilities[row, k]), self._driver_labels[k],
+                             bool(self.drivers_high[row, k]), bool(self.high_bmi[row]))
+            for k, disease in enumerate(self.diseases)
+        ]
+
+    @staticmethod
+    def _build_risk(name: str, prob: float, driver_label: str, driver_high: bool, high_bmi: bool) -> Risk:
         if prob > 0.7:
             level = RiskLevel.HIGH
         elif prob > 0.4:
@@ -209,20 +94,160 @@ class MLRiskEngine:
             
         # Simple rule-based explanation for MVP (Layer 2 LLM would expand this)
         reasons = []
-        driver_val = getattr(data, key_driver)
-        if driver_val > threshold:
-            reasons.append(f"Elevated {key_driver.replace('_', ' ').title()}")
-        if data.bmi > 30:
+        if driver_high:
+            reasons.append(driver_label)
+        if high_bmi:
             reasons.append("High BMI")
             
         steps = ["Consult your doctor for a checkup."]
         if level == RiskLevel.HIGH:
             steps.append("Prioritize lifestyle changes immediately.")
             
-        return DiseaseRisk(
+        return Risk(
             disease=name,
             risk_level=level,
             probability=round(prob, 2),
             contributing_factors=reasons if reasons else ["General Risk Profile"],
             prevention_steps=steps
         )
+
+class MLRiskEngine:
+    def __init__(self, model_dir: str = MODEL_DIR, bundle_path: Optional[str] = None):
+        self.model_dir = model_dir
+        self.load_times: Dict[str, float] = {}  # Seconds per artifact, reported by /readyz
+        # Versioned bundles (hot reload + A/B split), see app/core/model_registry.py
+        self.registry = ModelRegistry(model_dir, pinned_bundle=bundle_path or MODEL_BUNDLE,
+                                      expected_features=FEATURE_COLUMNS)
+
+        # Artifacts and the LLM client are independent: load them concurrently
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix="model-load") as pool:
+            llm = pool.submit(self._timed, "llm_service", LLMService)  # Defaults to Template Mode
+            self._timed("model_bundles", self.registry.refresh)
+            if not self.registry.versions:
+                print("WARNING: No model bundle found, loading legacy pickles. Run ml/package_models.py.")
+                self.registry.add(self._timed("legacy_pickles", self._load_legacy_models))
+            self.llm_service = llm.result()
+
+        # ML models + screening rules (VITALSCAN_EVALUATORS), see app/core/risk_engine.py
+        self.pipeline = EvaluatorPipeline.from_names(registry=self.registry)
+        # Identical inputs (retries, double submits) skip scoring and the LLM
+        self.result_cache = ResultCache()
+
+    @property
+    def model_version(self) -> Optional[str]:
+        return self.registry.default_version
+
+    def warm_up(self):
+        """
+        One throwaway inference so the first real request does not pay for
+        first-call allocations (XGBoost DMatrix setup, NumPy buffers).
+        """
+        example = ClinicalInput(**ClinicalInput.Config.json_schema_extra["example"])
+        self._timed("warm_up", self.score_many, [example])
+
+    def _timed(self, name: str, fn: Callable, *args):
+        started = time.perf_counter()
+        result = fn(*args)
+        self.load_times[name] = round(time.perf_counter() - started, 4)
+        return result
+
+    def _load_legacy_models(self) -> ModelVersion:
+        predictors = {
+            "diabetes_model": self._load_model("diabetes_model.pkl"),
+            "hypertension_model": self._load_model("hypertension_model.pkl"),
+        }
+        return ModelVersion("legacy-pickle", predictors, scaler=self._load_model("scaler.pkl"),
+                            source=self.model_dir)
+
+    def _load_model(self, filename: str):
+        path = os.path.join(self.model_dir, filename)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Model {filename} not found. Train models first.")
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    def assess(self, input_data: ClinicalInput) -> List[Risk]:
+        generation, model = self.registry.generation, self.registry.select()
+        key = self.result_cache.make_key(input_data, f"enriched/{model.version}")
+        results = self.result_cache.get(key, generation)
+        if results is None:
+            results = self.score_many([input_data], model)[0]
+            complete = self.llm_service.enrich(results, user_profile=input_data)
+            results = self._sort_risks(results)
+            if complete:
+                self.result_cache.set(key, results, generation)
+        return results
+
+    async def aassess(self, input_data: ClinicalInput, pool: InferencePool, enrich: bool = True) -> List[Risk]:
+        """
+        Event-loop friendly variant of assess().
+        CPU-bound scoring runs on the bounded inference pool, enrichment uses
+        the async LLM client. With enrich=False, template advice is returned
+        (the caller may enrich later, see EnrichmentJobs). Results are memoized
+        per identical input and model version (see ResultCache), except when
+        a failed LLM call left template advice in an enriched result.
+        """
+        # The A/B split picks the version first, so a memoized result never
+        # serves one version's scores to traffic routed to another
+        generation, model = self.registry.generation, self.registry.select()
+        key = self.result_cache.make_key(input_data, f"{'enriched' if enrich else 'template'}/{model.version}")
+        cached = self.result_cache.get(key, generation)
+        if cached is not None:
+            return cached
+
+        results = (await pool.run(self.score_many, [input_data], model))[0]
+        complete = True
+        if enrich:
+            complete = await self.llm_service.aenrich(results, user_profile=input_data)
+        else:
+            results = self.llm_service._template_fallback(results)
+        results = self._sort_risks(results)
+        if complete:
+            self.result_cache.set(key, results, generation)
+        return results
+
+    def assess_many(self, inputs: List[ClinicalInput], enrich: bool = False) -> List[List[Risk]]:
+        """
+        Vectorized assessment for N inputs.
+        Returns one sorted risk list per input, in input order.
+        """
+        all_results = []
+        for input_data, results in zip(inputs, self.score_many(inputs)):
+            # Layer 2: Narrative Enrichment (LLM/Template)
+            if enrich:
+                results = self.llm_service.generate_explanation(results, user_profile=input_data)
+            else:
+                results = self.llm_service._template_fallback(results)
+            all_results.append(self._sort_risks(results))
+
+        return all_results
+
+    def score_many(self, inputs: List[ClinicalInput], model: Optional[ModelVersion] = None) -> List[List[Risk]]:
+        """
+        Layer 1 only (ML models + 20-question screening), no enrichment.
+        One feature batch for all N inputs; every evaluator scores it with
+        array operations (one predict_proba per model, one matrix multiply
+        for the screening domains). `model` pins the version (default: A/B split).
+        """
+        if not inputs:
+            return []
+        with metrics.stage("feature_build"):
+            batch = FeatureBatch.from_inputs(inputs, model)
+        return self.evaluate(batch).all_risks()
+
+    def evaluate(self, batch: FeatureBatch) -> PipelineResult:
+        return self.pipeline.evaluate(batch)
+
+    def score_frame(self, frame) -> PipelineResult:
+        """
+        Batch scoring for analytics: `frame` is a DataFrame (or dict of
+        arrays) with ClinicalInput field names; use `.to_frame()` or
+        `.probabilities()` on the result to skip building Risk objects.
+        """
+        return self.evaluate(FeatureBatch.from_frame(frame))
+
+    @staticmethod
+    def _sort_risks(results: List[Risk]) -> List[Risk]:
+        # Sort by Probability (Descending) - High Risk First
+        results.sort(key=lambda x: x.probability, reverse=True)
+        return results
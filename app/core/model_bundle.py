@@ -0,0 +1,161 @@
+"""
+Versioned model artifact bundle (replaces the ml/models/*.pkl pickles).
+
+Layout of ml/models/bundles/<version>/:
+    manifest.json            format, version, feature order, models, sha256 per file
+    scaler_mean.npy          StandardScaler parameters (already folded into the
+    scaler_scale.npy         models; kept for provenance and legacy clients)
+    <model>.ubj              raw-input XGBoost booster (UBJSON)
+    <model>/*.npy            the same trees as CompiledTreeEnsemble arrays
+
+Arrays are opened with mmap_mode="r", so N uvicorn workers share one copy
+of the model pages. Nothing in a bundle is unpickled.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.core.tree_predictor import CompiledTreeEnsemble
+
+BUNDLE_FORMAT = 1
+MANIFEST = "manifest.json"
+# Pin a bundle directory; empty = newest under <model_dir>/bundles
+MODEL_BUNDLE = os.getenv("VITALSCAN_MODEL_BUNDLE", "")
+VERIFY_CHECKSUMS = os.getenv("VITALSCAN_MODEL_VERIFY", "1") == "1"
+
+class BundleError(Exception):
+    """Bundle is missing, malformed or fails its checksum."""
+
+class ModelBundle:
+    """
+    A loaded bundle: `predictors[name]` scores raw feature rows.
+    """
+    def __init__(self, path: str, manifest: Dict[str, Any], predictors: Dict[str, Any],
+                 scaler_mean: np.ndarray, scaler_scale: np.ndarray):
+        self.path = path
+        self.manifest = manifest
+        self.version = manifest["version"]
+        self.features: List[str] = manifest["features"]
+        self.checksum = manifest["checksum"]
+        self.predictors = predictors
+        self.scaler_mean = scaler_mean
+        self.scaler_scale = scaler_scale
+
+    @classmethod
+    def load(cls, path: str, expected_features: Optional[Sequence[str]] = None,
+             verify: bool = VERIFY_CHECKSUMS, mmap: bool = True) -> "ModelBundle":
+        # 1. Manifest
+        try:
+            with open(os.path.join(path, MANIFEST), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            raise BundleError(f"Unreadable manifest in {path}: {e}")
+        if manifest.get("format") != BUNDLE_FORMAT:
+            raise BundleError(f"Unsupported bundle format {manifest.get('format')} in {path}")
+        if expected_features is not None and list(manifest["features"]) != list(expected_features):
+            raise BundleError(f"Feature order mismatch in {path}: {manifest['features']}")
+
+        # 2. Integrity
+        if verify:
+            files = manifest["files"]
+            for rel_path, digest in files.items():
+                if _sha256(os.path.join(path, rel_path)) != digest:
+                    raise BundleError(f"Checksum mismatch for {rel_path} in {path}")
+            if _bundle_checksum(files) != manifest["checksum"]:
+                raise BundleError(f"Manifest checksum mismatch in {path}")
+
+        # 3. Predictors (compiled arrays preferred; booster needs xgboost)
+        mode = "r" if mmap else None
+        predictors = {}
+        for name, entry in manifest["models"].items():
+            if entry.get("compiled"):
+                predictors[name] = CompiledTreeEnsemble.load_arrays(os.path.join(path, entry["compiled"]), mmap=mmap)
+            else:
+                predictors[name] = _load_booster(os.path.join(path, entry["booster"]))
+        scaler_mean = np.load(os.path.join(path, "scaler_mean.npy"), mmap_mode=mode)
+        scaler_scale = np.load(os.path.join(path, "scaler_scale.npy"), mmap_mode=mode)
+        return cls(path, manifest, predictors, scaler_mean, scaler_scale)
+
+def write_bundle(root: str, boosters: Dict[str, Any], compiled: Dict[str, CompiledTreeEnsemble],
+                 scaler_mean: Sequence[float], scaler_scale: Sequence[float], features: Sequence[str],
+                 version: Optional[str] = None) -> str:
+    """
+    Writes a new bundle under `root` and returns its path. `boosters` are
+    raw-input XGBClassifiers (see fold_scaler_into_xgboost_json). The
+    directory is renamed into place last, so readers never see a partial
+    bundle.
+    """
+    version = version or datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+    path = os.path.join(root, version)
+    if os.path.exists(path):
+        raise BundleError(f"Bundle {path} already exists")
+    staging = f"{path}.tmp"
+    os.makedirs(staging)
+
+    models = {}
+    for name, booster in boosters.items():
+        booster.save_model(os.path.join(staging, f"{name}.ubj"))
+        models[name] = {"booster": f"{name}.ubj", "input_space": "raw"}
+        if name in compiled:
+            compiled[name].save_arrays(os.path.join(staging, name))
+            models[name]["compiled"] = name
+    np.save(os.path.join(staging, "scaler_mean.npy"), np.asarray(scaler_mean, dtype=np.float64))
+    np.save(os.path.join(staging, "scaler_scale.npy"), np.asarray(scaler_scale, dtype=np.float64))
+
+    files = {}
+    for directory, _, names in os.walk(staging):
+        for file_name in names:
+            full_path = os.path.join(directory, file_name)
+            files[os.path.relpath(full_path, staging).replace(os.sep, "/")] = _sha256(full_path)
+    manifest = {
+        "format": BUNDLE_FORMAT,
+        "version": version,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "features": list(features),
+        "models": models,
+        "files": dict(sorted(files.items())),
+        "checksum": _bundle_checksum(files),
+    }
+    with open(os.path.join(staging, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.rename(staging, path)
+    return path
+
+def list_bundles(root: str) -> List[str]:
+    """Bundle directories under `root`, oldest first (versions sort by time)."""
+    if not os.path.isdir(root):
+        return []
+    return [
+        os.path.join(root, name) for name in sorted(os.listdir(root))
+        if os.path.isfile(os.path.join(root, name, MANIFEST))
+    ]
+
+def latest_bundle(root: str) -> Optional[str]:
+    bundles = list_bundles(root)
+    return bundles[-1] if bundles else None
+
+def _load_booster(path: str):
+    from xgboost import XGBClassifier
+
+    model = XGBClassifier()
+    model.load_model(path)
+    if model.get_booster().attr("input_space") != "raw":
+        raise BundleError(f"{path} was not packaged for raw features")
+    model.takes_raw_features = True
+    return model
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _bundle_checksum(files: Dict[str, str]) -> str:
+    canonical = json.dumps(files, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
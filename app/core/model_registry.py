@@ -0,0 +1,243 @@
+"""
+Model registry: hot reload and weighted A/B routing across bundle versions.
+
+A daemon thread polls <model_dir>/bundles/ and loads new bundles off the
+request path. Each refresh publishes a new immutable snapshot (versions +
+routes) with one attribute assignment; requests pick a version from the
+snapshot they read, so a swap never interrupts in-flight scoring.
+
+Traffic weights come from VITALSCAN_MODEL_TRAFFIC ("v1=90,v2=10") or, if
+present, <model_dir>/bundles/traffic.json ({"v1": 90, "v2": 10}), which is
+re-read on every poll. Without weights the newest bundle takes all traffic.
+"""
+
+import bisect
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.model_bundle import ModelBundle, MODEL_BUNDLE, list_bundles
+
+MODEL_DIR = os.getenv("VITALSCAN_MODEL_DIR", "ml/models")
+MODEL_POLL_SECONDS = float(os.getenv("VITALSCAN_MODEL_POLL_SECONDS", "30"))  # 0 = no hot reload
+MODEL_TRAFFIC = os.getenv("VITALSCAN_MODEL_TRAFFIC", "")
+MODEL_MAX_LOADED = int(os.getenv("VITALSCAN_MODEL_MAX_LOADED", "3"))
+TRAFFIC_FILE = "traffic.json"
+
+_PROBABILITY_BINS = 10
+_LATENCY_WINDOW = 2048
+
+class ModelVersion:
+    """
+    One loaded set of predictors plus its serving stats.
+    `scaler` is only set for the legacy pickles (bundles take raw features).
+    """
+    def __init__(self, version: str, predictors: Dict[str, Any], scaler: Any = None, source: str = ""):
+        self.version = version
+        self.predictors = predictors
+        self.scaler = scaler
+        self.source = source
+        self.loaded_at = time.time()
+        self.requests = 0
+        self.rows = 0
+        self._latencies = deque(maxlen=_LATENCY_WINDOW)
+        self._probability_sums = {name: 0.0 for name in predictors}
+        self._histograms = {name: np.zeros(_PROBABILITY_BINS, dtype=np.int64) for name in predictors}
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, rows: int, probabilities: Dict[str, np.ndarray]):
+        with self._lock:
+            self.requests += 1
+            self.rows += rows
+            self._latencies.append(seconds)
+            for name, probs in probabilities.items():
+                self._probability_sums[name] += float(np.sum(probs))
+                bins = np.minimum((np.asarray(probs) * _PROBABILITY_BINS).astype(np.int64), _PROBABILITY_BINS - 1)
+                self._histograms[name] += np.bincount(bins, minlength=_PROBABILITY_BINS)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = np.asarray(self._latencies) * 1000
+            return {
+                "source": self.source,
+                "loaded_at": self.loaded_at,
+                "requests": self.requests,
+                "rows": self.rows,
+                "latency_ms": {
+                    "p50": round(float(np.percentile(latencies, 50)), 3) if len(latencies) else None,
+                    "p95": round(float(np.percentile(latencies, 95)), 3) if len(latencies) else None,
+                    "max": round(float(latencies.max()), 3) if len(latencies) else None,
+                },
+                "predictions": {
+                    name: {
+                        "mean_probability": round(self._probability_sums[name] / self.rows, 4) if self.rows else None,
+                        "histogram": self._histograms[name].tolist(),  # 10 bins over [0, 1]
+                    }
+                    for name in self.predictors
+                },
+            }
+
+class ModelRegistry:
+    """
+    Loaded model versions and the traffic split between them.
+    """
+    def __init__(self, model_dir: str = MODEL_DIR, pinned_bundle: str = MODEL_BUNDLE,
+                 poll_seconds: float = MODEL_POLL_SECONDS, traffic: str = MODEL_TRAFFIC,
+                 max_loaded: int = MODEL_MAX_LOADED, expected_features: Optional[List[str]] = None):
+        self.model_dir = model_dir
+        self.bundle_root = os.path.join(model_dir, "bundles")
+        self.pinned_bundle = pinned_bundle
+        self.poll_seconds = poll_seconds
+        self.max_loaded = max(1, max_loaded)
+        self.expected_features = expected_features
+        self.default_traffic = _parse_traffic(traffic)
+        # (loaded versions in load order, routed version names, cumulative weights): replaced, never mutated
+        self._snapshot: Tuple[Dict[str, ModelVersion], List[str], List[float]] = ({}, [], [])
+        self._generation = 0  # Bumped whenever the loaded versions or routes change
+        self._failed: Dict[str, str] = {}
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def refresh(self) -> List[str]:
+        """
+        Loads bundles not seen before, re-reads the traffic split and
+        publishes a new snapshot. Returns the newly loaded versions.
+        """
+        with self._write_lock:
+            versions = dict(self._snapshot[0])
+            traffic = self._traffic()
+            paths = [self.pinned_bundle] if self.pinned_bundle else list_bundles(self.bundle_root)
+            # Only the newest bundles and those named in the split are worth loading
+            wanted = set(paths[-self.max_loaded:]) | {p for p in paths if os.path.basename(p) in traffic}
+            loaded = []
+            for path in paths:
+                name = os.path.basename(os.path.normpath(path))
+                if name in versions or path in self._failed or path not in wanted:
+                    continue
+                try:
+                    bundle = ModelBundle.load(path, expected_features=self.expected_features)
+                    if bundle.version != name:
+                        raise ValueError(f"manifest version {bundle.version} does not match directory name")
+                except Exception as e:
+                    print(f"WARNING: Model bundle {path} failed to load: {e}")
+                    self._failed[path] = str(e)
+                    continue
+                versions[name] = ModelVersion(name, bundle.predictors, source=path)
+                loaded.append(name)
+            self._publish(versions, traffic)
+            return loaded
+
+    def add(self, model: ModelVersion):
+        """Registers an already-loaded version (e.g. the legacy pickles)."""
+        with self._write_lock:
+            versions = dict(self._snapshot[0])
+            versions[model.version] = model
+            self._publish(versions, self._traffic())
+
+    def select(self) -> ModelVersion:
+        versions, names, cumulative = self._snapshot
+        if not names:
+            raise RuntimeError("No model version loaded")
+        if len(names) == 1:
+            return versions[names[0]]
+        return versions[names[bisect.bisect_right(cumulative, random.random() * cumulative[-1])]]
+
+    @property
+    def versions(self) -> List[str]:
+        return list(self._snapshot[0])
+
+    @property
+    def generation(self) -> int:
+        """Changes with every published change of versions or traffic (cache invalidation)."""
+        return self._generation
+
+    @property
+    def default_version(self) -> Optional[str]:
+        """Version with the largest traffic share."""
+        _, names, cumulative = self._snapshot
+        if not names:
+            return None
+        shares = np.diff([0.0] + cumulative)
+        return names[int(np.argmax(shares))]
+
+    def start(self):
+        """Starts the bundle watcher (no-op when pinned or polling is off)."""
+        if self.pinned_bundle or self.poll_seconds <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._watch, name="model-registry", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        versions, names, cumulative = self._snapshot
+        shares = dict(zip(names, np.diff([0.0] + cumulative) / cumulative[-1])) if names else {}
+        return {
+            "default_version": self.default_version,
+            "versions": {
+                name: dict(model.stats(), traffic=round(float(shares.get(name, 0.0)), 4))
+                for name, model in versions.items()
+            },
+            "failed": dict(self._failed),
+        }
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                loaded = self.refresh()
+            except Exception as e:
+                print(f"WARNING: Model registry refresh failed: {e}")
+                continue
+            for version in loaded:
+                print(f"INFO: Model bundle {version} loaded (traffic: {self.stats()['versions'][version]['traffic']})")
+
+    def _publish(self, versions: Dict[str, ModelVersion], traffic: Dict[str, float]):
+        newest = list(versions)[-1] if versions else None
+        routes = [(name, weight) for name, weight in traffic.items() if name in versions and weight > 0]
+        if not routes and newest is not None:
+            routes = [(newest, 1.0)]  # No (usable) split: newest takes all traffic
+
+        # Keep routed versions and the newest ones, up to max_loaded
+        keep = {name for name, _ in routes}
+        for name in reversed(list(versions)):
+            if len(keep) >= max(self.max_loaded, len(routes)):
+                break
+            keep.add(name)
+        versions = {name: model for name, model in versions.items() if name in keep}
+
+        cumulative = np.cumsum([weight for _, weight in routes]).tolist()
+        old_versions, old_names, old_cumulative = self._snapshot
+        self._snapshot = (versions, [name for name, _ in routes], cumulative)
+        # After the swap: a result scored before it can only be cached under the old generation
+        if (list(versions), self._snapshot[1], cumulative) != (list(old_versions), old_names, old_cumulative):
+            self._generation += 1
+
+    def _traffic(self) -> Dict[str, float]:
+        """traffic.json next to the bundles wins over VITALSCAN_MODEL_TRAFFIC."""
+        path = os.path.join(self.bundle_root, TRAFFIC_FILE)
+        if not os.path.exists(path):
+            return self.default_traffic
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return {str(k): float(v) for k, v in json.load(f).items()}
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"WARNING: Ignoring invalid {path}: {e}")
+            return self.default_traffic
+
+def _parse_traffic(spec: str) -> Dict[str, float]:
+    traffic = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        version, _, weight = part.partition("=")
+        traffic[version.strip()] = float(weight or 1)
+    return traffic
@@ -0,0 +1,216 @@
+"""
+Compact binary payload for stored assessments (format v1).
+
+Layout (little-endian), zlib-compressed before encryption:
+    flags u8 | id (16 raw bytes, or str) | timestamp i8 µs | tz offset i2 min
+    | status u8 | [disclaimer str] | n_risks u8
+    | per risk: disease u8 (255 = str follows) | level u8 | probability f8
+                | n_factors u8 + str* | n_steps u8 + str*
+Strings are u16 length + UTF-8; non-string values in string fields are
+stored as str(value). A record that does not fit this layout (more than
+255 risks or items, a string over 64 KiB, an unknown risk level...) is
+stored as `flags (JSON bit) | JSON` instead, the legacy encoding, so
+encoding never fails. Code tables below are append-only: never reorder or
+remove entries, add a new format version instead.
+"""
+
+import json
+import struct
+import uuid
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Tuple
+
+FORMAT_VERSION = 1
+
+DISEASE_CODES = (
+    "Type 2 Diabetes",
+    "Hypertension",
+    "Digital Eye Strain",
+    "Musculoskeletal Disorder Risk",
+    "Sleep Deprivation/Disorder",
+    "High Chronic Stress / Burnout",
+    "Anxiety & Mood Risk",
+    "Sedentary Lifestyle Risk",
+)
+RISK_LEVEL_CODES = ("Low", "Moderate", "High")
+ENRICHMENT_STATUS_CODES = ("complete", "pending")
+DEFAULT_DISCLAIMER = "ESTIMATE ONLY. NOT A DIAGNOSIS. Consult a physician."
+
+# Preset zlib dictionary: fragments every record repeats (v1, frozen)
+ZLIB_DICTIONARY = "".join([
+    DEFAULT_DISCLAIMER,
+    " *Why*: ", " *Result*: ", "**: ", "**Consult a Specialist**", "**Track Symptoms Daily**",
+    "**Prioritize Sleep**", "**Hydration Strategy**", "**Stress Reduction**",
+    "Consult your doctor for a checkup.", "Prioritize lifestyle changes immediately.",
+    "Elevated Hba1C", "Elevated Systolic Bp", "High BMI", "General Risk Profile",
+    "Frequent Headaches", "Dry/Tired Eyes", "Neck Stiffness", "Lower Back Pain",
+    "Low Sleep Duration", "Insomnia Symptoms", "Blue Light Exposure",
+    "Feeling Overwhelmed", "Emotional Exhaustion", "Nervousness", "Digital Dependency",
+    "Prolonged Sitting", "Low Activity", "No major symptoms reported", "Good posture indicators",
+    "Good sleep hygiene", "Balanced emotional state", "Stable mood indicators", "Active lifestyle",
+]).encode("utf-8")
+
+_FLAG_UUID_ID = 1
+_FLAG_CUSTOM_DISCLAIMER = 2
+_FLAG_JSON = 4  # Body is JSON (json.dumps(default=str)), no other flag set
+_MAX_COUNT = 0xFF
+_MAX_STR_BYTES = 0xFFFF
+
+_HEADER = struct.Struct("<qhB")
+_RISK = struct.Struct("<BBd")
+_DISEASE_INDEX = {name: i for i, name in enumerate(DISEASE_CODES)}
+_LEVEL_INDEX = {name: i for i, name in enumerate(RISK_LEVEL_CODES)}
+_STATUS_INDEX = {name: i for i, name in enumerate(ENRICHMENT_STATUS_CODES)}
+_LITERAL = 255
+
+def encode_assessment(data: Dict[str, Any]) -> bytes:
+    """Assessment.to_dict() -> compressed v1 payload."""
+    try:
+        raw = _encode_binary(data)
+    except (ValueError, TypeError, KeyError, OverflowError, struct.error):
+        raw = bytes([_FLAG_JSON]) + json.dumps(data, default=str).encode("utf-8")
+    compressor = zlib.compressobj(level=6, zdict=ZLIB_DICTIONARY)
+    return compressor.compress(raw) + compressor.flush()
+
+def _encode_binary(data: Dict[str, Any]) -> bytes:
+    """Raises ValueError/TypeError/... when the record does not fit the layout."""
+    out = bytearray()
+    flags = 0
+    assessment_id = str(data["assessment_id"])
+    try:
+        id_bytes = uuid.UUID(assessment_id).bytes
+        if str(uuid.UUID(bytes=id_bytes)) == assessment_id:
+            flags |= _FLAG_UUID_ID
+    except ValueError:
+        pass
+    disclaimer = data.get("disclaimer", DEFAULT_DISCLAIMER)
+    if disclaimer != DEFAULT_DISCLAIMER:
+        flags |= _FLAG_CUSTOM_DISCLAIMER
+
+    out.append(flags)
+    if flags & _FLAG_UUID_ID:
+        out += id_bytes
+    else:
+        _put_str(out, assessment_id)
+
+    micros, tz_minutes = _split_timestamp(data["timestamp"])
+    status = _enum_value(data.get("enrichment_status", "complete"))
+    out += _HEADER.pack(micros, tz_minutes, _STATUS_INDEX.get(status, 0))
+    if flags & _FLAG_CUSTOM_DISCLAIMER:
+        _put_str(out, disclaimer)
+
+    risks = data.get("risks", [])
+    _put_count(out, len(risks))
+    for risk in risks:
+        disease = risk["disease"]
+        code = _DISEASE_INDEX.get(disease, _LITERAL)
+        out += _RISK.pack(code, _LEVEL_INDEX[_enum_value(risk["risk_level"])], float(risk["probability"]))
+        if code == _LITERAL:
+            _put_str(out, disease)
+        _put_strs(out, risk["contributing_factors"])
+        _put_strs(out, risk["prevention_steps"])
+    return bytes(out)
+
+def decode_assessment(payload: bytes) -> Dict[str, Any]:
+    """Compressed v1 payload -> dict shaped like the legacy JSON records."""
+    decompressor = zlib.decompressobj(zdict=ZLIB_DICTIONARY)
+    buf = decompressor.decompress(payload) + decompressor.flush()
+    pos = 0
+
+    flags = buf[pos]
+    pos += 1
+    if flags & _FLAG_JSON:
+        return json.loads(bytes(buf[pos:]).decode("utf-8"))
+    if flags & _FLAG_UUID_ID:
+        assessment_id = str(uuid.UUID(bytes=bytes(buf[pos:pos + 16])))
+        pos += 16
+    else:
+        assessment_id, pos = _get_str(buf, pos)
+
+    micros, tz_minutes, status = _HEADER.unpack_from(buf, pos)
+    pos += _HEADER.size
+    disclaimer = DEFAULT_DISCLAIMER
+    if flags & _FLAG_CUSTOM_DISCLAIMER:
+        disclaimer, pos = _get_str(buf, pos)
+
+    n_risks = buf[pos]
+    pos += 1
+    risks = []
+    for _ in range(n_risks):
+        code, level, probability = _RISK.unpack_from(buf, pos)
+        pos += _RISK.size
+        if code == _LITERAL:
+            disease, pos = _get_str(buf, pos)
+        else:
+            disease = DISEASE_CODES[code]
+        factors, pos = _get_strs(buf, pos)
+        steps, pos = _get_strs(buf, pos)
+        risks.append({
+            "disease": disease,
+            "risk_level": RISK_LEVEL_CODES[level],
+            "probability": probability,
+            "contributing_factors": factors,
+            "prevention_steps": steps,
+        })
+
+    return {
+        "assessment_id": assessment_id,
+        "timestamp": str(_join_timestamp(micros, tz_minutes)),
+        "risks": risks,
+        "disclaimer": disclaimer,
+        "enrichment_status": ENRICHMENT_STATUS_CODES[status],
+    }
+
+def _enum_value(value: Any) -> str:
+    return getattr(value, "value", value)
+
+def _split_timestamp(timestamp: Any) -> Tuple[int, int]:
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    offset = timestamp.utcoffset()
+    tz_minutes = int(offset.total_seconds() // 60) if offset is not None else -32768  # naive
+    naive_utc = (timestamp - offset).replace(tzinfo=None) if offset is not None else timestamp
+    delta = naive_utc - datetime(1970, 1, 1)
+    micros = (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+    return micros, tz_minutes
+
+def _join_timestamp(micros: int, tz_minutes: int) -> datetime:
+    naive_utc = datetime(1970, 1, 1) + timedelta(microseconds=micros)
+    if tz_minutes == -32768:
+        return naive_utc
+    tz = timezone(timedelta(minutes=tz_minutes))
+    return naive_utc.replace(tzinfo=timezone.utc).astimezone(tz)
+
+def _put_count(out: bytearray, count: int):
+    if count > _MAX_COUNT:
+        raise ValueError(f"{count} items do not fit a u8 count")
+    out.append(count)
+
+def _put_str(out: bytearray, value: Any):
+    raw = (value if isinstance(value, str) else str(value)).encode("utf-8")
+    if len(raw) > _MAX_STR_BYTES:
+        raise ValueError(f"{len(raw)}-byte string does not fit a u16 length")
+    out += struct.pack("<H", len(raw))
+    out += raw
+
+def _put_strs(out: bytearray, values: List[Any]):
+    if not isinstance(values, (list, tuple)):
+        raise TypeError(f"expected a list of strings, got {type(values).__name__}")
+    _put_count(out, len(values))
+    for value in values:
+        _put_str(out, value)
+
+def _get_str(buf: bytes, pos: int) -> Tuple[str, int]:
+    (length,) = struct.unpack_from("<H", buf, pos)
+    pos += 2
+    return bytes(buf[pos:pos + length]).decode("utf-8"), pos + length
+
+def _get_strs(buf: bytes, pos: int) -> Tuple[List[str], int]:
+    count = buf[pos]
+    pos += 1
+    values = []
+    for _ in range(count):
+        value, pos = _get_str(buf, pos)
+        values.append(value)
+    return values, pos
@@ -0,0 +1,114 @@
+"""
+Internal result types for the request hot path.
+
+Risk and Assessment are plain slotted objects with the same fields as the
+DiseaseRisk / AssessmentResponse schemas. The engine, LLM enrichment,
+enrichment jobs and storage pass these around; the Pydantic models only
+describe the API (OpenAPI schema), and responses are serialized straight
+from `to_dict()` with orjson (ORJSONResponse), skipping per-request
+validation and model -> dict round-trips.
+"""
+
+import json
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+from starlette.responses import JSONResponse
+
+try:
+    import orjson  # Optional: ~5x faster than json, datetimes without default=str
+except ImportError:
+    orjson = None
+
+from app.models.schemas import AssessmentResponse, EnrichmentStatus, RiskLevel
+
+DISCLAIMER = AssessmentResponse.model_fields["disclaimer"].default
+
+class Risk:
+    """DiseaseRisk without validation; `prevention_steps` is updated in place by enrichment."""
+    __slots__ = ("disease", "risk_level", "probability", "contributing_factors", "prevention_steps")
+
+    def __init__(self, disease: str, risk_level: RiskLevel, probability: float,
+                 contributing_factors: List[str], prevention_steps: List[str]):
+        self.disease = disease
+        self.risk_level = risk_level
+        self.probability = probability
+        self.contributing_factors = contributing_factors
+        self.prevention_steps = prevention_steps
+
+    def copy(self) -> "Risk":
+        return Risk(self.disease, self.risk_level, self.probability,
+                    list(self.contributing_factors), list(self.prevention_steps))
+
+    def replace(self, **changes) -> "Risk":
+        fields = {name: getattr(self, name) for name in self.__slots__}
+        fields.update(changes)
+        return Risk(**fields)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "disease": self.disease,
+            "risk_level": self.risk_level,
+            "probability": self.probability,
+            "contributing_factors": self.contributing_factors,
+            "prevention_steps": self.prevention_steps,
+        }
+
+    def __repr__(self) -> str:
+        return f"Risk({self.disease!r}, {self.risk_level.value}, {self.probability})"
+
+class Assessment:
+    """AssessmentResponse without validation."""
+    __slots__ = ("assessment_id", "timestamp", "risks", "enrichment_status", "disclaimer")
+
+    def __init__(self, assessment_id: str, timestamp: datetime, risks: List[Risk],
+                 enrichment_status: EnrichmentStatus = EnrichmentStatus.COMPLETE,
+                 disclaimer: str = DISCLAIMER):
+        self.assessment_id = assessment_id
+        self.timestamp = timestamp
+        self.risks = risks
+        self.enrichment_status = enrichment_status
+        self.disclaimer = disclaimer
+
+    @classmethod
+    def new(cls, risks: List[Risk], timestamp: datetime = None,
+            enrichment_status: EnrichmentStatus = EnrichmentStatus.COMPLETE) -> "Assessment":
+        return cls(str(uuid.uuid4()), timestamp or datetime.now(timezone.utc), risks, enrichment_status)
+
+    def replace(self, **changes) -> "Assessment":
+        """Shallow copy with some fields replaced (the original is never mutated)."""
+        fields = {name: getattr(self, name) for name in self.__slots__}
+        fields.update(changes)
+        return Assessment(**fields)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Same shape as AssessmentResponse.dict() (enums and datetime kept)."""
+        return {
+            "assessment_id": self.assessment_id,
+            "timestamp": self.timestamp,
+            "risks": [risk.to_dict() for risk in self.risks],
+            "enrichment_status": self.enrichment_status,
+            "disclaimer": self.disclaimer,
+        }
+
+    def to_json(self) -> str:
+        return dumps(self.to_dict()).decode("utf-8")
+
+def dumps(content: Any) -> bytes:
+    """
+    JSON bytes; UTC datetimes end in "Z" like Pydantic's output.
+    """
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+    return json.dumps(content, default=_json_default, separators=(",", ":")).encode("utf-8")
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat().replace("+00:00", "Z")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with dumps() (no Pydantic validation of the content)."""
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -1,113 +1,180 @@
+"""
+Batch risk evaluator framework shared by the API and the Streamlit app.
+
+Inputs are converted once into a columnar FeatureBatch (from ClinicalInput
+objects or a DataFrame). Every registered evaluator scores the whole batch
+with array operations and returns a result whose Risk objects are only
+built when a row is read. EvaluatorPipeline composes the evaluators named
+in VITALSCAN_EVALUATORS, in order.
+"""
+
+import os
 from abc import ABC, abstractmethod
-from typing import Dict, List
-from app.models.schemas import QuestionnaireInput, RiskScore, RiskLevel, PainFrequency, SleepQuality
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Type
+
+import numpy as np
+
+from app.models.schemas import ClinicalInput
+from app.core import metrics
+from app.core.results import Risk
+from app.core.screening import ScreeningRules
+
+# NHANES feature order used at training time (see ml/train_diseases.py)
+FEATURE_COLUMNS = ['RIDAGEYR', 'RIAGENDR', 'BMXBMI', 'BPXSY1', 'LBXGH', 'LBXTC', 'PAQ650', 'SLD010H', 'SMQ020']
+EVALUATOR_NAMES = [n.strip() for n in os.getenv("VITALSCAN_EVALUATORS", "ml_models,screening").split(",") if n.strip()]
+
+INPUT_FIELDS = list(ClinicalInput.model_fields)
+_FIELD_INDEX = {f: i for i, f in enumerate(INPUT_FIELDS)}
+# ClinicalInput fields behind each FEATURE_COLUMNS entry
+_NHANES_INDEX = [_FIELD_INDEX[f] for f in (
+    "age", "gender", "bmi", "systolic_bp", "hba1c", "cholesterol", "vigorous_activity", "sleep_hours", "smoker_history"
+)]
+_NHANES_YES_NO = [6, 8]
+
+class FeatureBatch:
+    """
+    Columnar view of N inputs: an (N, F) float64 matrix over INPUT_FIELDS.
+    `model` pins the model version to score with (None: the registry's
+    A/B split picks one per batch).
+    """
+    def __init__(self, values: np.ndarray, inputs: Optional[Sequence[ClinicalInput]] = None, model: Any = None):
+        self.values = values
+        self.inputs = inputs
+        self.model = model
+        self._nhanes: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_inputs(cls, inputs: Sequence[ClinicalInput], model: Any = None) -> "FeatureBatch":
+        values = np.array([[getattr(d, f) for f in INPUT_FIELDS] for d in inputs], dtype=np.float64)
+        return cls(values.reshape(len(inputs), len(INPUT_FIELDS)), inputs, model)
+
+    @classmethod
+    def from_frame(cls, frame: Any) -> "FeatureBatch":
+        """DataFrame (or dict of arrays) with ClinicalInput field names as columns."""
+        missing = [f for f in INPUT_FIELDS if f not in frame and ClinicalInput.model_fields[f].is_required()]
+        if missing:
+            raise ValueError(f"Missing input columns: {missing}")
+        n = len(frame[INPUT_FIELDS[0]])
+        return cls(np.column_stack([
+            np.asarray(frame[f], dtype=np.float64) if f in frame
+            else np.full(n, float(ClinicalInput.model_fields[f].default))
+            for f in INPUT_FIELDS
+        ]).reshape(n, len(INPUT_FIELDS)))
+
+    def __len__(self) -> int:
+        return self.values.shape[0]
+
+    def column(self, name: str) -> np.ndarray:
+        return self.values[:, _FIELD_INDEX[name]]
+
+    def matrix(self, names: Sequence[str]) -> np.ndarray:
+        return self.values[:, [_FIELD_INDEX[name] for name in names]]
+
+    @property
+    def nhanes(self) -> np.ndarray:
+        """
+        (N, 9) matrix in NHANES codes. Column order matters! Must match
+        training (FEATURE_COLUMNS).
+        """
+        if self._nhanes is None:
+            features = self.values[:, _NHANES_INDEX]
+            # PAQ650 / SMQ020: Yes=1, No=2
+            features[:, _NHANES_YES_NO] = np.where(features[:, _NHANES_YES_NO] > 0, 1.0, 2.0)
+            self._nhanes = features
+        return self._nhanes
+
+class EvaluatorResult(ABC):
+    """Scores for a whole batch; `risks(row)` materializes one input."""
+    diseases: List[str]
+
+    @abstractmethod
+    def risks(self, row: int) -> List[Risk]:
+        pass
+
+    @abstractmethod
+    def probabilities(self) -> np.ndarray:
+        """(N, len(diseases)) probabilities, without building any objects."""
 
 class RiskEvaluator(ABC):
+    name: str = ""
+
     @abstractmethod
-    def evaluate(self, input_data: QuestionnaireInput) -> Dict[str, RiskScore]:
+    def evaluate(self, batch: FeatureBatch) -> EvaluatorResult:
         pass
 
+EVALUATORS: Dict[str, Callable[..., RiskEvaluator]] = {}
+
+def register_evaluator(name: str):
+    """Class decorator: makes an evaluator available to EvaluatorPipeline by name."""
+    def decorator(cls: Type[RiskEvaluator]) -> Type[RiskEvaluator]:
+        cls.name = name
+        EVALUATORS[name] = cls
+        return cls
+    return decorator
+
+class EvaluatorPipeline:
+    """
+    Runs every evaluator on one FeatureBatch; results keep evaluator order.
+    """
+    def __init__(self, evaluators: Sequence[RiskEvaluator]):
+        self.evaluators = list(evaluators)
+
+    @classmethod
+    def from_names(cls, names: Sequence[str] = EVALUATOR_NAMES, **context) -> "EvaluatorPipeline":
+        """`context` is passed to every evaluator constructor (e.g. registry=...)."""
+        unknown = [n for n in names if n not in EVALUATORS]
+        if unknown:
+            raise ValueError(f"Unknown evaluators {unknown}; registered: {sorted(EVALUATORS)}")
+        return cls([EVALUATORS[n](**context) for n in names])
+
+    def evaluate(self, batch: FeatureBatch) -> "PipelineResult":
+        return PipelineResult([evaluator.evaluate(batch) for evaluator in self.evaluators], len(batch))
+
+class PipelineResult:
+    def __init__(self, results: List[EvaluatorResult], size: int):
+        self.results = results
+        self.size = size
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def diseases(self) -> List[str]:
+        return [d for result in self.results for d in result.diseases]
+
+    def risks(self, row: int) -> List[Risk]:
+        return [risk for result in self.results for risk in result.risks(row)]
+
+    def all_risks(self) -> List[List[Risk]]:
+        return [self.risks(row) for row in range(self.size)]
+
+    def probabilities(self) -> Tuple[List[str], np.ndarray]:
+        if not self.results:
+            return [], np.zeros((self.size, 0))
+        return self.diseases, np.hstack([result.probabilities() for result in self.results])
+
+    def to_frame(self):
+        """Probabilities as a pandas DataFrame (one column per disease)."""
+        import pandas as pd
+
+        diseases, matrix = self.probabilities()
+        return pd.DataFrame(matrix, columns=diseases)
+
+@register_evaluator("screening")
 class RuleBasedEvaluator(RiskEvaluator):
-    def evaluate(self, input_data: QuestionnaireInput) -> Dict[str, RiskScore]:
-        risks = {}
-        
-        # 1. Musculoskeletal Risk
-        # Drivers: High screen time (>8h), Poor posture (pain often/always)
-        musculo_score = 0.0
-        musculo_reasons = []
-        musculo_recommendations = []
-        
-        if input_data.daily_screen_time_hours > 8:
-            musculo_score += 0.4
-            musculo_reasons.append("Daily screen time exceeds 8 hours.")
-            musculo_recommendations.append("Follow the 20-20-20 rule: Every 20 mins, look 20 ft away for 20 secs.")
-        
-        if input_data.neck_pain_frequency in [PainFrequency.OFTEN, PainFrequency.ALWAYS]:
-            musculo_score += 0.4
-            musculo_reasons.append("Frequent neck pain reported.")
-            musculo_recommendations.append("Check monitor ergonomics: Eye level should be at the top 1/3 of the screen.")
-            
-        if input_data.physical_activity_days_per_week < 2:
-            musculo_score += 0.2
-            musculo_reasons.append("Low physical activity.")
-            musculo_recommendations.append("Incorporate stretch breaks every hour.")
-
-        risks["musculoskeletal"] = self._create_risk_score(
-            "Musculoskeletal", musculo_score, musculo_reasons, musculo_recommendations
-        )
-
-        # 2. Sleep Risk
-        # Drivers: Low sleep (<6h), Screen time, Poor quality
-        sleep_score = 0.0
-        sleep_reasons = []
-        sleep_recommendations = []
-        
-        if input_data.sleep_hours < 6.0:
-            sleep_score += 0.5
-            sleep_reasons.append("Sleep duration is less than 6 hours.")
-            sleep_recommendations.append("Aim for 7-9 hours of consistent sleep.")
-            
-        if input_data.daily_screen_time_hours > 10:
-            sleep_score += 0.3
-            sleep_reasons.append("Excessive screen time may impact circadian rhythm.")
-            
-        if input_data.sleep_quality == SleepQuality.POOR:
-            sleep_score += 0.2
-            sleep_reasons.append("Self-reported poor sleep quality.")
-            sleep_recommendations.append("Enable device 'Night Mode' after sunset.")
-
-        risks["sleep"] = self._create_risk_score(
-            "Sleep Health", sleep_score, sleep_reasons, sleep_recommendations
-        )
-        
-        # 3. Mental Health Indicator (Proxy)
-        # Drivers: Social media > 3h, High Stress, Low Sleep
-        mental_score = 0.0
-        mental_reasons = []
-        mental_recommendations = []
-        
-        if input_data.social_media_hours > 3.0:
-            mental_score += 0.3
-            mental_reasons.append("High daily social media usage (>3 hours).")
-            mental_recommendations.append("Set app limits for social media reduction.")
-            
-        if input_data.stress_level >= 8:
-            mental_score += 0.4
-            mental_reasons.append("High self-reported stress level.")
-            mental_recommendations.append("Practice mindfulness or deep breathing exercises.")
-            
-        if input_data.sleep_hours < 5.0:
-             mental_score += 0.3 # Sleep deprivation exacerbates anxiety
-             mental_reasons.append("Severe sleep deprivation detected.")
-
-        risks["mental_health"] = self._create_risk_score(
-            "Digital Well-being", mental_score, mental_reasons, mental_recommendations
-        )
-
-        return risks
-
-    def _create_risk_score(self, category: str, score: float, reasons: List[str], recs: List[str]) -> RiskScore:
-        # Cap score at 1.0
-        final_score = min(score, 1.0)
-        
-        # Determine Level
-        if final_score < 0.3:
-            level = RiskLevel.LOW
-        elif final_score < 0.7:
-            level = RiskLevel.MODERATE
-        else:
-            level = RiskLevel.HIGH
-            
-        # Default text if low risk
-        if not reasons:
-            reasons = ["No significant risk factors identified."]
-        if not recs:
-            recs = ["Maintain current healthy habits."]
-
-        return RiskScore(
-            category=category,
-            score=round(final_score, 2),
-            level=level,
-            explanation="; ".join(reasons),
-            recommendations=recs
-        )
+    """
+    20-question screening domains (see app/core/screening.py).
+    """
+    def __init__(self, rules: Optional[ScreeningRules] = None, **context):
+        self.rules = rules or ScreeningRules()
+
+    def evaluate(self, batch: FeatureBatch) -> EvaluatorResult:
+        with metrics.stage("screening"):
+            return self.rules.evaluate(batch)
+
+def __getattr__(name: str):
+    # Re-exported lazily: ml_service itself builds on this module
+    if name == "MLRiskEngine":
+        from app.core.ml_service import MLRiskEngine
+        return MLRiskEngine
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,178 @@
+"""
+20-question screening domains, declared as data and scored as matrices.
+
+Each domain sums weighted boolean signals into a score; the highest tier
+whose `min_score` is reached sets level/probability, otherwise the `low`
+outcome applies. `factors="triggered"` lists the labels of the signals
+that fired, in declaration order. Adding a domain only means adding an
+entry to SCREENING_DOMAINS.
+"""
+
+import operator
+from typing import TYPE_CHECKING, Any, Dict, List, Sequence
+
+import numpy as np
+
+from app.models.schemas import RiskLevel
+from app.core.results import Risk
+
+if TYPE_CHECKING:
+    from app.core.risk_engine import FeatureBatch
+
+# Signal name -> (ClinicalInput field, comparison, value, factor label)
+SIGNALS = {
+    "dry_eyes": ("q4_dry_eyes", "==", True, "Dry/Tired Eyes"),
+    "headaches": ("q5_headaches", "==", True, "Frequent Headaches"),
+    "neck_pain": ("q6_neck_pain", "==", True, "Neck Stiffness"),
+    "back_pain": ("q7_back_pain", "==", True, "Lower Back Pain"),
+    "sedentary": ("q8_sedentary", "==", True, "Prolonged Sitting"),
+    "inactive": ("vigorous_activity", "==", False, "Low Activity"),  # Q9
+    "short_sleep": ("sleep_hours", "<", 7, "Low Sleep Duration"),  # Q10
+    "insomnia": ("q11_insomnia", "==", True, "Insomnia Symptoms"),
+    "overwhelmed": ("q12_overwhelmed", "==", True, "Feeling Overwhelmed"),
+    "drained": ("q13_drained", "==", True, "Emotional Exhaustion"),
+    "anxious": ("q14_anxious", "==", True, "Nervousness"),
+    "anhedonia": ("q15_anhedonia", "==", True, "Loss of Interest"),
+    "phone_bedtime": ("q16_phone_bedtime", "==", True, "Blue Light Exposure"),
+    "internet_anxiety": ("q17_internet_anxiety", "==", True, "Digital Dependency"),
+}
+
+SCREENING_DOMAINS = [
+    {
+        "disease": "Digital Eye Strain",
+        "weights": {"dry_eyes": 1, "headaches": 1},
+        "tiers": [(1, RiskLevel.MODERATE, 0.65), (2, RiskLevel.HIGH, 0.85)],
+        "factors": ["Frequent Headaches", "Dry/Tired Eyes"],
+        "steps": ["Follow 20-20-20 Rule.", "Blink more often."],
+        "low": (0.10, ["No major symptoms reported"], ["Maintain good screen habits."]),
+    },
+    {
+        "disease": "Musculoskeletal Disorder Risk",
+        "weights": {"neck_pain": 1, "back_pain": 1},
+        "tiers": [(1, RiskLevel.MODERATE, 0.75), (2, RiskLevel.HIGH, 0.75)],
+        "factors": ["Neck Stiffness", "Lower Back Pain"],
+        "steps": ["Ergonomic Audit", "Daily Stretching"],
+        "low": (0.10, ["Good posture indicators"], ["Keep active to prevent future issues."]),
+    },
+    {
+        "disease": "Sleep Deprivation/Disorder",
+        "weights": {"short_sleep": 1, "insomnia": 2, "phone_bedtime": 1},
+        "tiers": [(2, RiskLevel.MODERATE, 0.80), (3, RiskLevel.HIGH, 0.80)],
+        "factors": "triggered",
+        "steps": ["Digital Sunset (No phones 1h before bed)", "Consistent Wake Time"],
+        "low": (0.15, ["Good sleep hygiene"], ["Maintain 7-8h sleep schedule."]),
+    },
+    {
+        "disease": "High Chronic Stress / Burnout",
+        "weights": {"overwhelmed": 1, "drained": 1},
+        "tiers": [(1, RiskLevel.MODERATE, 0.70), (2, RiskLevel.HIGH, 0.70)],
+        "factors": ["Feeling Overwhelmed", "Emotional Exhaustion"],
+        "steps": ["Mindfulness Breaks", "Work-Life Boundaries"],
+        "low": (0.10, ["Balanced emotional state"], ["Continue stress management practices."]),
+    },
+    {
+        "disease": "Anxiety & Mood Risk",
+        "weights": {"anxious": 1, "anhedonia": 1, "internet_anxiety": 1},
+        "tiers": [(2, RiskLevel.MODERATE, 0.60)],
+        "factors": ["Nervousness", "Digital Dependency"],
+        "steps": ["Digital Detox", "Professional Counseling"],
+        "low": (0.10, ["Stable mood indicators"], ["Practice gratitude/journaling."]),
+    },
+    {
+        "disease": "Sedentary Lifestyle Risk",
+        "weights": {"sedentary": 1, "inactive": 1},
+        "tiers": [(1, RiskLevel.MODERATE, 0.65), (2, RiskLevel.HIGH, 0.65)],
+        "factors": ["Prolonged Sitting", "Low Activity"],
+        "steps": ["Standing Desk", "Hourly Movement Snacks"],
+        "low": (0.20, ["Active lifestyle"], ["Aim for 150min moderate activity/week."]),
+    },
+]
+
+_COMPARISONS = {"==": operator.eq, "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+
+class ScreeningRules:
+    """
+    SCREENING_DOMAINS compiled to matrices:
+      signals (N, S) @ weights (S, D) -> scores (N, D)
+      tier = number of tier thresholds reached (0 = low outcome)
+    """
+    def __init__(self, domains: Sequence[Dict[str, Any]] = SCREENING_DOMAINS, signals: Dict[str, tuple] = SIGNALS):
+        self.domains = list(domains)
+        used = [name for name in signals if any(name in d["weights"] for d in self.domains)]
+        self.signal_names = used
+        self.signal_specs = [signals[name] for name in used]
+        self._fields = [spec[0] for spec in self.signal_specs]
+        self._targets = np.array([float(spec[2]) for spec in self.signal_specs])
+        # One vectorized comparison per operator, not per signal
+        self._op_groups = [
+            (_COMPARISONS[op], np.array([k for k, spec in enumerate(self.signal_specs) if spec[1] == op]))
+            for op in sorted({spec[1] for spec in self.signal_specs})
+        ]
+
+        n_tiers = max(len(d["tiers"]) for d in self.domains)
+        self.weights = np.zeros((len(used), len(self.domains)), dtype=np.float64)
+        self.thresholds = np.full((len(self.domains), n_tiers), np.inf)
+        self.levels: List[List[RiskLevel]] = []
+        self.probabilities = np.zeros((len(self.domains), n_tiers + 1), dtype=np.float64)
+        for j, domain in enumerate(self.domains):
+            for name, weight in domain["weights"].items():
+                self.weights[used.index(name), j] = weight
+            tiers = sorted(domain["tiers"], key=lambda t: t[0])
+            self.thresholds[j, :len(tiers)] = [t[0] for t in tiers]
+            self.levels.append([RiskLevel.LOW] + [t[1] for t in tiers])
+            self.probabilities[j, 0] = domain["low"][0]
+            self.probabilities[j, 1:len(tiers) + 1] = [t[2] for t in tiers]
+        # Signals that contribute to each domain (for "triggered" factor lists)
+        self._domain_signals = [np.flatnonzero(self.weights[:, j]) for j in range(len(self.domains))]
+
+    def evaluate(self, batch: "FeatureBatch") -> "ScreeningBatch":
+        signals = self._signals(batch)
+        scores = signals @ self.weights
+        tiers = (scores[:, :, None] >= self.thresholds[None, :, :]).sum(axis=2)
+        return ScreeningBatch(self, signals, tiers)
+
+    def _signals(self, batch: "FeatureBatch") -> np.ndarray:
+        values = batch.matrix(self._fields)
+        signals = np.empty_like(values)
+        for compare, columns in self._op_groups:
+            signals[:, columns] = compare(values[:, columns], self._targets[columns])
+        return signals
+
+class ScreeningBatch:
+    """
+    Scored batch; Risk objects are only built when a row is read.
+    """
+    def __init__(self, rules: ScreeningRules, signals: np.ndarray, tiers: np.ndarray):
+        self.rules = rules
+        self.signals = signals
+        self.tiers = tiers
+        self.diseases = [d["disease"] for d in rules.domains]
+
+    def __len__(self) -> int:
+        return len(self.tiers)
+
+    def probabilities(self) -> np.ndarray:
+        return self.rules.probabilities[np.arange(len(self.diseases)), self.tiers]
+
+    def risks(self, row: int) -> List[Risk]:
+        rules = self.rules
+        results = []
+        for j, domain in enumerate(rules.domains):
+            tier = int(self.tiers[row, j])
+            if tier == 0:
+                _, factors, steps = domain["low"]
+            else:
+                steps = domain["steps"]
+                factors = domain["factors"]
+                if factors == "triggered":
+                    factors = [
+                        rules.signal_specs[k][3] for k in rules._domain_signals[j] if self.signals[row, k]
+                    ]
+            results.append(Risk(
+                disease=domain["disease"],
+                risk_level=rules.levels[j][tier],
+                probability=float(rules.probabilities[j, tier]),
+                contributing_factors=list(factors),
+                prevention_steps=list(steps),
+            ))
+        return results
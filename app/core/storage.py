@@ -1,9 +1,39 @@
+import atexit
+import glob
+import hashlib
 import json
 import os
-from datetime import datetime
-from typing import Dict, Any, List
+import queue
+import struct
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Any, Iterator, List, NamedTuple, Optional
+
+try:
+    import fcntl  # POSIX: serializes appends across uvicorn workers
+except ImportError:
+    fcntl = None
 from cryptography.fernet import Fernet
-from app.models.schemas import AssessmentResponse
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from app.core.results import Assessment
+from app.core import metrics, record_codec
+from app.core.structured_log import get_logger
+
+# Binary record frame: magic + format version + body length, then nonce + AES-GCM ciphertext.
+# Legacy records are base64 Fernet tokens ("gAAAA...") terminated by a newline.
+RECORD_MAGIC = b"VS"
+RECORD_HEADER = struct.Struct("<2sBI")
+RECORD_FORMAT = os.getenv("VITALSCAN_RECORD_FORMAT", "binary").lower()  # binary | fernet
+
+DROPPED_RECORDS = metrics.REGISTRY.counter(
+    "vitalscan_storage_dropped_total", "Assessments that could not be stored.", ["reason"])
+
+log = get_logger("storage")
 
 class SecurityManager:
     """
@@ -14,6 +44,10 @@ class SecurityManager:
         self.key_path = key_path
         self.key = self._load_or_generate_key()
         self.cipher = Fernet(self.key)
+        # Raw AEAD key for binary records, derived from the same secret
+        self.aead = AESGCM(HKDF(
+            algorithm=hashes.SHA256(), length=32, salt=None, info=b"vitalscan-record-v1"
+        ).derive(self.key))
 
     def _load_or_generate_key(self) -> bytes:
         if os.path.exists(self.key_path):
@@ -34,47 +68,479 @@ class SecurityManager:
         decrypted_bytes = self.cipher.decrypt(encrypted_data)
         return json.loads(decrypted_bytes.decode('utf-8'))
 
+    def encrypt_record(self, data: Dict[str, Any]) -> bytes:
+        """
+        Compact binary record: dictionary-coded, zlib-compressed, AES-GCM framed.
+        """
+        nonce = os.urandom(12)
+        header = RECORD_HEADER.pack(RECORD_MAGIC, record_codec.FORMAT_VERSION, 0)[:3]
+        body = nonce + self.aead.encrypt(nonce, record_codec.encode_assessment(data), header)
+        return RECORD_HEADER.pack(RECORD_MAGIC, record_codec.FORMAT_VERSION, len(body)) + body
+
+    def decrypt_record(self, record: bytes) -> Dict[str, Any]:
+        """
+        Decrypts either a binary record or a legacy Fernet token.
+        """
+        if not is_binary_record(record):
+            return self.decrypt_data(record.strip())
+        magic, version, length = RECORD_HEADER.unpack_from(record)
+        if version != record_codec.FORMAT_VERSION:
+            raise ValueError(f"Unsupported record format version {version}")
+        body = record[RECORD_HEADER.size:RECORD_HEADER.size + length]
+        payload = self.aead.decrypt(body[:12], body[12:], record[:3])
+        return record_codec.decode_assessment(payload)
+
+def is_binary_record(record: bytes) -> bool:
+    return record[:2] == RECORD_MAGIC
+
+# Index entry: record id (16 bytes), timestamp (epoch s), offset, length
+INDEX_ENTRY = struct.Struct("<16sdQI")
+SEGMENT_MAX_BYTES = int(os.getenv("VITALSCAN_SEGMENT_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Group commit: a background writer batches queued records into one write
+GROUP_COMMIT = os.getenv("VITALSCAN_GROUP_COMMIT", "true").lower() in ("1", "true", "yes")
+WRITE_QUEUE_SIZE = int(os.getenv("VITALSCAN_WRITE_QUEUE_SIZE", "10000"))
+WRITE_BATCH_SIZE = int(os.getenv("VITALSCAN_WRITE_BATCH_SIZE", "512"))
+FSYNC_POLICY = os.getenv("VITALSCAN_FSYNC_POLICY", "interval").lower()  # none | interval | batch
+FSYNC_INTERVAL_SECONDS = float(os.getenv("VITALSCAN_FSYNC_INTERVAL_SECONDS", "1.0"))
+
+class IndexEntry(NamedTuple):
+    record_id: bytes
+    timestamp: float
+    segment: str
+    offset: int
+    length: int
+
 class LocalStorage:
     """
-    Persists assessments to a local file (append-only log).
+    Persists assessments to a local, segmented append-only log.
     Data is fully encrypted at rest.
+
+    Each segment (`assessments.enc`, `assessments.000001.enc`, ...) has a
+    sidecar offset index (`<segment>.idx`, fixed-size entries), so records can
+    be fetched by assessment_id, tail reads are O(limit) and time-range scans
+    only decrypt matching records. Segments written before the index existed
+    are indexed once on startup.
+
+    A record saved again under the same assessment_id (deferred enrichment
+    stores the template advice first, then the upgraded advice) supersedes
+    the earlier one: readers only return the latest.
     """
-    def __init__(self, storage_path: str = "data/assessments.enc"):
+    def __init__(self, storage_path: str = "data/assessments.enc", max_segment_bytes: int = SEGMENT_MAX_BYTES,
+                 group_commit: bool = GROUP_COMMIT, record_format: str = RECORD_FORMAT,
+                 key_path: str = "data/secret.key"):
         self.storage_path = storage_path
-        self.security = SecurityManager()
-        os.makedirs(os.path.dirname(self.storage_path), exist_ok=True)
+        self.max_segment_bytes = max_segment_bytes
+        self.record_format = record_format
+        self.security = SecurityManager(key_path)
+        os.makedirs(os.path.dirname(self.storage_path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._by_id: Dict[bytes, IndexEntry] = {}
+        self._index_read_pos: Dict[str, int] = {}  # Bytes of each .idx already loaded
+        with self._exclusive():
+            for segment in self._segments():
+                self._recover_index(segment)
+        self._refresh_index()
 
-    def save_assessment(self, assessment: AssessmentResponse):
-        encrypted_record = self.security.encrypt_data(assessment.dict())
-        
-        # Append to file with newline delimiter (simple log format)
-        with open(self.storage_path, "ab") as f:
-            f.write(encrypted_record + b"\n")
+        self.writer = GroupCommitWriter(self) if group_commit else None
+
+    # --- Write path ---
+
+    def save_assessment(self, assessment: Assessment):
+        self.save_assessments([assessment])
+
+    def save_assessments(self, assessments: List[Assessment]):
+        """
+        Persists assessments. With group commit the records are queued for the
+        background writer (blocks only when the queue is full); otherwise they
+        are appended immediately.
+        """
+        if self.writer:
+            for assessment in assessments:
+                self.writer.submit(assessment)
+        else:
+            self._append(assessments, fsync=FSYNC_POLICY != "none")
+
+    def flush(self):
+        """Blocks until every queued record has been written."""
+        if self.writer:
+            self.writer.flush()
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
+
+    def _append(self, assessments: List[Assessment], fsync: bool = False):
+        """
+        Appends records with a single data write and a single index write.
+        A record that fails to encode is logged, counted and skipped; the
+        others are still written.
+        """
+        records = []
+        with metrics.stage("storage_encrypt"):
+            for a in assessments:
+                try:
+                    if self.record_format == "fernet":
+                        # Legacy format: newline-delimited Fernet tokens (length excludes the newline)
+                        records.append((a, self.security.encrypt_data(a.to_dict()), b"\n"))
+                    else:
+                        records.append((a, self.security.encrypt_record(a.to_dict()), b""))
+                except Exception as e:
+                    DROPPED_RECORDS.labels("encode").inc()
+                    log.error("storage.encode_failed", assessment_id=str(a.assessment_id),
+                              error=str(e), error_type=type(e).__name__)
+        if not records:
+            return
+        with metrics.stage("storage_write"), self._exclusive():
+            segment = self._active_segment()
+            with open(segment, "ab") as f:
+                offset = f.tell()
+                entries = []
+                for assessment, record, delimiter in records:
+                    entries.append(INDEX_ENTRY.pack(
+                        _id_key(assessment.assessment_id), _epoch(assessment.timestamp), offset, len(record)
+                    ))
+                    offset += len(record) + len(delimiter)
+                f.write(b"".join(record + delimiter for _, record, delimiter in records))
+                if fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            with open(_index_path(segment), "ab") as f:
+                f.write(b"".join(entries))
+                if fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+
+    def _sync(self):
+        """fsyncs the active segment and its index."""
+        with self._exclusive():
+            segment = self._active_segment()
+            for path in (segment, _index_path(segment)):
+                if os.path.exists(path):
+                    with open(path, "ab") as f:
+                        os.fsync(f.fileno())
+
+    @contextmanager
+    def _exclusive(self):
+        """Serializes writers within this process and across worker processes."""
+        with self._write_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.storage_path + ".lock", "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # --- Read path ---
 
     def load_recent_assessments(self, limit: int = 5) -> List[Dict[str, Any]]:
         """
-        Reads the last N assessments.
+        Reads the last N assessments (newest first) without scanning the log.
         """
-        if not os.path.exists(self.storage_path):
-            return []
-            
         results = []
+        seen = set()
         try:
-            with open(self.storage_path, "rb") as f:
-                lines = f.readlines()
-                
-            # Read from end
-            for line in reversed(lines):
+            for entry in self._iter_index_reversed():
                 if len(results) >= limit:
                     break
-                if line.strip():
-                    try:
-                        data = self.security.decrypt_data(line.strip())
-                        results.append(data)
-                    except Exception:
-                        continue # Skip corrupted/unreadable lines
-                        
+                if entry.record_id in seen:
+                    continue  # Superseded by a newer record
+                seen.add(entry.record_id)
+                data = self._read_entry(entry)
+                if data is not None:
+                    results.append(data)
             return results
         except Exception as e:
             print(f"Error loading data: {e}")
             return []
+
+    def get_assessment(self, assessment_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Fetches one assessment by id (None if unknown).
+        """
+        key = _id_key(assessment_id)
+        self._refresh_index()  # New or superseding records, from any process
+        with self._lock:
+            entry = self._by_id.get(key)
+        return self._read_entry(entry) if entry else None
+
+    def iter_assessments(self, start: Optional[datetime] = None,
+                         end: Optional[datetime] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yields assessments with start <= timestamp < end, oldest segment first.
+        Only records whose index timestamp matches are decrypted; superseded
+        records are skipped.
+        """
+        self._refresh_index()
+        for entry in self.iter_index(start, end):
+            with self._lock:
+                latest = self._by_id.get(entry.record_id)
+            if latest is not None and latest != entry:
+                continue
+            data = self._read_entry(entry)
+            if data is not None:
+                yield data
+
+    def iter_index(self, start: Optional[datetime] = None,
+                   end: Optional[datetime] = None) -> Iterator[IndexEntry]:
+        """
+        Index entries with start <= timestamp < end, oldest segment first and
+        in file order within a segment (see scan_index).
+        """
+        return scan_index(self.storage_path, start, end)
+
+    # --- Segments & index ---
+
+    def _segments(self) -> List[str]:
+        """Segment paths in write order (legacy base file first)."""
+        return _segment_paths(self.storage_path)
+
+    def _active_segment(self) -> str:
+        segments = self._segments()
+        if not segments:
+            return self.storage_path
+        current = segments[-1]
+        if os.path.getsize(current) < self.max_segment_bytes:
+            return current
+        root, ext = os.path.splitext(self.storage_path)
+        return f"{root}.{len(segments):06d}{ext}"
+
+    def _read_index(self, segment: str, start: int = 0) -> List[IndexEntry]:
+        try:
+            with open(_index_path(segment), "rb") as f:
+                f.seek(start)
+                raw = f.read()
+        except FileNotFoundError:
+            return []
+        raw = raw[:len(raw) - len(raw) % INDEX_ENTRY.size]  # Ignore a torn trailing entry
+        return [IndexEntry(rid, ts, segment, off, length) for rid, ts, off, length in INDEX_ENTRY.iter_unpack(raw)]
+
+    def _refresh_index(self):
+        """Loads index entries appended since the last refresh (by any process)."""
+        with self._lock:
+            for segment in self._segments():
+                start = self._index_read_pos.get(segment, 0)
+                entries = self._read_index(segment, start)
+                for entry in entries:
+                    self._by_id[entry.record_id] = entry
+                self._index_read_pos[segment] = start + len(entries) * INDEX_ENTRY.size
+
+    def _iter_index_reversed(self) -> Iterator[IndexEntry]:
+        """Newest-first index entries, reading the .idx files backwards in blocks."""
+        block = 256 * INDEX_ENTRY.size
+        for segment in reversed(self._segments()):
+            try:
+                f = open(_index_path(segment), "rb")
+            except FileNotFoundError:
+                continue
+            with f:
+                end = os.fstat(f.fileno()).st_size
+                end -= end % INDEX_ENTRY.size
+                while end > 0:
+                    start = max(0, end - block)
+                    f.seek(start)
+                    raw = f.read(end - start)
+                    for rid, ts, off, length in reversed(list(INDEX_ENTRY.iter_unpack(raw))):
+                        yield IndexEntry(rid, ts, segment, off, length)
+                    end = start
+
+    def _read_entry(self, entry: IndexEntry) -> Optional[Dict[str, Any]]:
+        try:
+            with open(entry.segment, "rb") as f:
+                f.seek(entry.offset)
+                return self.security.decrypt_record(f.read(entry.length))
+        except Exception:
+            return None # Skip corrupted/unreadable records
+
+    def _recover_index(self, segment: str):
+        """
+        Indexes records missing from the sidecar (legacy segments, or a crash
+        between the data write and the index write).
+        """
+        entries = self._read_index(segment)
+        size = os.path.getsize(segment)
+        with open(segment, "rb") as f:
+            offset = self._next_offset(f, entries[-1]) if entries else 0
+            if offset >= size:
+                return
+
+            new_entries = []
+            f.seek(offset)
+            while offset < size:
+                head = f.read(RECORD_HEADER.size)
+                if is_binary_record(head) and len(head) == RECORD_HEADER.size:
+                    record = head + f.read(RECORD_HEADER.unpack(head)[2])
+                    next_offset = offset + len(record)
+                else:
+                    f.seek(offset)
+                    line = f.readline()
+                    record = line.rstrip(b"\n")
+                    next_offset = offset + len(line)
+                if record.strip():
+                    try:
+                        data = self.security.decrypt_record(record)
+                        new_entries.append(INDEX_ENTRY.pack(
+                            _id_key(str(data.get("assessment_id", ""))),
+                            _epoch(data.get("timestamp")), offset, len(record)
+                        ))
+                    except Exception:
+                        pass # Unreadable record: not indexed, same as before
+                offset = next_offset
+
+        with open(_index_path(segment), "ab") as f:
+            f.write(b"".join(new_entries))
+
+    @staticmethod
+    def _next_offset(f, entry: IndexEntry) -> int:
+        """Offset after `entry` (legacy records are followed by a newline)."""
+        f.seek(entry.offset)
+        binary = is_binary_record(f.read(len(RECORD_MAGIC)))
+        return entry.offset + entry.length + (0 if binary else 1)
+
+def scan_index(storage_path: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+               block_entries: int = 4096) -> Iterator[IndexEntry]:
+    """
+    Read-only streaming scan of the `.idx` sidecars of the log at
+    `storage_path`: entries with start <= timestamp < end, oldest segment
+    first. Takes no lock, runs no recovery, writes nothing and keeps no id
+    map, so memory is one block of entries (for the bulk export). Records
+    not yet indexed (crash between data and index write) are not seen.
+    Nothing is decrypted.
+    """
+    lo = _epoch(start) if start else float("-inf")
+    hi = _epoch(end) if end else float("inf")
+    block = max(1, block_entries) * INDEX_ENTRY.size
+    for segment in _segment_paths(storage_path):
+        try:
+            f = open(_index_path(segment), "rb")
+        except FileNotFoundError:
+            continue
+        with f:
+            while True:
+                raw = f.read(block)
+                raw = raw[:len(raw) - len(raw) % INDEX_ENTRY.size]  # Ignore a torn trailing entry
+                if not raw:
+                    break
+                for rid, ts, off, length in INDEX_ENTRY.iter_unpack(raw):
+                    if lo <= ts < hi:
+                        yield IndexEntry(rid, ts, segment, off, length)
+
+def _segment_paths(storage_path: str) -> List[str]:
+    root, ext = os.path.splitext(storage_path)
+    numbered = sorted(glob.glob(f"{glob.escape(root)}.[0-9][0-9][0-9][0-9][0-9][0-9]{ext}"))
+    base = [storage_path] if os.path.exists(storage_path) else []
+    return base + numbered
+
+def _index_path(segment: str) -> str:
+    return segment + ".idx"
+
+def _id_key(assessment_id: str) -> bytes:
+    try:
+        return uuid.UUID(assessment_id).bytes
+    except (ValueError, TypeError, AttributeError):
+        return hashlib.md5(str(assessment_id).encode("utf-8")).digest()
+
+def _epoch(timestamp: Any) -> float:
+    if isinstance(timestamp, datetime):
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        return timestamp.timestamp()
+    if isinstance(timestamp, str):
+        try:
+            return _epoch(datetime.fromisoformat(timestamp.replace("Z", "+00:00")))
+        except ValueError:
+            return 0.0
+    return 0.0
+
+_STOP = object()
+
+class GroupCommitWriter:
+    """
+    Background writer thread for LocalStorage.
+    Drains up to `batch_size` queued assessments and flushes them with one
+    write. fsync policy: "none" (OS decides), "interval" (at most every
+    `fsync_interval` seconds, including after the queue goes idle) or "batch"
+    (every batch). A full queue blocks producers (backpressure).
+    """
+    def __init__(self, storage: LocalStorage, queue_size: int = WRITE_QUEUE_SIZE,
+                 batch_size: int = WRITE_BATCH_SIZE, fsync_policy: str = FSYNC_POLICY,
+                 fsync_interval: float = FSYNC_INTERVAL_SECONDS):
+        self.storage = storage
+        self.batch_size = max(1, batch_size)
+        self.fsync_policy = fsync_policy
+        self.fsync_interval = fsync_interval
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._last_fsync = time.monotonic()
+        self._dirty = False
+        self._thread = threading.Thread(target=self._run, name="storage-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, assessment: Assessment):
+        self._queue.put(assessment)
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def flush(self):
+        self._queue.join()
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout=10)
+
+    def _run(self):
+        while True:
+            try:
+                wait = self.fsync_interval if (self._dirty and self.fsync_policy == "interval") else None
+                item = self._queue.get(timeout=wait)
+            except queue.Empty:
+                self._fsync()  # Idle: make the last batch durable
+                continue
+
+            items = [item]
+            while item is not _STOP and len(items) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                items.append(item)
+
+            batch = [i for i in items if i is not _STOP]
+            stop = len(batch) < len(items)
+            try:
+                if batch:
+                    self._write(batch)
+                if stop and self._dirty:
+                    self._fsync()
+            except Exception as e:
+                # Disk full, permissions...: the batch is not retried
+                DROPPED_RECORDS.labels("write").inc(len(batch))
+                log.error("storage.write_failed", records=len(batch), error=str(e), error_type=type(e).__name__)
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+
+            if stop:
+                return
+
+    def _write(self, batch: List[Assessment]):
+        now = time.monotonic()
+        fsync = self.fsync_policy == "batch" or (
+            self.fsync_policy == "interval" and now - self._last_fsync >= self.fsync_interval
+        )
+        self.storage._append(batch, fsync=fsync)
+        if fsync:
+            self._last_fsync = now
+        self._dirty = not fsync and self.fsync_policy != "none"
+
+    def _fsync(self):
+        self.storage._sync()
+        self._last_fsync = time.monotonic()
+        self._dirty = False
@@ -0,0 +1,201 @@
+"""
+Structured (JSON lines) diagnostic log for the LLM layer.
+
+Callers only enqueue records: a QueueListener thread redacts, formats and
+writes them, so a slow disk never blocks a request. When the queue is full
+records are dropped (counted in vitalscan_log_dropped_total) rather than
+waited on. The file rotates by size and optionally by age.
+
+    log = get_logger("llm")
+    log.debug("llm.response", content=content)   # skipped unless VITALSCAN_LOG_LEVEL=DEBUG
+    log.warning("llm.call_failed", error=str(e))
+
+Profile fields (ClinicalInput names) are redacted from dict fields and from
+JSON-like text such as prompts unless VITALSCAN_LOG_REDACT=false. Records
+below WARNING are sampled at VITALSCAN_LOG_SAMPLE_RATE.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Optional
+
+from app.core import metrics
+from app.models.schemas import ClinicalInput
+
+LOG_FILE = os.getenv("VITALSCAN_LOG_FILE", "server_debug.log")  # Empty = stderr
+LOG_LEVEL = os.getenv("VITALSCAN_LOG_LEVEL", "INFO").upper()
+LOG_SAMPLE_RATE = float(os.getenv("VITALSCAN_LOG_SAMPLE_RATE", "1.0"))
+LOG_MAX_BYTES = int(os.getenv("VITALSCAN_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("VITALSCAN_LOG_BACKUP_COUNT", "5"))
+LOG_ROTATE_SECONDS = float(os.getenv("VITALSCAN_LOG_ROTATE_SECONDS", "0"))  # 0 = size only
+LOG_QUEUE_SIZE = int(os.getenv("VITALSCAN_LOG_QUEUE_SIZE", "10000"))
+LOG_MAX_FIELD_CHARS = int(os.getenv("VITALSCAN_LOG_MAX_FIELD_CHARS", "4000"))
+LOG_REDACT = os.getenv("VITALSCAN_LOG_REDACT", "true").lower() in ("1", "true", "yes")
+
+REDACTED = "[REDACTED]"
+PHI_FIELDS = frozenset(ClinicalInput.model_fields)
+# "age": 45 / "smoker_history": true / "name": "..." inside prompts and replies
+_PHI_PATTERN = re.compile(
+    r'"(%s)"(\s*:\s*)("(?:[^"\\]|\\.)*"|[^,}\s]+)' % "|".join(sorted(PHI_FIELDS, key=len, reverse=True))
+)
+
+LOG_DROPPED = metrics.REGISTRY.counter(
+    "vitalscan_log_dropped_total", "Log records dropped because the log queue was full.")
+
+def redact(value: Any) -> Any:
+    """Replaces profile values in dicts (recursively) and JSON-like strings."""
+    if isinstance(value, dict):
+        return {k: REDACTED if k in PHI_FIELDS else redact(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(v) for v in value]
+    if isinstance(value, str) and '"' in value:
+        return _PHI_PATTERN.sub(lambda m: f'"{m.group(1)}"{m.group(2)}"{REDACTED}"', value)
+    return value
+
+class JSONLinesFormatter(logging.Formatter):
+    """One JSON object per record: ts, level, logger, event + structured fields."""
+    def __init__(self, redact_fields: bool = LOG_REDACT, max_field_chars: int = LOG_MAX_FIELD_CHARS):
+        super().__init__()
+        self.redact_fields = redact_fields
+        self.max_field_chars = max_field_chars
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds")
+                  .replace("+00:00", "Z"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        for key, value in getattr(record, "fields", {}).items():
+            if self.redact_fields:
+                value = redact(value)
+            if isinstance(value, str) and len(value) > self.max_field_chars:
+                value = f"{value[:self.max_field_chars]}...[{len(value) - self.max_field_chars} chars truncated]"
+            entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class SizeTimeRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler that also rolls over every `interval` seconds (0 = size only)."""
+    def __init__(self, filename: str, max_bytes: int, backup_count: int, interval: float = 0):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True)
+        self.interval = interval
+        self._rollover_at = time.time() + interval if interval > 0 else None
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self._rollover_at is not None and time.time() >= self._rollover_at:
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self):
+        super().doRollover()
+        if self._rollover_at is not None:
+            self._rollover_at = time.time() + self.interval
+
+class _SamplingFilter(logging.Filter):
+    """Keeps every WARNING and above; lower levels with probability `rate`."""
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or self.rate >= 1.0 or random.random() < self.rate
+
+class _NonBlockingQueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting (JSON, redaction) happens on the listener thread
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_DROPPED.inc()
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self):
+        # Wait for room: the queue may be full when the app shuts down
+        self.queue.put(self._sentinel)
+
+class StructuredLogger:
+    """
+    Thin wrapper over a stdlib logger: `log.info("event", key=value, ...)`.
+    Disabled levels cost one isEnabledFor() check.
+    """
+    def __init__(self, logger: logging.Logger):
+        self.logger = logger
+
+    def debug(self, event: str, **fields: Any):
+        self._log(logging.DEBUG, event, fields)
+
+    def info(self, event: str, **fields: Any):
+        self._log(logging.INFO, event, fields)
+
+    def warning(self, event: str, **fields: Any):
+        self._log(logging.WARNING, event, fields)
+
+    def error(self, event: str, **fields: Any):
+        self._log(logging.ERROR, event, fields)
+
+    def is_enabled(self, level: int) -> bool:
+        return self.logger.isEnabledFor(level)
+
+    def _log(self, level: int, event: str, fields: dict):
+        if self.logger.isEnabledFor(level):
+            self.logger.log(level, event, extra={"fields": fields})
+
+_listener: Optional[_Listener] = None
+_setup_lock = threading.Lock()
+
+def configure(log_file: str = LOG_FILE, level: str = LOG_LEVEL, sample_rate: float = LOG_SAMPLE_RATE):
+    """
+    Attaches the queue handler to the "vitalscan" logger and starts the writer
+    thread. Called on first get_logger(); call again to reconfigure.
+    """
+    global _listener
+    with _setup_lock:
+        shutdown()
+        if log_file:
+            os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+            target: logging.Handler = SizeTimeRotatingFileHandler(log_file, LOG_MAX_BYTES, LOG_BACKUP_COUNT,
+                                                                  LOG_ROTATE_SECONDS)
+        else:
+            target = logging.StreamHandler()
+        target.setFormatter(JSONLinesFormatter())
+
+        handler = _NonBlockingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+        handler.addFilter(_SamplingFilter(sample_rate))
+        root = logging.getLogger("vitalscan")
+        root.handlers = [handler]
+        root.setLevel(getattr(logging, level, logging.INFO))
+        root.propagate = False
+
+        _listener = _Listener(handler.queue, target, respect_handler_level=True)
+        _listener.start()
+
+def shutdown():
+    """Flushes queued records and stops the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+atexit.register(shutdown)
+
+def get_logger(name: str) -> StructuredLogger:
+    if _listener is None:
+        configure()
+    return StructuredLogger(logging.getLogger(f"vitalscan.{name}"))
@@ -0,0 +1,239 @@
+import json
+import math
+import os
+from typing import Any, Dict, Optional, Sequence, Union
+
+import numpy as np
+
+class CompiledTreeEnsemble:
+    """
+    Dependency-free predictor for a binary:logistic XGBoost booster.
+
+    Trees are flattened into (n_trees, max_nodes) NumPy arrays and a batch is
+    evaluated by walking every tree one level at a time. Split thresholds are
+    stored in raw NHANES units when a StandardScaler was folded in at export,
+    so callers pass the unscaled feature matrix.
+    """
+    # Consumed by MLRiskEngine: no StandardScaler.transform before predict_proba
+    takes_raw_features = True
+
+    # Arrays written by save_arrays(); next_left/next_right are stored too so a
+    # memory-mapped load derives nothing (pages stay shared between workers)
+    ARRAYS = ("feature", "threshold", "left", "right", "next_left", "next_right", "default_left", "value")
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, left: np.ndarray, right: np.ndarray,
+                 default_left: np.ndarray, value: np.ndarray, base_margin: float, max_depth: int,
+                 next_left: Optional[np.ndarray] = None, next_right: Optional[np.ndarray] = None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.value = value
+        self.base_margin = float(base_margin)
+        self.max_depth = int(max_depth)
+        if next_left is None or next_right is None:
+            # Leaves loop back onto themselves so the walk needs no masking
+            node_ids = np.broadcast_to(np.arange(left.shape[1], dtype=np.int32), left.shape)
+            next_left = np.where(left < 0, node_ids, left).astype(np.int32)
+            next_right = np.where(left < 0, node_ids, right).astype(np.int32)
+        self.next_left = next_left
+        self.next_right = next_right
+        self._tree_ids = np.arange(left.shape[0])[None, :]
+
+    @classmethod
+    def from_xgboost_json(cls, model: Union[str, bytes, Dict[str, Any]],
+                          scaler_mean: Optional[Sequence[float]] = None,
+                          scaler_scale: Optional[Sequence[float]] = None) -> "CompiledTreeEnsemble":
+        """
+        Builds the arrays from `Booster.save_raw("json")`. When scaler
+        parameters are given, thresholds are mapped back to raw units
+        (x_scaled < t  <=>  x_raw < t * scale + mean, for scale > 0), see
+        _fold_thresholds for the exact float32 boundary. Without them the
+        booster is assumed to take the features as they are.
+        """
+        if not isinstance(model, dict):
+            model = json.loads(model)
+        learner = model["learner"]
+        if learner["objective"]["name"] != "binary:logistic":
+            raise ValueError(f"Unsupported objective: {learner['objective']['name']}")
+        booster = learner["gradient_booster"]
+        if booster["name"] != "gbtree":
+            raise ValueError(f"Unsupported booster: {booster['name']}")
+
+        trees = booster["model"]["trees"]
+        n_trees = len(trees)
+        max_nodes = max(len(t["left_children"]) for t in trees)
+        feature = np.zeros((n_trees, max_nodes), dtype=np.int32)
+        threshold = np.zeros((n_trees, max_nodes), dtype=np.float64)
+        left = np.full((n_trees, max_nodes), -1, dtype=np.int32)
+        right = np.full((n_trees, max_nodes), -1, dtype=np.int32)
+        default_left = np.zeros((n_trees, max_nodes), dtype=bool)
+        value = np.zeros((n_trees, max_nodes), dtype=np.float64)
+
+        for i, tree in enumerate(trees):
+            if any(tree.get("split_type", [])):
+                raise ValueError("Categorical splits are not supported")
+            n = len(tree["left_children"])
+            left[i, :n] = tree["left_children"]
+            right[i, :n] = tree["right_children"]
+            default_left[i, :n] = np.asarray(tree["default_left"], dtype=bool)
+            conditions = np.asarray(tree["split_conditions"], dtype=np.float32).astype(np.float64)
+            leaf = left[i, :n] < 0
+            # For leaves, split_conditions holds the leaf value
+            value[i, :n] = np.where(leaf, conditions, 0.0)
+            feature[i, :n] = np.where(leaf, 0, tree["split_indices"])
+            threshold[i, :n] = np.where(leaf, 0.0, conditions)
+
+        n_features = int(feature.max()) + 1
+        if scaler_mean is not None and scaler_scale is not None:
+            mean = np.asarray(scaler_mean, dtype=np.float64)
+            scale = np.asarray(scaler_scale, dtype=np.float64)
+            if np.any(scale <= 0):
+                raise ValueError("Scaler with non-positive scale cannot be folded into thresholds")
+        else:
+            # Identity scaler: still moves the float32 boundary into float64
+            mean = np.zeros(n_features)
+            scale = np.ones(n_features)
+        internal = left >= 0
+        folded = _fold_thresholds(threshold[internal], mean[feature[internal]], scale[feature[internal]])
+        threshold = np.zeros_like(threshold)
+        threshold[internal] = folded
+
+        base_score = float(str(learner["learner_model_param"]["base_score"]).strip("[]"))
+        base_margin = math.log(base_score / (1.0 - base_score))
+        return cls(feature, threshold, left, right, default_left, value, base_margin, _max_depth(left, right))
+
+    def predict_margin(self, X: np.ndarray) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float64)
+        n = X.shape[0]
+        node = np.zeros((n, self.feature.shape[0]), dtype=np.int32)
+        rows = np.arange(n)[:, None]
+        trees = self._tree_ids
+        for _ in range(self.max_depth):
+            x = X[rows, self.feature[trees, node]]
+            go_left = x < self.threshold[trees, node]
+            missing = np.isnan(x)
+            if missing.any():
+                go_left = np.where(missing, self.default_left[trees, node], go_left)
+            node = np.where(go_left, self.next_left[trees, node], self.next_right[trees, node])
+        return self.value[trees, node].sum(axis=1) + self.base_margin
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Same shape as XGBClassifier.predict_proba: (N, 2)."""
+        p = 1.0 / (1.0 + np.exp(-self.predict_margin(X)))
+        return np.column_stack([1.0 - p, p])
+
+    def save_arrays(self, directory: str):
+        """One .npy per array plus meta.json, for memory-mapped loading."""
+        os.makedirs(directory, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(getattr(self, name)))
+        with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"base_margin": self.base_margin, "max_depth": self.max_depth}, f)
+
+    @classmethod
+    def load_arrays(cls, directory: str, mmap: bool = True) -> "CompiledTreeEnsemble":
+        """
+        With mmap=True the arrays are read-only views of the page cache, so
+        every worker process maps the same physical pages.
+        """
+        mode = "r" if mmap else None
+        # Plain ndarray views of the mapping: same pages, without np.memmap's per-index overhead
+        arrays = {
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mode).view(np.ndarray)
+            for name in cls.ARRAYS
+        }
+        with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        return cls(arrays["feature"], arrays["threshold"], arrays["left"], arrays["right"],
+                   arrays["default_left"], arrays["value"], meta["base_margin"], meta["max_depth"],
+                   next_left=arrays["next_left"], next_right=arrays["next_right"])
+
+def fold_scaler_into_xgboost_json(model: Union[str, bytes, Dict[str, Any]], scaler_mean: Sequence[float],
+                                  scaler_scale: Sequence[float]) -> Dict[str, Any]:
+    """
+    Rewrites the split conditions of a booster JSON dump in raw feature
+    units and tags it `input_space=raw`, so the booster can score unscaled
+    features. XGBoost stores thresholds and casts inputs as float32, see
+    _fold_thresholds_f32 for how the boundary is rounded.
+    """
+    model = json.loads(model) if not isinstance(model, dict) else json.loads(json.dumps(model))
+    learner = model["learner"]
+    mean = np.asarray(scaler_mean, dtype=np.float64)
+    scale = np.asarray(scaler_scale, dtype=np.float64)
+    if np.any(scale <= 0):
+        raise ValueError("Scaler with non-positive scale cannot be folded into thresholds")
+    if learner.get("attributes", {}).get("input_space") == "raw":
+        raise ValueError("Booster already takes raw features")
+
+    for tree in learner["gradient_booster"]["model"]["trees"]:
+        left = np.asarray(tree["left_children"])
+        internal = left >= 0
+        if not internal.any():
+            continue
+        conditions = np.asarray(tree["split_conditions"], dtype=np.float32).astype(np.float64)
+        features = np.asarray(tree["split_indices"])[internal]
+        conditions[internal] = _fold_thresholds_f32(conditions[internal], mean[features], scale[features])
+        tree["split_conditions"] = [float(np.float32(c)) for c in conditions]
+
+    learner.setdefault("attributes", {})["input_space"] = "raw"
+    return model
+
+def _max_depth(left: np.ndarray, right: np.ndarray) -> int:
+    """Longest root-to-leaf path over all trees (number of level steps)."""
+    best = 0
+    for t in range(left.shape[0]):
+        stack = [(0, 0)]
+        while stack:
+            node, d = stack.pop()
+            if left[t, node] < 0:
+                best = max(best, d)
+                continue
+            stack.append((int(left[t, node]), d + 1))
+            stack.append((int(right[t, node]), d + 1))
+    return best
+
+def _fold_thresholds(t: np.ndarray, mean: np.ndarray, scale: np.ndarray) -> np.ndarray:
+    """
+    Raw-unit thresholds r such that, for any float64 x,
+        x < r  <=>  float32((x - mean) / scale) < t
+    i.e. exactly the decision XGBoost makes on StandardScaler output (it
+    compares in float32). Found by bisection around t * scale + mean.
+    """
+    t32 = t.astype(np.float32)
+
+    def right_of(x):
+        return ((x - mean) / scale).astype(np.float32) >= t32
+
+    guess = t * scale + mean
+    width = (np.abs(guess) + scale) * 1e-6
+    lo, hi = guess - width, guess + width
+    for _ in range(64):
+        bad = right_of(lo) | ~right_of(hi)
+        if not bad.any():
+            break
+        width = np.where(bad, width * 16, width)
+        lo, hi = guess - width, guess + width
+
+    # Invariant: right_of(lo) is False, right_of(hi) is True
+    for _ in range(128):
+        if np.all(np.nextafter(lo, hi) >= hi):
+            break
+        mid = lo + (hi - lo) / 2
+        go_right = right_of(mid)
+        hi = np.where(go_right, mid, hi)
+        lo = np.where(go_right, lo, mid)
+    return hi
+
+def _fold_thresholds_f32(t: np.ndarray, mean: np.ndarray, scale: np.ndarray) -> np.ndarray:
+    """
+    float32 version of _fold_thresholds: the exact raw boundary rounded
+    down to float32. XGBoost's cut points sit on observed values (e.g. an
+    HbA1c of 6.1, boundary just below it), so rounding down keeps
+    float32(6.1) on the same side as the float64 value it came from.
+    """
+    r = _fold_thresholds(t, mean, scale)
+    r32 = r.astype(np.float32)
+    r32 = np.where(r32.astype(np.float64) > r, np.nextafter(r32, np.float32(-np.inf)), r32)
+    return r32.astype(np.float64)
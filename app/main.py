@@ -1,9 +1,24 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, Response
+
+from app.core import metrics
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Model artifacts + LLM client load in the background (concurrently), not at
+    # import time: /healthz answers at once, /readyz flips to 200 when loaded
+    loading = asyncio.create_task(endpoints.load_services())
+    yield
+    loading.cancel()
+    endpoints.shutdown_services()
 
 app = FastAPI(
+    lifespan=lifespan,
     title="AI-Assisted Health Risk Assessment Platform",
     description="Privacy-first, AI-driven health risk intelligence API.",
     version="0.1.0",
@@ -25,12 +40,38 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency for /metrics (VITALSCAN_METRICS=false to turn off)
+if metrics.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
 from app.api.v1 import endpoints
 app.include_router(endpoints.router, prefix="/api/v1", tags=["Assessment"])
 
 # Mount Frontend (Static Files)
 app.mount("/static", StaticFiles(directory="frontend"), name="static")
 
+@app.get("/healthz", tags=["Health"])
+async def healthz():
+    """Liveness: the process is up and serving."""
+    return {"status": "ok"}
+
+@app.get("/readyz", tags=["Health"])
+async def readyz():
+    """Readiness: models loaded and warmed up. Reports load times (seconds)."""
+    state = endpoints.startup_state
+    status_code = 200 if state["ready"] else 503
+    return JSONResponse(status_code=status_code, content={
+        "status": "ready" if state["ready"] else ("failed" if state["error"] else "loading"),
+        "error": state["error"],
+        "model_version": endpoints.risk_engine.model_version if endpoints.risk_engine else None,
+        "load_times": state["load_times"],
+    })
+
+@app.get("/metrics", tags=["Health"], include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint: stage timings, request latency, LLM fallbacks, caches, storage queue."""
+    return Response(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.get("/", tags=["Assessment"])
 async def root():
     return FileResponse('frontend/index.html')
@@ -95,8 +95,22 @@ class DiseaseRisk(BaseModel):
     contributing_factors: List[str] = Field(..., example=["High HbA1c", "Elevated BMI"])
     prevention_steps: List[str] = Field(..., example=["Aim for 150 mins activity/week"])
 
+class EnrichmentStatus(str, Enum):
+    PENDING = "pending"      # Template advice; LLM enrichment still running
+    COMPLETE = "complete"    # Final advice (LLM or template fallback)
+
 class AssessmentResponse(BaseModel):
     assessment_id: str
     timestamp: datetime
     risks: List[DiseaseRisk]
+    enrichment_status: EnrichmentStatus = EnrichmentStatus.COMPLETE
     disclaimer: str = "ESTIMATE ONLY. NOT A DIAGNOSIS. Consult a physician."
+
+# Upper bound for a single batch submission (employer screening campaigns)
+MAX_BATCH_SIZE = 5000
+
+class BatchAssessmentRequest(BaseModel):
+    inputs: List[ClinicalInput] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+class BatchAssessmentResponse(BaseModel):
+    assessments: List[AssessmentResponse]
@@ -0,0 +1,147 @@
+"""
+Microbenchmarks for the assessment pipeline stages.
+
+    python benchmarks/bench_micro.py [--quick] [--only engine,storage] [--out results.json]
+
+Runs in template mode (no LLM calls). Engine benchmarks need trained
+models (a bundle under ml/models/bundles or the legacy pickles); they are
+recorded as skipped otherwise. Results go to benchmarks/results/.
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+# Template mode regardless of .env (load_dotenv never overrides a set variable)
+os.environ["HF_TOKEN"] = ""
+
+from common import ROOT, example_payload, random_payloads, save_results, time_calls  # noqa: E402
+from app.models.schemas import ClinicalInput, RiskLevel  # noqa: E402
+from app.core.cache import ResultCache  # noqa: E402
+from app.core.llm_service import SYSTEM_PROMPT, LLMService, estimate_tokens  # noqa: E402
+from app.core.results import Assessment, Risk  # noqa: E402
+from app.core.risk_engine import FeatureBatch  # noqa: E402
+from app.core.screening import ScreeningRules  # noqa: E402
+from app.core.storage import LocalStorage  # noqa: E402
+
+# A reply cut off mid-way through the third disease
+TRUNCATED_REPLY = (
+    '```json\n{"Type 2 Diabetes": {"prevention_steps": ["**Walk**: 15 min after meals. *Why*: x. *Result*: y.", '
+    '"**Sleep**: 7.5h. *Why*: x. *Result*: y."]}, "Hypertension": {"prevention_steps": ["**Salt**: none at the '
+    'table. *Why*: x. *Result*: y."]}, "Digital Eye Strain": {"prevention_steps": ["**20-20-20**: every 20 min'
+)
+
+def bench_engine(iterations: int) -> dict:
+    from app.core.ml_service import MLRiskEngine
+
+    engine = MLRiskEngine(model_dir=os.path.join(ROOT, "ml", "models"))
+    engine.result_cache = ResultCache(max_size=0)  # Measure the pipeline, not the memo
+    example = ClinicalInput(**example_payload())
+    inputs = [ClinicalInput(**p) for p in random_payloads(1000)]
+
+    results = {
+        "assess": time_calls(lambda: engine.assess(example), iterations),
+        "score_many_x1000": time_calls(lambda: engine.score_many(inputs), max(3, iterations // 200), warmup=1),
+    }
+    results["score_many_x1000"]["rows"] = len(inputs)
+
+    engine.result_cache = ResultCache()
+    engine.assess(example)
+    results["assess_memo_hit"] = time_calls(lambda: engine.assess(example), iterations)
+    results["model_version"] = engine.model_version
+    return results
+
+def bench_screening(iterations: int) -> dict:
+    # Successor of MLRiskEngine._calculate_screening_score (compiled rules)
+    rules = ScreeningRules()
+    batch = FeatureBatch.from_inputs([ClinicalInput(**example_payload())])
+    return {"screening_rules": time_calls(lambda: rules.evaluate(batch).risks(0), iterations)}
+
+def bench_llm(iterations: int) -> dict:
+    from app.core.ml_service import ModelRisks
+
+    llm = LLMService()
+    example = ClinicalInput(**example_payload())
+    rules = ScreeningRules()
+    risks = rules.evaluate(FeatureBatch.from_inputs([example])).risks(0) + [
+        ModelRisks._build_risk("Type 2 Diabetes", 0.55, "Elevated Hba1C", False, False),
+        Risk("Hypertension", RiskLevel.HIGH, 0.8, ["Elevated Systolic Bp"], []),
+    ]
+    profile = example.dict()
+    results = {
+        "build_prompt": time_calls(lambda: llm._build_prompt(risks, profile), iterations),
+        "repair_json": time_calls(lambda: llm._repair_json(TRUNCATED_REPLY), iterations),
+        "parse_advice": time_calls(lambda: llm._parse_advice(TRUNCATED_REPLY), iterations),
+    }
+    # Estimated input size: static system prefix + per-request user message
+    results["build_prompt"]["system_tokens"] = estimate_tokens(SYSTEM_PROMPT)
+    results["build_prompt"]["user_tokens"] = estimate_tokens(llm._build_prompt(risks, profile))
+    return results
+
+def bench_storage(iterations: int) -> dict:
+    rules = ScreeningRules()
+    risks = rules.evaluate(FeatureBatch.from_inputs([ClinicalInput(**example_payload())])).risks(0)
+    LLMService()._template_fallback(risks)
+    new_assessment = lambda: Assessment.new([r.copy() for r in risks])
+
+    tmp = tempfile.mkdtemp(prefix="vitalscan-bench-")
+    try:
+        results = {}
+        for name, group_commit in (("save_assessment_direct", False), ("save_assessment_group_commit", True)):
+            storage = LocalStorage(os.path.join(tmp, name, "assessments.enc"), group_commit=group_commit,
+                                   key_path=os.path.join(tmp, "secret.key"))
+            results[name] = time_calls(lambda: storage.save_assessment(new_assessment()), iterations)
+            started = time.perf_counter()
+            storage.flush()
+            results[name]["flush_ms"] = round((time.perf_counter() - started) * 1000, 3)
+            storage.close()
+
+        storage = LocalStorage(os.path.join(tmp, "save_assessment_direct", "assessments.enc"), group_commit=False,
+                               key_path=os.path.join(tmp, "secret.key"))
+        results["load_recent_assessments_5"] = time_calls(lambda: storage.load_recent_assessments(5), iterations)
+        results["get_assessment"] = time_calls(
+            lambda: storage.get_assessment(storage.load_recent_assessments(1)[0]["assessment_id"]), iterations
+        )
+        return results
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+BENCHMARKS = {
+    "engine": bench_engine,
+    "screening": bench_screening,
+    "llm": bench_llm,
+    "storage": bench_storage,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--quick", action="store_true", help="200 iterations per benchmark")
+    parser.add_argument("--only", default="", help=f"comma-separated subset of {','.join(BENCHMARKS)}")
+    parser.add_argument("--out", default=None, help="result file (default: benchmarks/results/...)")
+    args = parser.parse_args()
+    iterations = 200 if args.quick else args.iterations
+    selected = [n.strip() for n in args.only.split(",") if n.strip()] or list(BENCHMARKS)
+
+    results = {}
+    for group in selected:
+        print(f"--- {group} ---")
+        try:
+            group_results = BENCHMARKS[group](iterations)
+        except (FileNotFoundError, RuntimeError) as e:
+            print(f"skipped: {e}")
+            results[group] = {"skipped": str(e)}
+            continue
+        for name, stats in group_results.items():
+            if isinstance(stats, dict):
+                print(f"{name:<32} p50 {stats['p50_ms']:>9.4f} ms   p95 {stats['p95_ms']:>9.4f} ms   "
+                      f"p99 {stats['p99_ms']:>9.4f} ms")
+        results[group] = group_results
+
+    path = save_results("micro", results, {"iterations": iterations, "groups": selected}, args.out)
+    print(f"\nResults saved to {path}")
+
+if __name__ == "__main__":
+    main()
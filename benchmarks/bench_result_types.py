@@ -0,0 +1,105 @@
+"""
+Microbenchmark: per-request cost of the result representation.
+
+Compares what one /assess request did with Pydantic models end to end
+(validated DiseaseRisk x8, input.dict() for the LLM profile, validated
+AssessmentResponse, JSON response, .dict() for storage) with the internal
+Risk/Assessment path (app/core/results.py). Scoring itself is identical in
+both and not measured.
+
+    python benchmarks/bench_result_types.py [--iterations 20000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+# Allow `python benchmarks/bench_result_types.py` from the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.models.schemas import AssessmentResponse, ClinicalInput, DiseaseRisk, RiskLevel
+from app.core.results import Assessment, Risk, dumps
+
+EXAMPLE = ClinicalInput(**ClinicalInput.Config.json_schema_extra["example"])
+# (disease, level, probability, factors, steps) as produced by the engine for EXAMPLE
+RISKS = [
+    ("Type 2 Diabetes", RiskLevel.MODERATE, 0.52, ["High BMI"], ["Consult your doctor for a checkup."]),
+    ("Hypertension", RiskLevel.HIGH, 0.81, ["Elevated Systolic Bp", "High BMI"],
+     ["Consult your doctor for a checkup.", "Prioritize lifestyle changes immediately."]),
+    ("Digital Eye Strain", RiskLevel.HIGH, 0.85, ["Frequent Headaches", "Dry/Tired Eyes"],
+     ["Follow 20-20-20 Rule.", "Blink more often."]),
+    ("Musculoskeletal Disorder Risk", RiskLevel.MODERATE, 0.75, ["Neck Stiffness", "Lower Back Pain"],
+     ["Ergonomic Audit", "Daily Stretching"]),
+    ("Sleep Deprivation/Disorder", RiskLevel.HIGH, 0.80, ["Low Sleep Duration", "Insomnia Symptoms"],
+     ["Digital Sunset (No phones 1h before bed)", "Consistent Wake Time"]),
+    ("High Chronic Stress / Burnout", RiskLevel.MODERATE, 0.70, ["Feeling Overwhelmed", "Emotional Exhaustion"],
+     ["Mindfulness Breaks", "Work-Life Boundaries"]),
+    ("Anxiety & Mood Risk", RiskLevel.LOW, 0.10, ["Stable mood indicators"], ["Practice gratitude/journaling."]),
+    ("Sedentary Lifestyle Risk", RiskLevel.HIGH, 0.65, ["Prolonged Sitting", "Low Activity"],
+     ["Standing Desk", "Hourly Movement Snacks"]),
+]
+
+def pydantic_request():
+    risks = [
+        DiseaseRisk(disease=d, risk_level=level, probability=p, contributing_factors=list(f), prevention_steps=list(s))
+        for d, level, p, f, s in RISKS
+    ]
+    profile = EXAMPLE.dict()  # LLM profile, built even in template mode
+    response = AssessmentResponse(assessment_id="bench", timestamp=datetime.now(timezone.utc), risks=risks)
+    body = json.dumps(response.model_dump(mode="json")).encode("utf-8")  # FastAPI response_model path
+    record = response.dict()  # LocalStorage._append
+    return response, profile, body, record
+
+def internal_request():
+    risks = [Risk(d, level, p, list(f), list(s)) for d, level, p, f, s in RISKS]
+    response = Assessment("bench", datetime.now(timezone.utc), risks)
+    body = dumps(response.to_dict())  # ORJSONResponse
+    record = response.to_dict()
+    return response, body, record
+
+def measure(fn, iterations: int) -> dict:
+    for _ in range(min(iterations, 1000)):
+        fn()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    micros = (time.perf_counter() - started) / iterations * 1e6
+
+    # Allocation: peak bytes while handling one request, and bytes kept by its result
+    samples = min(iterations, 2000)
+    tracemalloc.start()
+    peak_total = 0
+    for _ in range(samples):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        fn()
+        peak_total += tracemalloc.get_traced_memory()[1] - before
+    kept = []
+    before = tracemalloc.get_traced_memory()[0]
+    for _ in range(samples):
+        kept.append(fn()[0])
+    retained = (tracemalloc.get_traced_memory()[0] - before) / samples
+    tracemalloc.stop()
+    return {"us_per_request": round(micros, 1), "peak_bytes": round(peak_total / samples),
+            "retained_bytes": round(retained)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    results = {"pydantic": measure(pydantic_request, args.iterations),
+               "internal": measure(internal_request, args.iterations)}
+    print(f"{'path':<10} {'us/request':>11} {'peak bytes':>11} {'retained bytes':>15}")
+    for name, r in results.items():
+        print(f"{name:<10} {r['us_per_request']:>11} {r['peak_bytes']:>11} {r['retained_bytes']:>15}")
+    old, new = results["pydantic"], results["internal"]
+    print(f"\ninternal vs pydantic: {old['us_per_request'] / new['us_per_request']:.1f}x faster, "
+          f"{1 - new['peak_bytes'] / old['peak_bytes']:.0%} less peak allocation, "
+          f"{1 - new['retained_bytes'] / old['retained_bytes']:.0%} less retained per result")
+
+if __name__ == "__main__":
+    main()
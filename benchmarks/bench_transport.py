@@ -0,0 +1,105 @@
+"""
+LLM transport policies against the stub server (benchmarks/stub_llm.py).
+
+    python benchmarks/bench_transport.py [--calls 400] [--concurrency 8]
+
+Scenarios, each run with the policy off and on:
+  errors  - 20% of requests fail with 503: success rate without/with retries
+  tail    - 5% of requests take +0.5s: p99 without/with hedging (p90 threshold)
+  outage  - every request fails: time per call and requests reaching the
+            provider without/with the circuit breaker
+Results go to benchmarks/results/.
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Any, Dict, List
+
+from common import save_results, summarize
+from stub_llm import StubLLMServer
+from app.core.llm_transport import CircuitBreaker, CircuitOpenError, LLMTransport
+
+REQUEST = {
+    "model": "stub",
+    "messages": [{"role": "user", "content": '[{"disease": "Hypertension"}]'}],
+    "max_tokens": 500,
+}
+
+async def run_calls(transport: LLMTransport, calls: int, concurrency: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    outcomes = {"ok": 0, "failed": 0, "short_circuited": 0}
+    next_call = iter(range(calls))
+
+    async def worker():
+        for _ in next_call:
+            started = time.perf_counter()
+            try:
+                await transport.acomplete(REQUEST)
+                outcomes["ok"] += 1
+            except CircuitOpenError:
+                outcomes["short_circuited"] += 1
+            except Exception:
+                outcomes["failed"] += 1
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    stats = summarize(latencies)
+    stats.update(outcomes, success_rate=round(outcomes["ok"] / calls, 4))
+    return stats
+
+async def scenario(stub: StubLLMServer, calls: int, concurrency: int, warmup: int = 0, **policy) -> Dict[str, Any]:
+    transport = LLMTransport(stub.base_url, "stub", call_timeout=10, **policy)
+    if warmup:
+        # Latency history for the hedging threshold
+        await run_calls(transport, warmup, concurrency)
+    calls_before, errors_before = stub.calls, stub.errors
+    stats = await run_calls(transport, calls, concurrency)
+    stats.update(provider_requests=(stub.calls - calls_before) + (stub.errors - errors_before),
+                 breaker=transport.breaker.stats())
+    await transport.async_client.close()
+    return stats
+
+def report(name: str, stats: Dict[str, Any]):
+    print(f"{name:<28} ok {stats['success_rate']:>7.1%}   p50 {stats['p50_ms']:>9.2f} ms   "
+          f"p99 {stats['p99_ms']:>9.2f} ms   provider requests {stats['provider_requests']}")
+
+async def main_async(args) -> Dict[str, Any]:
+    results = {}
+    no_breaker = lambda: CircuitBreaker(failure_threshold=0)
+
+    with StubLLMServer(latency=0.01, error_rate=0.2) as stub:
+        results["errors_no_retry"] = await scenario(stub, args.calls, args.concurrency, max_retries=0,
+                                                    breaker=no_breaker())
+        results["errors_retry"] = await scenario(stub, args.calls, args.concurrency, max_retries=2,
+                                                 breaker=no_breaker())
+
+    with StubLLMServer(latency=0.02, tail_rate=0.05, tail_latency=0.5) as stub:
+        results["tail_no_hedge"] = await scenario(stub, args.calls, args.concurrency, warmup=50,
+                                                  hedge_percentile=0)
+        results["tail_hedge_p90"] = await scenario(stub, args.calls, args.concurrency, warmup=50,
+                                                   hedge_percentile=90)
+
+    with StubLLMServer(latency=0.01) as stub:
+        stub.down = True
+        results["outage_no_breaker"] = await scenario(stub, args.calls, args.concurrency, breaker=no_breaker())
+        results["outage_breaker"] = await scenario(stub, args.calls, args.concurrency,
+                                                   breaker=CircuitBreaker(failure_threshold=5, reset_seconds=30))
+
+    for name, stats in results.items():
+        report(name, stats)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=400, help="calls per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--out", default=None, help="result file (default: benchmarks/results/...)")
+    args = parser.parse_args()
+
+    results = asyncio.run(main_async(args))
+    path = save_results("transport", results, {"calls": args.calls, "concurrency": args.concurrency}, args.out)
+    print(f"\nResults saved to {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Shared helpers for the benchmark suite: timing statistics, reproducible
+inputs and JSON result files (compare two with benchmarks/compare.py).
+"""
+
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+# Allow `python benchmarks/<script>.py` from the project root
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+def summarize(seconds: Sequence[float]) -> Dict[str, Any]:
+    """Latency statistics in milliseconds."""
+    if not seconds:
+        return {"n": 0}
+    ms = sorted(s * 1000 for s in seconds)
+    return {
+        "n": len(ms),
+        "mean_ms": round(sum(ms) / len(ms), 4),
+        "p50_ms": round(_percentile(ms, 50), 4),
+        "p95_ms": round(_percentile(ms, 95), 4),
+        "p99_ms": round(_percentile(ms, 99), 4),
+        "min_ms": round(ms[0], 4),
+        "max_ms": round(ms[-1], 4),
+    }
+
+def time_calls(fn: Callable[[], Any], iterations: int, warmup: int = 10) -> Dict[str, Any]:
+    """Runs `fn` `iterations` times (after `warmup` untimed calls) and summarizes per-call latency."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    stats = summarize(samples)
+    stats["ops_per_s"] = round(len(samples) / sum(samples), 1) if sum(samples) else None
+    return stats
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    # Linear interpolation between closest ranks (numpy's default)
+    k = (len(sorted_values) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+def example_payload() -> Dict[str, Any]:
+    from app.models.schemas import ClinicalInput
+
+    return dict(ClinicalInput.Config.json_schema_extra["example"])
+
+def random_payloads(n: int, seed: int = 7) -> List[Dict[str, Any]]:
+    """`n` distinct valid ClinicalInput payloads (same seed -> same payloads)."""
+    rng = random.Random(seed)
+    base = example_payload()
+    payloads = []
+    for _ in range(n):
+        payload = {k: (rng.random() < 0.5 if isinstance(v, bool) else v) for k, v in base.items()}
+        payload.update(
+            age=rng.randint(18, 90), gender=rng.choice([1, 2]), bmi=round(rng.uniform(16, 45), 1),
+            systolic_bp=rng.randint(95, 190), hba1c=round(rng.uniform(4, 10), 1),
+            cholesterol=rng.randint(120, 300), sleep_hours=rng.choice([5, 6, 6.5, 7, 7.5, 9]),
+        )
+        payloads.append(payload)
+    return payloads
+
+def environment() -> Dict[str, Any]:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "git_commit": _git("rev-parse", "--short", "HEAD"),
+        "git_dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+    }
+
+def save_results(suite: str, benchmarks: Dict[str, Any], config: Dict[str, Any],
+                 out_path: Optional[str] = None) -> str:
+    """
+    Writes benchmarks/results/<suite>-<commit>-<UTC time>.json (or `out_path`)
+    and returns the path.
+    """
+    env = environment()
+    now = datetime.now(timezone.utc)
+    if out_path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        name = f"{suite}-{env['git_commit'] or 'nogit'}{'-dirty' if env['git_dirty'] else ''}-{now:%Y%m%d%H%M%S}.json"
+        out_path = os.path.join(RESULTS_DIR, name)
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "suite": suite,
+            "created_at": now.isoformat(),
+            "environment": env,
+            "config": config,
+            "benchmarks": benchmarks,
+        }, f, indent=2)
+    return out_path
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True,
+                              timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
@@ -0,0 +1,67 @@
+"""
+Compares two benchmark result files (e.g. from two commits).
+
+    python benchmarks/compare.py benchmarks/results/micro-abc123-....json benchmarks/results/micro-def456-....json
+
+Prints old/new/change for every latency and throughput metric present in
+both files. Exits with status 1 when a metric got worse by more than
+--threshold (default 10%), so it can gate CI.
+"""
+
+import argparse
+import json
+import sys
+from typing import Any, Dict, Iterator, Tuple
+
+# Metric -> True when higher is better
+METRICS = {
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "throughput_rps": True,
+    "ops_per_s": True,
+}
+
+def iter_metrics(benchmarks: Dict[str, Any], prefix: str = "") -> Iterator[Tuple[str, str, float]]:
+    """(benchmark path, metric, value) for every known metric, at any nesting depth."""
+    for name, value in benchmarks.items():
+        if not isinstance(value, dict):
+            continue
+        path = f"{prefix}{name}"
+        for metric in METRICS:
+            if isinstance(value.get(metric), (int, float)):
+                yield path, metric, float(value[metric])
+        yield from iter_metrics(value, prefix=f"{path}.")
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change counted as a regression")
+    args = parser.parse_args()
+
+    with open(args.old, "r", encoding="utf-8") as f:
+        old = json.load(f)
+    with open(args.new, "r", encoding="utf-8") as f:
+        new = json.load(f)
+    print(f"old: {old['environment'].get('git_commit')} ({old['created_at']})")
+    print(f"new: {new['environment'].get('git_commit')} ({new['created_at']})\n")
+
+    old_values = {(path, metric): value for path, metric, value in iter_metrics(old["benchmarks"])}
+    regressions = 0
+    print(f"{'benchmark':<44} {'metric':<15} {'old':>12} {'new':>12} {'change':>9}")
+    for path, metric, value in iter_metrics(new["benchmarks"]):
+        before = old_values.get((path, metric))
+        if before is None or before == 0:
+            continue
+        change = (value - before) / before
+        worse = -change if METRICS[metric] else change
+        flag = "  REGRESSION" if worse > args.threshold else ""
+        regressions += bool(flag)
+        print(f"{path:<44} {metric:<15} {before:>12.4f} {value:>12.4f} {change:>+8.1%}{flag}")
+
+    print(f"\n{regressions} regression(s) above {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+In-process load test for POST /api/v1/assess.
+
+Drives the FastAPI app through httpx's ASGI transport (no network between
+client and app) while LLM enrichment goes over HTTP to a local stub server
+(benchmarks/stub_llm.py) with a fixed latency. For each concurrency level
+the same number of requests is sent; p50/p95/p99 latency and throughput
+are reported and saved to benchmarks/results/.
+
+    python benchmarks/load_test.py --concurrency 1,8,32,64 --requests 400 --llm-latency 0.2
+
+By default every request carries a distinct payload and the result memo
+and LLM advice cache are off, so each request scores and calls the LLM.
+Assessments are written to a temporary store, not data/.
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from common import example_payload, random_payloads, save_results, summarize
+from stub_llm import StubLLMServer
+
+def configure_env(args, stub: StubLLMServer):
+    """Must run before app modules are imported (settings are read at import time)."""
+    os.environ["HF_TOKEN"] = "stub"
+    os.environ["LLM_BASE_URL"] = stub.base_url
+    os.environ["VITALSCAN_MODEL_POLL_SECONDS"] = "0"
+    os.environ["VITALSCAN_ENRICHMENT_MODE"] = args.mode
+    if not args.memo:
+        os.environ["VITALSCAN_RESULT_CACHE_SIZE"] = "0"
+    if not args.llm_cache:
+        os.environ["LLM_CACHE_SIZE"] = "0"
+
+async def run_level(client, payloads: List[Dict[str, Any]], concurrency: int, n_requests: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    next_index = iter(range(n_requests))
+
+    async def worker():
+        for i in next_index:
+            started = time.perf_counter()
+            response = await client.post("/api/v1/assess", json=payloads[i % len(payloads)])
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    stats = summarize(latencies)
+    stats.update(
+        concurrency=concurrency,
+        throughput_rps=round(len(latencies) / elapsed, 2),
+        wall_seconds=round(elapsed, 3),
+        errors=sum(count for status, count in statuses.items() if status != 200),
+        statuses={str(k): v for k, v in sorted(statuses.items())},
+    )
+    return stats
+
+async def main_async(args) -> Dict[str, Any]:
+    import httpx
+    from app.main import app
+    from app.api.v1 import endpoints
+    from app.core.storage import LocalStorage
+
+    tmp = tempfile.mkdtemp(prefix="vitalscan-load-")
+    endpoints.storage = LocalStorage(os.path.join(tmp, "assessments.enc"), key_path=os.path.join(tmp, "secret.key"))
+    try:
+        await endpoints.load_services()
+        if not endpoints.startup_state["ready"]:
+            raise SystemExit(f"Engine failed to load: {endpoints.startup_state['error']}")
+
+        payloads = [example_payload()] if args.fixed_payload else random_payloads(args.requests, seed=args.seed)
+        transport = httpx.ASGITransport(app=app)
+        results = {}
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=120) as client:
+            # Warm-up (connection pool to the stub, first-call allocations)
+            await run_level(client, payloads, 1, min(10, args.requests))
+            for concurrency in args.concurrency:
+                stats = await run_level(client, payloads, concurrency, args.requests)
+                results[f"assess_c{concurrency}"] = stats
+                print(f"c={concurrency:<4} {stats['throughput_rps']:>8.1f} req/s   p50 {stats['p50_ms']:>9.2f} ms   "
+                      f"p95 {stats['p95_ms']:>9.2f} ms   p99 {stats['p99_ms']:>9.2f} ms   errors {stats['errors']}")
+        results["model_version"] = endpoints.risk_engine.model_version
+        return results
+    finally:
+        endpoints.shutdown_services()
+        endpoints.storage.close()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", default="1,4,16,64", help="comma-separated sweep")
+    parser.add_argument("--requests", type=int, default=200, help="requests per concurrency level")
+    parser.add_argument("--llm-latency", type=float, default=0.1, help="stub LLM seconds per completion")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="share of stub LLM requests failed (503)")
+    parser.add_argument("--llm-tail-rate", type=float, default=0.0, help="share of stub LLM requests slowed down")
+    parser.add_argument("--llm-tail-latency", type=float, default=1.0, help="extra seconds for slowed requests")
+    parser.add_argument("--mode", choices=["sync", "deferred"], default="sync", help="VITALSCAN_ENRICHMENT_MODE")
+    parser.add_argument("--memo", action="store_true", help="keep the result memo on")
+    parser.add_argument("--llm-cache", action="store_true", help="keep the LLM advice cache on")
+    parser.add_argument("--fixed-payload", action="store_true", help="send the same payload every time")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", default=None, help="result file (default: benchmarks/results/...)")
+    args = parser.parse_args()
+    args.concurrency = [int(c) for c in args.concurrency.split(",") if c.strip()]
+
+    with StubLLMServer(latency=args.llm_latency, error_rate=args.llm_error_rate,
+                       tail_rate=args.llm_tail_rate, tail_latency=args.llm_tail_latency) as stub:
+        configure_env(args, stub)
+        results = asyncio.run(main_async(args))
+        results["stub_llm_calls"] = stub.calls
+        results["stub_llm_errors"] = stub.errors
+
+    config = {k: v for k, v in vars(args).items() if k != "out"}
+    path = save_results("load", results, config, args.out)
+    print(f"\nResults saved to {path}")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+"""
+Local stub of an OpenAI-compatible chat completions endpoint.
+
+Answers every POST with five prevention steps per disease named in the
+prompt, after a configurable latency, as a single JSON completion or as an
+SSE stream (`"stream": true`). Faults can be injected: a share of requests
+answered with an HTTP error, a share delayed by an extra tail latency, or
+a full outage (`stub.down = True`). Used by the load test and the
+transport benchmark; can also back a manually started server:
+
+    python benchmarks/stub_llm.py --port 8100 --latency 0.5 --error-rate 0.1
+    LLM_BASE_URL=http://127.0.0.1:8100/v1 HF_TOKEN=stub python -m uvicorn app.main:app
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_DISEASE = re.compile(r'"disease":\s*"([^"]+)"')
+
+class StubLLMServer:
+    """
+    Threaded stub server; use as a context manager. `latency` is slept per
+    request (seconds), `calls` counts completions served and `errors` the
+    injected failures. `error_rate` of requests get `error_status`;
+    `tail_rate` of requests sleep `tail_latency` on top of `latency`.
+    """
+    def __init__(self, latency: float = 0.0, host: str = "127.0.0.1", port: int = 0,
+                 error_rate: float = 0.0, error_status: int = 503,
+                 tail_rate: float = 0.0, tail_latency: float = 0.0, seed: int = 7):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.tail_rate = tail_rate
+        self.tail_latency = tail_latency
+        self.down = False
+        self.calls = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _handler(self))
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-llm", daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "StubLLMServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StubLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def next_fault(self):
+        """(error status or None, extra latency) for the next request."""
+        with self._lock:
+            if self.down or self._random.random() < self.error_rate:
+                self.errors += 1
+                return self.error_status, 0.0
+            return None, self.tail_latency if self._random.random() < self.tail_rate else 0.0
+
+    def completion_content(self, prompt: str) -> str:
+        with self._lock:
+            self.calls += 1
+        diseases = list(dict.fromkeys(_DISEASE.findall(prompt)))
+        return json.dumps({
+            disease: {"prevention_steps": [
+                f"**Step {i + 1}**: Stub advice for {disease}. *Why*: Benchmark. *Result*: None." for i in range(5)
+            ]}
+            for disease in diseases
+        })
+
+def _handler(stub: StubLLMServer):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True  # Headers and body are separate writes
+
+        def log_message(self, *args):
+            pass
+
+        def handle(self):
+            try:
+                super().handle()
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # Client gave up (hedged loser, timeout)
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            error_status, extra_latency = stub.next_fault()
+            if error_status is not None:
+                self._send_json({"error": {"message": "Injected failure", "type": "stub_error"}}, error_status)
+                return
+            prompt = body.get("messages", [{}])[-1].get("content", "")
+            content = stub.completion_content(prompt)
+            if stub.latency + extra_latency > 0:
+                time.sleep(stub.latency + extra_latency)
+            if body.get("stream"):
+                self._stream(content)
+            else:
+                self._send_json({
+                    "id": "stub", "object": "chat.completion", "created": int(time.time()), "model": "stub",
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                                 "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                              "total_tokens": (len(prompt) + len(content)) // 4},
+                })
+
+        def _send_json(self, payload: dict, status: int = 200):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _stream(self, content: str, chunk_size: int = 32):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for i in range(0, len(content), chunk_size):
+                chunk = {"id": "stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                         "model": "stub", "choices": [{"index": 0, "delta": {"content": content[i:i + chunk_size]},
+                                                       "finish_reason": None}]}
+                self._chunk(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self._chunk(b"data: [DONE]\n\n")
+            self._chunk(b"")
+
+        def _chunk(self, data: bytes):
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+
+    return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub OpenAI-compatible LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per completion")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests failed")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--tail-rate", type=float, default=0.0, help="share of requests slowed down")
+    parser.add_argument("--tail-latency", type=float, default=0.0, help="extra seconds for slowed requests")
+    args = parser.parse_args()
+    stub = StubLLMServer(args.latency, args.host, args.port, error_rate=args.error_rate,
+                         error_status=args.error_status, tail_rate=args.tail_rate, tail_latency=args.tail_latency)
+    print(f"Stub LLM listening on {stub.base_url} (latency {args.latency}s)")
+    try:
+        stub._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+# test_llm.py and test_server.py are manual smoke scripts (live Hugging Face
+# API, running server): they do their work at import, so pytest skips them.
+collect_ignore = ["test_llm.py", "test_server.py"]
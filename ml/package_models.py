@@ -0,0 +1,73 @@
+import json
+import os
+import pickle
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Allow `python ml/package_models.py` from the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.core.model_bundle import write_bundle
+from app.core.tree_predictor import CompiledTreeEnsemble, fold_scaler_into_xgboost_json
+
+MODEL_NAMES = ["diabetes_model", "hypertension_model"]
+# Must match training (and MLRiskEngine.FeatureBatch.nhanes); recorded in the bundle manifest
+FEATURE_COLS = ['RIDAGEYR', 'RIAGENDR', 'BMXBMI', 'BPXSY1', 'LBXGH', 'LBXTC', 'PAQ650', 'SLD010H', 'SMQ020']
+
+def package_models(model_dir: str = "ml/models", X_raw=None, atol: float = 1e-5) -> str:
+    """
+    Turns the trained pickles (scaled-input XGBClassifier + scaler.pkl) into
+    a versioned bundle under <model_dir>/bundles/ that the API loads without
+    unpickling or scaling (see app/core/model_bundle.py). Each model is
+    stored twice, both checked against the original before writing:
+      <name>.ubj    booster with the scaler folded into its split thresholds
+      <name>/*.npy  the same trees compiled to NumPy arrays (no xgboost needed)
+    Returns the bundle path.
+    """
+    from xgboost import XGBClassifier
+
+    with open(os.path.join(model_dir, "scaler.pkl"), "rb") as f:
+        scaler = pickle.load(f)
+    if X_raw is None:
+        X_raw = _validation_features()
+    X_raw = np.asarray(X_raw, dtype=np.float64)
+
+    boosters, compiled = {}, {}
+    for name in MODEL_NAMES:
+        with open(os.path.join(model_dir, f"{name}.pkl"), "rb") as f:
+            model = pickle.load(f)
+        print(f"\n--- Packaging {name} ---")
+        expected = model.predict_proba(scaler.transform(X_raw))[:, 1]
+        raw_json = model.get_booster().save_raw("json")
+
+        # 1. Raw-input booster
+        folded = fold_scaler_into_xgboost_json(raw_json, scaler.mean_, scaler.scale_)
+        boosters[name] = XGBClassifier()
+        boosters[name].load_model(bytearray(json.dumps(folded).encode("utf-8")))
+        _check("Raw-input booster", expected, boosters[name].predict_proba(X_raw)[:, 1], atol)
+
+        # 2. Compiled NumPy predictor
+        compiled[name] = CompiledTreeEnsemble.from_xgboost_json(
+            raw_json, scaler_mean=scaler.mean_, scaler_scale=scaler.scale_
+        )
+        _check("Compiled predictor", expected, compiled[name].predict_proba(X_raw)[:, 1], atol)
+
+    path = write_bundle(os.path.join(model_dir, "bundles"), boosters, compiled,
+                        scaler.mean_, scaler.scale_, FEATURE_COLS)
+    print(f"\nModel bundle saved to {path} (pickles are no longer needed at runtime)")
+    return path
+
+def _validation_features() -> np.ndarray:
+    if not os.path.exists("data/nhanes_mock.csv"):
+        raise FileNotFoundError("data/nhanes_mock.csv not found. Run nhanes_data.py first.")
+    return pd.read_csv("data/nhanes_mock.csv")[FEATURE_COLS].to_numpy(dtype=np.float64)
+
+def _check(label: str, expected: np.ndarray, actual: np.ndarray, atol: float):
+    max_diff = float(np.max(np.abs(expected - actual)))
+    print(f"{label} max |diff| vs scaled model: {max_diff:.2e}")
+    if max_diff > atol:
+        raise ValueError(f"{label} mismatch ({max_diff:.2e} > {atol:.0e}); not exported.")
+
+if __name__ == "__main__":
+    package_models()
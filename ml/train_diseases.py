@@ -6,6 +6,11 @@ from sklearn.metrics import classification_report, roc_auc_score
 from sklearn.preprocessing import StandardScaler
 import pickle
 import os
+import sys
+
+# Allow `python ml/train_diseases.py` from the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ml.package_models import package_models
 
 def train_disease_models():
     # Load Data
@@ -64,5 +69,8 @@ def train_disease_models():
         
     print("\nTraining Complete. Models saved to ml/models/")
 
+    # Fold the scaler into the models so inference takes raw features
+    package_models("ml/models", X_raw=X)
+
 if __name__ == "__main__":
     train_disease_models()
@@ -81,15 +81,14 @@ with st.sidebar:
     # 1. Vitals
     st.subheader("Biological Stats")
     age = st.slider("Age", 18, 90, 30)
+    gender = st.selectbox("Gender", ["Male", "Female"])
     bmi = st.slider("BMI", 15.0, 50.0, 24.0)
     systolic_bp = st.number_input("Systolic BP (mmHg)", 90, 200, 120)
-    diastolic_bp = st.number_input("Diastolic BP (mmHg)", 60, 130, 80)
     
     # 2. Labs (Optional-ish in UI, but needed for model)
     st.subheader("Lab Values (Est.)")
     cholesterol = st.number_input("Total Cholesterol (mg/dL)", 100, 300, 180)
     hba1c = st.number_input("HbA1c (%)", 4.0, 15.0, 5.5)
-    fasting_glucose = st.number_input("Fasting Glucose (mg/dL)", 70, 200, 90)
     
     # 3. Lifestyle
     st.subheader("Lifestyle")
@@ -98,12 +97,19 @@ with st.sidebar:
         options=["Sedentary", "Lightly Active", "Moderately Active", "Very Active"]
     )
     smoking_status = st.selectbox("Smoking Status", ["Never", "Former", "Current"])
-    alcohol_intake = st.selectbox("Alcohol Consumption", ["None", "Occasional", "Moderate", "Heavy"])
     
     # 4. Habits
     st.subheader("Digital & Sleep")
     sleep_hours = st.slider("Sleep Hours", 4, 12, 7)
     screen_time = st.slider("Screen Time (Hours)", 0, 16, 6)
+
+    # 5. Screening questions (Q8 and Q9 follow from Activity Level)
+    st.subheader("Screening Questions")
+    answers = {
+        name: st.checkbox(field.description)
+        for name, field in ClinicalInput.model_fields.items()
+        if name.startswith("q") and name != "q8_sedentary"
+    }
     
     analyze_btn = st.button("Analyze Health Risks 🚀", use_container_width=True)
 
@@ -123,19 +129,17 @@ if analyze_btn:
         # Map inputs to Schema
         input_data = ClinicalInput(
             age=age,
+            gender=1 if gender == "Male" else 2,
             bmi=bmi,
             systolic_bp=int(systolic_bp),
-            diastolic_bp=int(diastolic_bp),
-            cholesterol_total=int(cholesterol),
             hba1c=hba1c,
-            fasting_glucose=int(fasting_glucose),
-            smoking_status=smoking_status.lower(),
-            physical_activity_level=activity_level.split(" ")[0].lower(),
-            alcohol_consumption=alcohol_intake.lower(),
-            family_history_diabetes=False,  # Simplified for UI
-            family_history_hypertension=False,
+            cholesterol=int(cholesterol),
             sleep_hours=sleep_hours,
-            daily_screen_time=screen_time
+            vigorous_activity=activity_level in ("Moderately Active", "Very Active"),
+            smoker_history=smoking_status != "Never",
+            q8_sedentary=activity_level == "Sedentary",
+            daily_digital_hours=screen_time,
+            **answers
         )
         
         # Get Risks
@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.core import export
+from app.core.results import Assessment, Risk
+from app.core.storage import LocalStorage
+from app.models.schemas import RiskLevel
+
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+@pytest.fixture
+def storage(tmp_path):
+    store = LocalStorage(str(tmp_path / "assessments.enc"), group_commit=False, key_path=str(tmp_path / "secret.key"),
+                         max_segment_bytes=4096)
+    for batch in range(0, 60, 10):  # Segments roll over between appends
+        store.save_assessments([
+            Assessment.new([
+                Risk("Type 2 Diabetes", RiskLevel.HIGH, 0.8, ["Elevated Hba1C"], [f"step {i}"]),
+                Risk("Hypertension", RiskLevel.LOW, 0.1, ["General Risk Profile"], ["keep going"]),
+            ], timestamp=T0 + timedelta(days=i))
+            for i in range(batch, batch + 10)
+        ])
+    yield store
+    store.close()
+
+class CountingFile:
+    def __init__(self, f):
+        self.f = f
+        self.reads = []
+
+    def seek(self, offset):
+        self.f.seek(offset)
+
+    def read(self, n):
+        self.reads.append(n)
+        return self.f.read(n)
+
+def test_iter_index_filters_by_time_across_segments(storage):
+    entries = list(storage.iter_index(T0 + timedelta(days=10), T0 + timedelta(days=50)))
+    assert len(entries) == 40
+    assert len({e.segment for e in storage.iter_index()}) > 1  # Rolled over at 4 KiB
+
+def test_sparse_matches_are_not_read_as_one_span(storage):
+    entries = [e for e in storage.iter_index() if e.segment == storage.storage_path]
+    sparse = entries[::3]
+    with open(storage.storage_path, "rb") as raw:
+        f = CountingFile(raw)
+        records = list(export._read_records(f, sparse, max_gap=1, max_bytes=10_000))
+    assert [e for e, _ in records] == sparse
+    assert len(f.reads) == len(sparse) and sum(f.reads) == sum(e.length for e in sparse)
+
+def test_adjacent_records_share_reads_up_to_the_cap(storage):
+    entries = [e for e in storage.iter_index() if e.segment == storage.storage_path]
+    cap = 3 * max(e.length for e in entries)
+    with open(storage.storage_path, "rb") as raw:
+        f = CountingFile(raw)
+        records = list(export._read_records(f, entries, max_bytes=cap))
+    assert len(records) == len(entries)
+    assert max(f.reads) <= cap and len(f.reads) < len(entries)
+    assert all(storage.security.decrypt_record(record) for _, record in records)
+
+def test_export_filters_rows(storage, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    out = tmp_path / "report.parquet"
+    rows = export.export_assessments(str(out), storage_path=storage.storage_path,
+                                     key_path=str(tmp_path / "secret.key"),
+                                     start=T0 + timedelta(days=5), end=T0 + timedelta(days=25),
+                                     diseases=["Type 2 Diabetes"], workers=2, chunk_size=7)
+    table = pq.read_table(out)
+    assert rows == table.num_rows == 20
+    assert set(table.column("disease").to_pylist()) == {"Type 2 Diabetes"}
+    assert sorted(table.column("prevention_steps").to_pylist()) == sorted([f"step {i}"] for i in range(5, 25))
+
+def test_export_skips_records_pending_enrichment(storage, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    from app.models.schemas import EnrichmentStatus
+
+    pending = Assessment.new([Risk("Hypertension", RiskLevel.HIGH, 0.7, ["x"], ["template"])],
+                             timestamp=T0 + timedelta(days=100), enrichment_status=EnrichmentStatus.PENDING)
+    storage.save_assessment(pending)
+    storage.save_assessment(pending.replace(risks=[pending.risks[0].replace(prevention_steps=["llm"])],
+                                            enrichment_status=EnrichmentStatus.COMPLETE))
+    out = tmp_path / "report.parquet"
+    rows = export.export_assessments(str(out), storage_path=storage.storage_path,
+                                     key_path=str(tmp_path / "secret.key"), start=T0 + timedelta(days=100),
+                                     workers=1)
+    assert rows == 1
+    assert pq.read_table(out).column("prevention_steps").to_pylist() == [["llm"]]
+
+def test_scan_index_streams_without_touching_the_log(storage, tmp_path):
+    pytest.importorskip("pyarrow")
+    from app.core.storage import scan_index
+
+    lock = tmp_path / "assessments.enc.lock"
+    lock.unlink()
+    before = {p.name: p.stat().st_mtime_ns for p in tmp_path.iterdir()}
+    start, end = T0 + timedelta(days=10), T0 + timedelta(days=50)
+    entries = list(scan_index(storage.storage_path, start, end, block_entries=3))
+    assert entries == list(storage.iter_index(start, end))
+    assert len(entries) == 40
+
+    rows = export.export_assessments(str(tmp_path / "report.arrow"), storage_path=storage.storage_path,
+                                     key_path=str(tmp_path / "secret.key"), fmt="arrow", workers=1)
+    assert rows == 120
+    after = {p.name: p.stat().st_mtime_ns for p in tmp_path.iterdir() if p.name != "report.arrow"}
+    assert after == before  # No lock file, no index recovery
@@ -0,0 +1,68 @@
+import json
+
+from app.core.json_stream import IncrementalJSONParser, repair_json
+
+REPLY = json.dumps({
+    "Hypertension": {"prevention_steps": ["**Salt**: none at the table. *Why*: {x}. *Result*: [y]."]},
+    "Type 2 Diabetes": {"prevention_steps": ["**Walk**: say \"hi\", 15 min. *Why*: a, b. *Result*: c."]},
+})
+
+def feed_chars(parser, text):
+    members = []
+    for ch in text:
+        members.extend(parser.feed(ch))
+    return members
+
+def test_whole_reply_in_one_chunk():
+    parser = IncrementalJSONParser()
+    assert parser.feed(REPLY) == list(json.loads(REPLY).items())
+    assert parser.done and parser.finish() == []
+
+def test_member_is_emitted_as_soon_as_it_closes():
+    parser = IncrementalJSONParser()
+    first_end = REPLY.index("]}") + 2  # End of the Hypertension member
+    assert feed_chars(parser, REPLY[:first_end]) == [("Hypertension", json.loads(REPLY)["Hypertension"])]
+    assert [k for k, _ in feed_chars(parser, REPLY[first_end:])] == ["Type 2 Diabetes"]
+
+def test_braces_quotes_and_commas_inside_strings():
+    # Escaped quotes, braces and brackets inside step text must not end a member
+    assert dict(feed_chars(IncrementalJSONParser(), REPLY)) == json.loads(REPLY)
+
+def test_deeply_nested_and_primitive_members():
+    text = '{"a": {"b": [[1, {"c": "}"}], []]}, "n": 3, "s": "x"}'
+    assert dict(feed_chars(IncrementalJSONParser(), text)) == json.loads(text)
+
+def test_markdown_fence_and_trailing_text_are_ignored():
+    parser = IncrementalJSONParser()
+    members = parser.feed("```json\n" + REPLY + "\n```\n{\"ignored\": 1}")
+    assert dict(members) == json.loads(REPLY)
+
+def test_malformed_member_is_skipped():
+    parser = IncrementalJSONParser()
+    members = parser.feed('{"bad": {"x": tru}, "good": {"prevention_steps": ["a"]}}')
+    assert members == [("good", {"prevention_steps": ["a"]})]
+
+def test_truncated_trailing_member_is_salvaged():
+    cut = REPLY.index("15 min")
+    parser = IncrementalJSONParser()
+    members = feed_chars(parser, REPLY[:cut]) + parser.finish()
+    assert [k for k, _ in members] == ["Hypertension", "Type 2 Diabetes"]
+    assert members[1][1]["prevention_steps"][0].startswith("**Walk**")
+    assert parser.repaired == 1
+
+def test_truncated_inside_key_salvages_nothing_more():
+    parser = IncrementalJSONParser()
+    members = parser.feed('{"Hypertension": {"prevention_steps": ["a"]}, "Type 2') + parser.finish()
+    assert members == [("Hypertension", {"prevention_steps": ["a"]})]
+    assert parser.repaired == 0
+
+def test_repair_json_closes_strings_and_containers():
+    assert json.loads(repair_json('{"a": {"b": ["x", "y')) == {"a": {"b": ["x", "y"]}}
+    assert json.loads(repair_json('{"a": [1, 2],')) == {"a": [1, 2]}
+    assert json.loads(repair_json('{"a": 1, "b":')) == {"a": 1, "b": None}
+
+def test_repair_json_falls_back_to_last_complete_element():
+    assert json.loads(repair_json('{"a": [1, 2], "b": {"c": tr')) == {"a": [1, 2]}
+
+def test_repair_json_leaves_valid_json_alone():
+    assert repair_json(REPLY) == REPLY
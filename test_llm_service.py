@@ -0,0 +1,120 @@
+import asyncio
+from types import SimpleNamespace
+
+from app.core.llm_service import LLMService
+
+def test_collect_advice_keeps_only_string_steps():
+    members = [
+        ("Hypertension", {"prevention_steps": [{"step": "x"}, 3, " **Salt**: less. ", ""]}),
+        ("Type 2 Diabetes", {"prevention_steps": ["**Walk**: daily."]}),
+    ]
+    assert LLMService._collect_advice(members) == {
+        "Hypertension": ["**Salt**: less."],
+        "Type 2 Diabetes": ["**Walk**: daily."],
+    }
+
+def test_collect_advice_drops_diseases_without_usable_steps():
+    members = [
+        ("Hypertension", {"prevention_steps": [{"step": "x"}, 3]}),
+        ("Digital Eye Strain", {"prevention_steps": "blink more"}),
+        ("Sleep Deprivation/Disorder", ["not", "an", "object"]),
+    ]
+    assert LLMService._collect_advice(members) == {}
+
+class StubTransport:
+    def __init__(self, content=None, error=None):
+        self.content, self.error = content, error
+
+    def complete(self, request):
+        if self.error:
+            raise self.error
+        message = type("Message", (), {"content": self.content})
+        return type("Completion", (), {"choices": [type("Choice", (), {"message": message})]})
+
+class StubStream:
+    def __init__(self, deltas):
+        self.deltas = deltas
+        self.closed = False
+
+    def __aiter__(self):
+        return self._chunks()
+
+    async def _chunks(self):
+        for delta in self.deltas:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=delta))])
+
+    async def close(self):
+        self.closed = True
+
+class StubStreamTransport:
+    def __init__(self, deltas):
+        self.stream = StubStream(deltas)
+
+    async def astream(self, request):
+        return self.stream
+
+def make_service(monkeypatch, transport):
+    monkeypatch.delenv("HF_TOKEN", raising=False)
+    service = LLMService()
+    service.api_key, service.transport, service.fanout = "test", transport, "batched"
+    service.cache.memory.clear()
+    return service
+
+def moderate_risks():
+    from app.core.results import Risk
+    from app.models.schemas import RiskLevel
+    return [Risk("Hypertension", RiskLevel.MODERATE, 0.4, ["Blood pressure"], []),
+            Risk("Type 2 Diabetes", RiskLevel.HIGH, 0.7, ["HbA1c"], [])]
+
+def test_enrich_reports_complete_llm_advice(monkeypatch):
+    reply = '{"Hypertension": {"prevention_steps": ["a"]}, "Type 2 Diabetes": {"prevention_steps": ["b"]}}'
+    risks = moderate_risks()
+    assert make_service(monkeypatch, StubTransport(reply)).enrich(risks) is True
+    assert [risk.prevention_steps for risk in risks] == [["a"], ["b"]]
+
+def test_enrich_reports_template_fallback(monkeypatch):
+    risks = moderate_risks()
+    assert make_service(monkeypatch, StubTransport(error=TimeoutError())).enrich(risks) is False
+    assert all(risk.prevention_steps for risk in risks)  # Template advice
+
+    partial = '{"Hypertension": {"prevention_steps": ["a"]}}'
+    assert make_service(monkeypatch, StubTransport(partial)).enrich(moderate_risks()) is False
+
+def test_similar_profiles_share_prompt_and_cache_key(monkeypatch):
+    service = make_service(monkeypatch, StubTransport())
+    risks = moderate_risks()
+    profile = {"age": 44, "gender": 1, "bmi": 27.1, "hba1c": 5.9, "systolic_bp": 134, "q20_diet": True}
+    similar = dict(profile, age=41, bmi=28.8, hba1c=6.2, systolic_bp=131)
+    other = dict(profile, hba1c=6.6)
+
+    prompt = service._build_prompt(risks, profile)
+    assert '"hba1c":"5.7-6.4"' in prompt and "5.9" not in prompt
+    assert service._build_prompt(risks, similar) == prompt
+    assert service._cache_key(risks, similar) == service._cache_key(risks, profile)
+    assert service._cache_key(risks, other) != service._cache_key(risks, profile)
+
+STREAMED = ['{"Hypertension": {"prevention_steps": ["a"]}, ', '"Made Up": {"prevention_steps": ["x"]}, ',
+            '"Type 2 Diabetes": {"prevention_steps": ["b"]}}']
+
+def test_stream_skips_diseases_that_were_not_asked_for(monkeypatch):
+    transport = StubStreamTransport(STREAMED)
+    service = make_service(monkeypatch, transport)
+
+    async def collect():
+        return [item async for item in service.astream_explanation(moderate_risks())]
+
+    assert asyncio.run(collect()) == [("Hypertension", ["a"]), ("Type 2 Diabetes", ["b"])]
+    assert transport.stream.closed
+
+def test_stream_is_closed_when_the_consumer_stops_early(monkeypatch):
+    transport = StubStreamTransport(STREAMED)
+    service = make_service(monkeypatch, transport)
+
+    async def first_only():
+        events = service.astream_explanation(moderate_risks())
+        first = await events.__anext__()
+        await events.aclose()  # Client disconnected
+        return first
+
+    assert asyncio.run(first_only()) == ("Hypertension", ["a"])
+    assert transport.stream.closed
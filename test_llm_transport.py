@@ -0,0 +1,165 @@
+import asyncio
+import time
+import types
+
+import httpx
+import openai
+import pytest
+
+from app.core import llm_transport
+from app.core.llm_transport import CircuitBreaker, CircuitOpenError, LLMTransport
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_transport.time, "monotonic", clock)
+    return clock
+
+def open_breaker(clock, threshold=3, reset=30.0):
+    breaker = CircuitBreaker(failure_threshold=threshold, reset_seconds=reset)
+    for _ in range(threshold):
+        assert breaker.allow()
+        breaker.record_failure()
+    return breaker
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()  # Resets the count
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+def test_half_open_lets_one_probe_through(clock):
+    breaker = open_breaker(clock)
+    clock.now += 29.9
+    assert not breaker.allow()
+    clock.now += 0.1
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()  # Probe still in flight
+
+def test_probe_success_closes(clock):
+    breaker = open_breaker(clock)
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.stats() == {"state": CircuitBreaker.CLOSED, "consecutive_failures": 0}
+    assert breaker.allow() and breaker.allow()
+
+def test_probe_failure_reopens(clock):
+    breaker = open_breaker(clock)
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    clock.now += 30
+    assert breaker.allow()
+
+def test_stale_probe_is_replaced(clock):
+    breaker = open_breaker(clock)
+    clock.now += 30
+    assert breaker.allow()  # Probe cancelled, never reports back
+    clock.now += 29
+    assert not breaker.allow()
+    clock.now += 1
+    assert breaker.allow()
+
+def test_zero_threshold_disables(clock):
+    breaker = CircuitBreaker(failure_threshold=0, reset_seconds=30)
+    for _ in range(10):
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+
+class StubCompletions:
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def create(self, **request):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+def make_transport(monkeypatch, outcomes, breaker=None, max_retries=2):
+    monkeypatch.setattr(llm_transport.time, "sleep", lambda seconds: None)
+    transport = LLMTransport("http://127.0.0.1:9", "test", call_timeout=30, max_retries=max_retries,
+                             breaker=breaker or CircuitBreaker(failure_threshold=5, reset_seconds=30))
+    completions = StubCompletions(outcomes)
+    transport.client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=completions))
+    return transport, completions
+
+def connection_error():
+    return openai.APIConnectionError(request=httpx.Request("POST", "http://127.0.0.1:9"))
+
+def test_retries_connection_errors(monkeypatch):
+    transport, completions = make_transport(monkeypatch, [connection_error(), connection_error(), "ok"])
+    assert transport.complete({}) == "ok"
+    assert completions.calls == 3
+    assert transport.breaker.failures == 0
+
+def test_gives_up_after_max_retries_and_trips_breaker(monkeypatch, clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=30)
+    transport, completions = make_transport(monkeypatch, [connection_error()] * 3, breaker=breaker)
+    with pytest.raises(Exception):
+        transport.complete({})
+    assert completions.calls == 3
+    with pytest.raises(CircuitOpenError):
+        transport.complete({})
+    assert completions.calls == 3
+
+def test_does_not_retry_client_errors(monkeypatch):
+    transport, completions = make_transport(monkeypatch, [ValueError("bad request"), "ok"])
+    with pytest.raises(ValueError):
+        transport.complete({})
+    assert completions.calls == 1
+    assert transport.breaker.failures == 0
+
+class SlowAsyncCompletions:
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.timeouts = []
+
+    async def create(self, **request):
+        self.timeouts.append(request.get("timeout"))
+        await asyncio.sleep(self.seconds)  # Ignores the per-request timeout
+        return "late"
+
+def test_async_call_fails_within_call_timeout(monkeypatch):
+    transport, _ = make_transport(monkeypatch, [])
+    transport.call_timeout = 0.3
+    completions = SlowAsyncCompletions(5)
+    transport.async_client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=completions))
+    started = time.monotonic()
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(transport.acomplete({}))
+    assert time.monotonic() - started < 0.6
+    assert len(completions.timeouts) == 1 and completions.timeouts[0] <= 0.3  # Timeouts are not retried
+
+def test_each_attempt_gets_only_the_remaining_budget(monkeypatch):
+    transport, completions = make_transport(monkeypatch, [connection_error(), connection_error(), "ok"])
+    transport.call_timeout = 0.5
+    timeouts = []
+    create = completions.create
+
+    def recording_create(**request):
+        timeouts.append(request["timeout"])
+        return create(**request)
+
+    completions.create = recording_create
+    assert transport.complete({}) == "ok"
+    assert all(0 < t <= 0.5 for t in timeouts) and timeouts == sorted(timeouts, reverse=True)
@@ -0,0 +1,23 @@
+import pytest
+
+from app.core.metrics import Counter, _Metric
+
+def test_metric_without_render_hook_fails_at_creation():
+    class Gauge(_Metric):
+        kind = "gauge"
+
+        def _new_child(self):
+            return 0
+
+    with pytest.raises(TypeError):
+        Gauge("vitalscan_test_gauge", "Incomplete metric.")
+
+def test_counter_renders_labelled_children():
+    counter = Counter("vitalscan_test_total", "Test events.", ["reason"])
+    counter.labels("a").inc()
+    counter.labels("a").inc(2)
+    assert counter.render() == [
+        "# HELP vitalscan_test_total Test events.",
+        "# TYPE vitalscan_test_total counter",
+        'vitalscan_test_total{reason="a"} 3',
+    ]
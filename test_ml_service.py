@@ -0,0 +1,59 @@
+import asyncio
+
+import numpy as np
+
+from app.core.cache import ResultCache
+from app.core.concurrency import InferencePool
+from app.core.ml_service import MLRiskEngine
+from app.core.model_registry import ModelRegistry, ModelVersion
+from app.core.risk_engine import EvaluatorPipeline
+from app.models.schemas import ClinicalInput
+
+class ConstantModel:
+    takes_raw_features = True
+
+    def __init__(self, p):
+        self.p = p
+
+    def predict_proba(self, X):
+        return np.column_stack([np.full(len(X), 1 - self.p), np.full(len(X), self.p)])
+
+class TemplateLLM:
+    def _template_fallback(self, risks):
+        return risks
+
+    def enrich(self, risks, user_profile=None):
+        return True
+
+def make_engine(tmp_path):
+    registry = ModelRegistry(str(tmp_path), pinned_bundle="", poll_seconds=0, traffic="a=1,b=1")
+    for version, p in (("a", 0.1), ("b", 0.9)):
+        registry.add(ModelVersion(version, {"diabetes_model": ConstantModel(p),
+                                            "hypertension_model": ConstantModel(p)}))
+    engine = MLRiskEngine.__new__(MLRiskEngine)
+    engine.registry = registry
+    engine.pipeline = EvaluatorPipeline.from_names(["ml_models"], registry=registry)
+    engine.result_cache = ResultCache()
+    engine.llm_service = TemplateLLM()
+    return engine
+
+def example():
+    return ClinicalInput(**ClinicalInput.Config.json_schema_extra["example"])
+
+def test_memoized_results_keep_the_ab_split(tmp_path):
+    engine = make_engine(tmp_path)
+    seen = {round(engine.assess(example())[0].probability, 1) for _ in range(60)}
+    assert seen == {0.1, 0.9}  # Both versions keep serving the same input
+    assert engine.result_cache.stats()["size"] == 2  # One entry per version
+
+def test_async_path_scores_with_the_version_in_its_key(tmp_path):
+    engine = make_engine(tmp_path)
+    pool = InferencePool()
+    try:
+        seen = {round(asyncio.run(engine.aassess(example(), pool, enrich=False))[0].probability, 1)
+                for _ in range(60)}
+    finally:
+        pool.shutdown()
+    assert seen == {0.1, 0.9}
+    requests = {name: v["requests"] for name, v in engine.registry.stats()["versions"].items()}
+    assert requests == {"a": 1, "b": 1}  # Scored once per version, then memoized
@@ -0,0 +1,88 @@
+import json
+import uuid
+import zlib
+from datetime import datetime, timezone
+
+import pytest
+
+from app.core import record_codec
+from app.core.record_codec import decode_assessment, encode_assessment
+from app.core.results import Assessment, Risk
+from app.core.storage import SecurityManager
+from app.models.schemas import RiskLevel
+
+STEP = "**Walk**: 30 min after dinner. *Why*: HbA1c 5.8. *Result*: Lower glucose."
+
+def make_record(**changes) -> dict:
+    risks = [
+        Risk("Type 2 Diabetes", RiskLevel.HIGH, 0.83, ["Elevated Hba1C"], [STEP] * 5),
+        Risk("Digital Eye Strain", RiskLevel.MODERATE, 0.65, ["Dry/Tired Eyes"], ["Blink more often."]),
+    ]
+    data = Assessment.new(risks, timestamp=datetime(2026, 10, 17, 3, 9, 9, 123456, tzinfo=timezone.utc)).to_dict()
+    data.update(changes)
+    return data
+
+def is_binary(payload: bytes) -> bool:
+    d = zlib.decompressobj(zdict=record_codec.ZLIB_DICTIONARY)
+    return not (d.decompress(payload)[0] & record_codec._FLAG_JSON)
+
+def expected(data: dict) -> dict:
+    # decode_assessment returns the legacy JSON shape: enums as values, timestamp as str
+    return json.loads(json.dumps(data, default=lambda v: getattr(v, "value", str(v))))
+
+def test_round_trip_binary():
+    data = make_record()
+    payload = encode_assessment(data)
+    assert is_binary(payload)
+    assert decode_assessment(payload) == expected(data)
+
+def test_round_trip_literal_id_disease_disclaimer_and_naive_timestamp():
+    data = make_record(assessment_id="legacy-42", disclaimer="Custom.", timestamp=datetime(2024, 1, 2, 3, 4, 5))
+    data["risks"][0]["disease"] = "Some New Domain"
+    payload = encode_assessment(data)
+    assert is_binary(payload)
+    decoded = decode_assessment(payload)
+    assert decoded == expected(data)
+    assert decoded["timestamp"] == "2024-01-02 03:04:05"
+
+def test_non_string_steps_are_stored_as_strings():
+    data = make_record()
+    data["risks"][0]["prevention_steps"] = [{"step": "x"}, 3, STEP]
+    data["risks"][0]["contributing_factors"] = [RiskLevel.HIGH, None]
+    payload = encode_assessment(data)
+    assert is_binary(payload)
+    risk = decode_assessment(payload)["risks"][0]
+    assert risk["prevention_steps"] == ["{'step': 'x'}", "3", STEP]
+    assert risk["contributing_factors"] == ["High", "None"]
+
+@pytest.mark.parametrize("mutate", [
+    pytest.param(lambda d: d["risks"][0].update(prevention_steps=[STEP] * 300), id="300_steps"),
+    pytest.param(lambda d: d["risks"][1].update(contributing_factors=["f"] * 256), id="256_factors"),
+    pytest.param(lambda d: d["risks"][0].update(prevention_steps=["x" * 70_000]), id="70k_step"),
+    pytest.param(lambda d: d.update(disclaimer="é" * 40_000), id="80k_byte_disclaimer"),
+    pytest.param(lambda d: d.update(risks=d["risks"] * 150), id="300_risks"),
+    pytest.param(lambda d: d["risks"][0].update(risk_level="Critical"), id="unknown_level"),
+    pytest.param(lambda d: d["risks"][0].update(prevention_steps="not a list"), id="steps_not_a_list"),
+])
+def test_records_that_do_not_fit_fall_back_to_json(mutate):
+    data = make_record()
+    mutate(data)
+    payload = encode_assessment(data)
+    assert not is_binary(payload)
+    assert decode_assessment(payload) == expected(data)
+
+def test_limits_that_still_fit_stay_binary():
+    data = make_record()
+    data["risks"][0]["prevention_steps"] = ["x" * 0xFFFF] + [STEP] * 254
+    payload = encode_assessment(data)
+    assert is_binary(payload)
+    assert decode_assessment(payload) == expected(data)
+
+def test_encrypted_record_round_trip(tmp_path):
+    security = SecurityManager(str(tmp_path / "secret.key"))
+    for data in (make_record(), make_record(risks=make_record()["risks"] * 200)):
+        assert security.decrypt_record(security.encrypt_record(data)) == expected(data)
+
+def test_uuid_ids_are_stored_raw():
+    data = make_record(assessment_id=str(uuid.uuid4()))
+    assert decode_assessment(encode_assessment(data))["assessment_id"] == data["assessment_id"]
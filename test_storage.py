@@ -0,0 +1,59 @@
+import pytest
+
+from app.core.results import Assessment, Risk
+from app.models.schemas import RiskLevel
+from app.core.storage import LocalStorage
+
+def make_assessment(steps=None) -> Assessment:
+    return Assessment.new([Risk("Hypertension", RiskLevel.HIGH, 0.8, ["Elevated Systolic Bp"],
+                                steps or ["**Walk**: 30 min. *Why*: x. *Result*: y."])])
+
+@pytest.fixture(params=[True, False], ids=["group_commit", "direct"])
+def storage(request, tmp_path):
+    store = LocalStorage(str(tmp_path / "assessments.enc"), group_commit=request.param,
+                         key_path=str(tmp_path / "secret.key"))
+    yield store
+    store.close()
+
+def test_round_trip_by_id(storage):
+    assessment = make_assessment()
+    storage.save_assessment(assessment)
+    storage.flush()
+    stored = storage.get_assessment(assessment.assessment_id)
+    assert stored["risks"][0]["prevention_steps"] == assessment.risks[0].prevention_steps
+
+def test_record_that_fails_to_encode_does_not_drop_the_batch(storage, monkeypatch):
+    good = [make_assessment() for _ in range(5)]
+    bad = make_assessment()
+    encrypt = storage.security.encrypt_record
+
+    def failing_encrypt(data):
+        if data["assessment_id"] == bad.assessment_id:
+            raise TypeError("cannot encode")
+        return encrypt(data)
+
+    monkeypatch.setattr(storage.security, "encrypt_record", failing_encrypt)
+    storage.save_assessments(good[:3] + [bad] + good[3:])
+    storage.flush()
+
+    assert storage.get_assessment(bad.assessment_id) is None
+    assert all(storage.get_assessment(a.assessment_id) for a in good)
+    assert len(storage.load_recent_assessments(10)) == 5
+
+def test_later_record_supersedes_earlier_one(storage):
+    from app.models.schemas import EnrichmentStatus
+
+    pending = make_assessment(["template"]).replace(enrichment_status=EnrichmentStatus.PENDING)
+    other = make_assessment()
+    storage.save_assessments([pending, other])
+    storage.flush()
+    assert storage.get_assessment(pending.assessment_id)["enrichment_status"] == "pending"
+    final = pending.replace(risks=[pending.risks[0].replace(prevention_steps=["llm"])],
+                            enrichment_status=EnrichmentStatus.COMPLETE)
+    storage.save_assessment(final)
+    storage.flush()
+
+    assert storage.get_assessment(pending.assessment_id)["risks"][0]["prevention_steps"] == ["llm"]
+    recent = storage.load_recent_assessments(10)
+    assert [r["assessment_id"] for r in recent] == [final.assessment_id, other.assessment_id]
+    assert [r["enrichment_status"] for r in storage.iter_assessments()] == ["complete", "complete"]
@@ -0,0 +1,118 @@
+import json
+
+import numpy as np
+import pytest
+
+from app.core.tree_predictor import CompiledTreeEnsemble
+
+xgboost = pytest.importorskip("xgboost")
+
+def make_data(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([
+        rng.integers(18, 90, n),           # age
+        rng.integers(1, 3, n),             # gender
+        rng.normal(28, 6, n).round(1),     # bmi
+        rng.normal(125, 18, n).round(0),   # systolic bp
+        rng.normal(5.6, 0.9, n).round(1),  # hba1c
+    ]).astype(np.float64)
+    logit = 0.04 * (X[:, 0] - 50) + 0.9 * (X[:, 4] - 5.7) + 0.05 * (X[:, 2] - 28)
+    y = (rng.random(n) < 1 / (1 + np.exp(-logit))).astype(int)
+    return X, y
+
+def train(X, y, **params):
+    model = xgboost.XGBClassifier(n_estimators=40, max_depth=4, learning_rate=0.2, random_state=0, **params)
+    model.fit(X, y)
+    return model
+
+def test_matches_xgboost_predict_proba():
+    X, y = make_data()
+    model = train(X, y)
+    compiled = CompiledTreeEnsemble.from_xgboost_json(model.get_booster().save_raw("json"))
+    np.testing.assert_allclose(compiled.predict_proba(X), model.predict_proba(X), atol=1e-5)
+
+def test_missing_values_follow_default_direction():
+    X, y = make_data()
+    X[::7, 2] = np.nan
+    X[::11, 4] = np.nan
+    model = train(X, y)
+    compiled = CompiledTreeEnsemble.from_xgboost_json(model.get_booster().save_raw("json"))
+    np.testing.assert_allclose(compiled.predict_proba(X), model.predict_proba(X), atol=1e-5)
+
+def test_inputs_exactly_on_split_thresholds():
+    X, y = make_data()
+    model = train(X, y)
+    compiled = CompiledTreeEnsemble.from_xgboost_json(model.get_booster().save_raw("json"))
+    # Every threshold, and its float32 neighbours, for every feature
+    internal = compiled.left >= 0
+    rows = []
+    for feature, t in zip(compiled.feature[internal], compiled.threshold[internal]):
+        t32 = np.float32(t)
+        for v in (t32, np.nextafter(t32, np.float32(-np.inf)), np.nextafter(t32, np.float32(np.inf))):
+            row = X[0].copy()
+            row[feature] = v
+            rows.append(row)
+    probe = np.asarray(rows)
+    np.testing.assert_allclose(compiled.predict_proba(probe), model.predict_proba(probe), atol=1e-5)
+
+def test_memory_mapped_arrays_round_trip(tmp_path):
+    X, y = make_data()
+    compiled = CompiledTreeEnsemble.from_xgboost_json(train(X, y).get_booster().save_raw("json"))
+    compiled.save_arrays(str(tmp_path / "model"))
+    loaded = CompiledTreeEnsemble.load_arrays(str(tmp_path / "model"))
+    assert not loaded.threshold.flags.writeable  # Read-only view of the mapping
+    np.testing.assert_array_equal(loaded.predict_proba(X), compiled.predict_proba(X))
+
+def test_rejects_unsupported_objective():
+    X, _ = make_data(200)
+    y = X[:, 3]
+    model = xgboost.XGBRegressor(n_estimators=3).fit(X, y)
+    with pytest.raises(ValueError, match="Unsupported objective"):
+        CompiledTreeEnsemble.from_xgboost_json(model.get_booster().save_raw("json"))
+
+def train_scaled(X, y):
+    from sklearn.preprocessing import StandardScaler
+    scaler = StandardScaler().fit(X)
+    return scaler, train(scaler.transform(X), y)
+
+def boundary_rows(X, compiled):
+    """Rows holding each raw observed value closest to a folded threshold, and its float neighbours."""
+    internal = compiled.left >= 0
+    rows = []
+    for feature, r in zip(compiled.feature[internal], compiled.threshold[internal]):
+        observed = X[np.argmin(np.abs(X[:, feature] - r)), feature]
+        for v in (observed, np.nextafter(observed, -np.inf), np.nextafter(observed, np.inf), r, np.nextafter(r, -np.inf)):
+            row = X[0].copy()
+            row[feature] = v
+            rows.append(row)
+    return np.asarray(rows)
+
+def test_folded_scaler_matches_scaled_model():
+    X, y = make_data()
+    scaler, model = train_scaled(X, y)
+    compiled = CompiledTreeEnsemble.from_xgboost_json(
+        model.get_booster().save_raw("json"), scaler_mean=scaler.mean_, scaler_scale=scaler.scale_)
+    probe = np.vstack([X, boundary_rows(X, compiled)])
+    expected = model.predict_proba(scaler.transform(probe))
+    np.testing.assert_allclose(compiled.predict_proba(probe), expected, atol=1e-5)
+
+def test_folded_booster_scores_raw_features():
+    from app.core.tree_predictor import fold_scaler_into_xgboost_json
+    X, y = make_data()
+    scaler, model = train_scaled(X, y)
+    folded = fold_scaler_into_xgboost_json(model.get_booster().save_raw("json"), scaler.mean_, scaler.scale_)
+    assert folded["learner"]["attributes"]["input_space"] == "raw"
+    raw_model = xgboost.XGBClassifier()
+    raw_model.load_model(bytearray(json.dumps(folded).encode()))
+    np.testing.assert_allclose(raw_model.predict_proba(X), model.predict_proba(scaler.transform(X)), atol=1e-5)
+
+    with pytest.raises(ValueError, match="already takes raw"):
+        fold_scaler_into_xgboost_json(folded, scaler.mean_, scaler.scale_)
+
+def test_fold_rejects_non_positive_scale():
+    X, y = make_data(200)
+    raw_json = train(X, y).get_booster().save_raw("json")
+    mean, scale = np.zeros(X.shape[1]), np.ones(X.shape[1])
+    scale[2] = 0.0
+    with pytest.raises(ValueError, match="non-positive scale"):
+        CompiledTreeEnsemble.from_xgboost_json(raw_json, scaler_mean=mean, scaler_scale=scale)
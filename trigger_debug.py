@@ -20,7 +20,7 @@ try:
     res = requests.post(url, json=data)
     print(f"Status Code: {res.status_code}")
     if res.status_code == 200:
-        print("Success! Check server_debug.log")
+        print("Success! Check server_debug.log (VITALSCAN_LOG_LEVEL=DEBUG to include prompts and replies)")
     else:
         print(f"Error: {res.text}")
 except Exception as e: